@@ -0,0 +1,145 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Quantization steps for the numeric fields _format_prompt sends; snapshots that
+# only differ below these steps are treated as the same question.
+DEFAULT_STEPS = {
+    "current_price": 1e-4,  # relative to price
+    "atr_rel": 1e-4,
+    "ema_strength": 1e-3,
+    "rsi": 1.0,
+}
+
+
+def _quantize(value: Any, step: float, relative: bool = False) -> Optional[float]:
+    if value is None:
+        return None
+    v = float(value)
+    if math.isnan(v):
+        return None
+    if relative and v > 0:
+        # Round on a log grid so the step is a fraction of the price
+        return round(math.log(v) / step)
+    return round(v / step)
+
+
+def verdict_deadline(s: Dict[str, Any], now: Optional[float] = None) -> float:
+    """Epoch time after which a verdict is useless.
+
+    The trade timeframe equals the expiry, so a signal stays actionable until
+    one expiry after its bar closes: bar_ts + 2 * expiry_seconds.
+    """
+    now = time.time() if now is None else now
+    expiry = float(s.get("expiry_seconds") or 60)
+    bar = s.get("bar_ts")
+    if bar is None:
+        return now + expiry
+    return float(bar) + 2 * expiry
+
+
+def next_bar_close(s: Dict[str, Any], now: Optional[float] = None) -> float:
+    """First close on the snapshot's bar grid after `now`, capped at verdict_deadline.
+
+    For a forming bar (EVAL_MODE=interval/tick) that is bar_ts + expiry_seconds. A
+    just-closed bar (EVAL_MODE=bar_close) is asked about after bar_ts + expiry_seconds,
+    so its verdict lives until the following close.
+    """
+    now = time.time() if now is None else now
+    expiry = float(s.get("expiry_seconds") or 60)
+    bar = s.get("bar_ts")
+    if bar is None:
+        return now + expiry
+    close = float(bar) + expiry
+    if close <= now:
+        close += expiry
+    return min(close, verdict_deadline(s, now))
+
+
+class ConfirmationCache:
+    """TTL + LRU cache of AI verdicts keyed by a quantized market snapshot.
+
+    Entries expire at the next bar close (next_bar_close), when a new bar_ts makes
+    them unreachable, or after `ttl_seconds`, whichever comes first. Snapshots of a
+    just-closed bar (EVAL_MODE=bar_close) therefore stay cacheable for one expiry.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: float = 60.0, steps: Optional[Dict[str, float]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl_seconds
+        self.steps = dict(DEFAULT_STEPS, **(steps or {}))
+        self._entries: "OrderedDict[Hashable, Tuple[float, Tuple[str, float]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, s: Dict[str, Any]) -> Tuple:
+        steps = self.steps
+        return (
+            s.get("market_type"),
+            s.get("asset"),
+            s.get("expiry_seconds"),
+            s.get("bar_ts"),
+            s.get("ema_trend"),
+            bool(s.get("breakout")),
+            bool(s.get("reject")),
+            _quantize(s.get("current_price"), steps["current_price"], relative=True),
+            _quantize(s.get("atr_rel"), steps["atr_rel"]),
+            _quantize(s.get("ema_strength"), steps["ema_strength"]),
+            _quantize(s.get("rsi"), steps["rsi"]),
+        )
+
+    def _expires_at(self, s: Dict[str, Any], now: float) -> float:
+        deadline = now + self.ttl
+        if s.get("bar_ts") is not None:
+            deadline = min(deadline, next_bar_close(s, now))
+        return deadline
+
+    def get(self, s: Dict[str, Any], now: Optional[float] = None) -> Optional[Tuple[str, float]]:
+        now = time.time() if now is None else now
+        k = self.key(s)
+        entry = self._entries.get(k)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, value = entry
+        if now >= expires:
+            del self._entries[k]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(k)
+        self.hits += 1
+        return value
+
+    def put(self, s: Dict[str, Any], value: Tuple[str, float], now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        expires = self._expires_at(s, now)
+        if expires <= now:
+            return
+        k = self.key(s)
+        self._entries[k] = (expires, value)
+        self._entries.move_to_end(k)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hit_rate, 4),
+        }
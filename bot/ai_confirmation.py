@@ -1,88 +1,422 @@
 import asyncio
+import heapq
+import itertools
 import logging
-from typing import Dict, Any, Tuple
+import re
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
 
-from openai import OpenAI
+from bot import metrics
+from bot.ai_prompt import encode, encode_batch, system_prompt
+from bot.ai_cache import ConfirmationCache, verdict_deadline
 from bot.config import load_settings
+from bot.rate_limit import TokenBucket
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 logger = logging.getLogger(__name__)
 
+# Returned when no verdict could be obtained (failed, timed out, shed or expired)
+AI_UNAVAILABLE = ("NO_TRADE", -1.0)
+
+_QUEUE_WAIT_SECONDS = metrics.histogram("ai_queue_wait_seconds", "Time a confirmation waited for its rate-limit slot")
+_CALL_SECONDS = metrics.histogram("ai_call_seconds", "AI chat completion round-trip time")
+_CALLS = metrics.counter("ai_calls_total", "AI chat completion requests sent")
+_FAILURES = metrics.counter("ai_failures_total", "AI calls that failed or timed out")
+_DROPPED = metrics.counter("ai_dropped_total", "Confirmations shed (queue full) or expired before dispatch")
+_CACHE_HITS = metrics.counter("ai_cache_hits_total", "Confirmations answered from the verdict cache")
+_COALESCED = metrics.counter("ai_coalesced_total", "Confirmations that shared an in-flight call")
+_BATCH_ITEMS = metrics.histogram("ai_batch_items", "Confirmations sent per AI request", buckets=(1, 2, 4, 8, 16, 32))
+_INVALID = metrics.counter("ai_invalid_verdicts_total", "Batch items without exactly one well-formed verdict line")
+
+# One verdict line of a batch reply: "<row>|<direction>|<confidence>"
+_BATCH_LINE = re.compile(r"^\s*(\d+)\s*\|\s*(CALL|PUT|NO_TRADE)\s*\|\s*(\d{1,3})\s*%?\s*$")
+
+
+@dataclass(order=True)
+class _Pending:
+    deadline: float
+    seq: int
+    snapshot: Dict[str, Any] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued: float = field(compare=False)
+
+
+class ConfirmationQueue:
+    """Earliest-deadline-first queue in front of the rate-limited AI call.
+
+    - Requests are dispatched in deadline order as the token bucket allows
+    - Requests whose deadline passed while queued are dropped as AI_UNAVAILABLE
+    - When `max_depth` is reached the request with the latest deadline is shed
+    - Each dispatched call gets the time left to its deadline as its timeout
+    - With `call_batch` and `batch_size` > 1, one token dispatches up to `batch_size`
+      requests in a single call; a lone request waits up to `batch_window` seconds
+      after it was queued for others to join (never past its deadline)
+    """
+
+    def __init__(
+        self,
+        bucket: TokenBucket,
+        call: Callable[[Dict[str, Any], float], Awaitable[Tuple[str, float]]],
+        max_depth: int = 64,
+        call_batch: Optional[Callable[[List[Dict[str, Any]], float], Awaitable[List[Tuple[str, float]]]]] = None,
+        batch_size: int = 1,
+        batch_window: float = 0.0,
+    ):
+        self.bucket = bucket
+        self._call = call
+        self._call_batch = call_batch
+        self.max_depth = max_depth
+        self.batch_size = max(1, batch_size) if call_batch is not None else 1
+        self.batch_window = batch_window
+        self._heap: List[_Pending] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+        self.submitted = 0
+        self.dispatched = 0
+        self.batches = 0
+        self.dropped_expired = 0
+        self.dropped_full = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    async def submit(self, snapshot: Dict[str, Any], deadline: float) -> Tuple[str, float]:
+        """Queue a request; resolves with the verdict or AI_UNAVAILABLE if shed or expired."""
+        loop = asyncio.get_running_loop()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+        self.submitted += 1
+        item = _Pending(deadline, next(self._seq), snapshot, loop.create_future(), loop.time())
+        heapq.heappush(self._heap, item)
+        if len(self._heap) > self.max_depth:
+            latest = max(self._heap)
+            self._heap.remove(latest)
+            heapq.heapify(self._heap)
+            self.dropped_full += 1
+            _DROPPED.inc()
+            self._resolve(latest, AI_UNAVAILABLE)
+        self._wakeup.set()
+        return await item.future
+
+    @staticmethod
+    def _resolve(item: _Pending, result: Tuple[str, float]) -> None:
+        if not item.future.done():
+            item.future.set_result(result)
+
+    def _next_live(self) -> Optional[_Pending]:
+        now = time.time()
+        while self._heap:
+            item = self._heap[0]
+            if item.future.done():
+                heapq.heappop(self._heap)  # caller went away
+                continue
+            if item.deadline <= now:
+                heapq.heappop(self._heap)
+                self.dropped_expired += 1
+                _DROPPED.inc()
+                self._resolve(item, AI_UNAVAILABLE)
+                continue
+            return item
+        return None
+
+    async def _dispatch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._next_live() is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            wait = self.bucket.delay()
+            if wait > 0:
+                # Sleep for the token, but re-check if the head request expires first
+                await asyncio.sleep(min(wait, max(0.0, self._heap[0].deadline - time.time())))
+                continue
+            item = self._next_live()
+            if item is None:
+                continue
+            if self.batch_size > 1 and len(self._heap) < self.batch_size:
+                # Give candidates from the same bar a moment to share this call
+                gather = item.enqueued + self.batch_window - loop.time()
+                if gather > 0:
+                    await asyncio.sleep(min(gather, max(0.0, item.deadline - time.time())))
+                    continue
+            batch = self._take_batch()
+            if not batch:
+                continue
+            self.bucket.take()
+            now = loop.time()
+            for item in batch:
+                waited = now - item.enqueued
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+                _QUEUE_WAIT_SECONDS.observe(waited)
+            self.dispatched += len(batch)
+            self.batches += 1
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    def _take_batch(self) -> List[_Pending]:
+        """Pop up to batch_size live requests, earliest deadline first."""
+        batch: List[_Pending] = []
+        while len(batch) < self.batch_size and self._next_live() is not None:
+            batch.append(heapq.heappop(self._heap))
+        return batch
+
+    async def _run(self, batch: List[_Pending]) -> None:
+        # The earliest deadline bounds the whole call
+        timeout = max(0.0, min(item.deadline for item in batch) - time.time())
+        try:
+            if len(batch) == 1:
+                results = [await self._call(batch[0].snapshot, timeout)]
+            else:
+                results = await self._call_batch([item.snapshot for item in batch], timeout)
+        except Exception:
+            logger.exception("AI confirmation failed")
+            results = [AI_UNAVAILABLE] * len(batch)
+        for item, result in zip(batch, results):
+            self._resolve(item, result)
+
+    @property
+    def dropped(self) -> int:
+        return self.dropped_expired + self.dropped_full
+
+    @property
+    def wait_avg(self) -> float:
+        return self.wait_total / self.dispatched if self.dispatched else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "depth": len(self._heap),
+            "submitted": self.submitted,
+            "dispatched": self.dispatched,
+            "batches": self.batches,
+            "dropped_expired": self.dropped_expired,
+            "dropped_full": self.dropped_full,
+            "wait_avg": round(self.wait_avg, 4),
+            "wait_max": round(self.wait_max, 4),
+        }
+
+
 class AIConfirmation:
-    """Rate-limited AI confirmation using OpenRouter-compatible OpenAI client."""
+    """Rate-limited AI confirmation using an OpenRouter-compatible async OpenAI client.
+
+    One instance is shared process-wide (see get_ai_confirmation):
+    - a single AsyncOpenAI client, so every session reuses one pooled HTTP connection set
+    - a global token bucket drained earliest-deadline-first, shedding requests that
+      can no longer arrive in time (see ConfirmationQueue)
+    - in-flight de-duplication: identical (asset, expiry, direction, bar) requests share one call
+    - a verdict cache keyed by the quantized snapshot, valid until the bar closes
+    - batching: candidates queued together share one request (AI_BATCH_SIZE), each
+      mapped back to its caller by row number
+    """
 
     def __init__(self):
+        # Imported here: openai is slow to import and local-only setups never need it
+        from openai import AsyncOpenAI
+
         self.settings = load_settings()
-        self.client = OpenAI(
+        self.client: "AsyncOpenAI" = AsyncOpenAI(
             api_key=self.settings.openrouter_api_key,
             base_url=self.settings.openrouter_base_url,
+            timeout=self.settings.ai_timeout_seconds,
+            # No hidden retries: each retry would be an upstream call outside the rate limit,
+            # and a failed verdict is re-requested by the next evaluation anyway
+            max_retries=0,
         )
         # QPS limiter: allow ~1 call per 3 seconds by default
-        self._sem = asyncio.Semaphore(1)
-        self._min_interval = 1.0 / max(1e-6, self.settings.rate_limit_ai_qps)
-        self._last_call = 0.0
+        self._bucket = TokenBucket(self.settings.rate_limit_ai_qps, self.settings.ai_burst)
+        self.queue = ConfirmationQueue(
+            self._bucket,
+            self._call,
+            max_depth=self.settings.ai_queue_depth,
+            call_batch=self._call_batch,
+            batch_size=self.settings.ai_batch_size,
+            batch_window=self.settings.ai_batch_window_ms / 1000.0,
+        )
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.cache = ConfirmationCache(self.settings.ai_cache_size, self.settings.ai_cache_ttl_seconds)
+        self.calls = 0
+        self.coalesced = 0
+        metrics.gauge("ai_queue_depth", "Confirmations waiting for a rate-limit slot").set_function(self.queue.__len__)
 
-    async def confirm(self, snapshot: Dict[str, Any]) -> Tuple[str, float]:
+    @staticmethod
+    def _dedupe_key(s: Dict[str, Any], direction: Optional[str]) -> Optional[Tuple]:
+        bar = s.get("bar_ts")
+        if bar is None or direction is None:
+            return None
+        return (s.get("market_type"), s.get("asset"), s.get("expiry_seconds"), direction, bar)
+
+    async def confirm(self, snapshot: Dict[str, Any], direction: Optional[str] = None) -> Tuple[str, float]:
         """Send snapshot to AI; returns (direction, confidence).
-        Direction in {"CALL","PUT","NO_TRADE"}
+        Direction in {"CALL","PUT","NO_TRADE"}; AI_UNAVAILABLE (confidence -1) when no verdict was obtained.
+
+        `direction` is the candidate being validated; with the snapshot's bar it keys
+        request sharing between sessions.
         """
-        await self._throttle()
+        cached = self.cache.get(snapshot)
+        if cached is not None:
+            _CACHE_HITS.inc()
+            return cached
+
+        key = self._dedupe_key(snapshot, direction)
+        if key is None:
+            return await self._confirm(snapshot)
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            _COALESCED.inc()
+            return await asyncio.shield(pending)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        result = AI_UNAVAILABLE
+        try:
+            result = await self._confirm(snapshot)
+            return result
+        finally:
+            del self._inflight[key]
+            # Followers get the leader's answer, or AI_UNAVAILABLE if the leader was cancelled
+            fut.set_result(result)
+
+    @staticmethod
+    def deadline(s: Dict[str, Any], now: Optional[float] = None) -> float:
+        """Epoch time after which a verdict is useless (see ai_cache.verdict_deadline)."""
+        return verdict_deadline(s, now)
+
+    async def _confirm(self, snapshot: Dict[str, Any]) -> Tuple[str, float]:
+        return await self.queue.submit(snapshot, self.deadline(snapshot))
+
+    async def _call(self, snapshot: Dict[str, Any], timeout: float) -> Tuple[str, float]:
         try:
             prompt = self._format_prompt(snapshot)
-            resp = await self._create_chat(prompt)
-            text = resp.strip().upper()
-            # Parse minimal structured response like: "CALL|82"
-            direction, conf = "NO_TRADE", 0.0
-            if "CALL" in text or "PUT" in text or "NO_TRADE" in text:
-                if "CALL" in text:
-                    direction = "CALL"
-                elif "PUT" in text:
-                    direction = "PUT"
-                else:
-                    direction = "NO_TRADE"
-            # Find confidence number
-            import re
-            m = re.search(r"(\d{2,3})\s*%", text)
-            if m:
-                conf = float(m.group(1))
-            return direction, conf
+            self.calls += 1
+            _CALLS.inc()
+            _BATCH_ITEMS.observe(1)
+            with _CALL_SECONDS.time():
+                resp = await asyncio.wait_for(self._create_chat(prompt), timeout=min(timeout, self.settings.ai_timeout_seconds))
+            result = self._parse(resp)
         except Exception:
+            _FAILURES.inc()
             logger.exception("AI confirmation failed")
-            return "NO_TRADE", 0.0
-
-    async def _create_chat(self, prompt: str):
-        # OpenAI client has async or sync; create coroutine using asyncio.to_thread for sync call
-        def _sync():
-            completion = self.client.chat.completions.create(
-                model=self.settings.deepseek_model,
-                messages=[
-                    {"role": "system", "content": "You are a strict trading validator. Output 'CALL|NN' or 'PUT|NN' or 'NO_TRADE|NN' with NN=confidence."},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.2,
-                max_tokens=64,
-            )
-            return completion.choices[0].message.content
-        return await asyncio.to_thread(_sync)
-
-    def _format_prompt(self, s: Dict[str, Any]) -> str:
-        return (
-            f"Market: {s.get('market_type')}\n"
-            f"Asset: {s.get('asset')}\n"
-            f"Expiry: {s.get('expiry_seconds')}s\n"
-            f"Price: {s.get('current_price')}\n"
-            f"Volatility: ATR_rel={s.get('atr_rel'):.6f}\n"
-            f"EMA Trend: {s.get('ema_trend')} strength={s.get('ema_strength'):.4f}\n"
-            f"RSI: {s.get('rsi'):.2f}\n"
-            f"Structure: breakout={s.get('breakout')} reject={s.get('reject')}\n"
-            "Task: Validate direction (CALL/PUT/NO_TRADE) for PocketOption binary option."
-            " Reject choppy/manipulated conditions. Return confidence percent (0-100)."
+            return AI_UNAVAILABLE
+        # Only real verdicts are cached; failures may be retried within the bar
+        self.cache.put(snapshot, result)
+        return result
+
+    async def _call_batch(self, snapshots: List[Dict[str, Any]], timeout: float) -> List[Tuple[str, float]]:
+        """One request for several snapshots; items without a valid verdict get AI_UNAVAILABLE."""
+        try:
+            prompt = encode_batch(snapshots)
+            self.calls += 1
+            _CALLS.inc()
+            _BATCH_ITEMS.observe(len(snapshots))
+            with _CALL_SECONDS.time():
+                resp = await asyncio.wait_for(
+                    self._create_chat(prompt, items=len(snapshots)),
+                    timeout=min(timeout, self.settings.ai_timeout_seconds),
+                )
+            verdicts = self._parse_batch(resp, len(snapshots))
+        except Exception:
+            _FAILURES.inc()
+            logger.exception("AI batch confirmation failed")
+            return [AI_UNAVAILABLE] * len(snapshots)
+        results = []
+        for snapshot, verdict in zip(snapshots, verdicts):
+            if verdict is None:
+                results.append(AI_UNAVAILABLE)
+                continue
+            self.cache.put(snapshot, verdict)
+            results.append(verdict)
+        invalid = verdicts.count(None)
+        if invalid:
+            _INVALID.inc(invalid)
+            logger.warning(f"AI batch reply had no valid verdict for {invalid} of {len(snapshots)} items")
+        return results
+
+    @staticmethod
+    def _parse_batch(resp: Optional[str], n: int) -> List[Optional[Tuple[str, float]]]:
+        """Verdicts for rows 1..n of a batch reply; None where a row has no single valid line.
+
+        Every line must be "<row>|CALL|PUT|NO_TRADE|<0-100>"; anything else is ignored,
+        and a row answered twice counts as unanswered rather than trusting either line.
+        """
+        verdicts: List[Optional[Tuple[str, float]]] = [None] * n
+        answered: Set[int] = set()
+        conflicting: Set[int] = set()
+        for line in (resp or "").upper().splitlines():
+            m = _BATCH_LINE.match(line)
+            if m is None:
+                continue
+            row, direction, conf = int(m.group(1)), m.group(2), float(m.group(3))
+            if not 1 <= row <= n or conf > 100:
+                continue
+            if row in answered:
+                conflicting.add(row)
+                continue
+            answered.add(row)
+            verdicts[row - 1] = (direction, conf)
+        for row in conflicting:
+            verdicts[row - 1] = None
+        return verdicts
+
+    @staticmethod
+    def _parse(resp: Optional[str]) -> Tuple[str, float]:
+        text = (resp or "").strip().upper()
+        # Parse minimal structured response like: "CALL|82"
+        direction, conf = "NO_TRADE", 0.0
+        if "CALL" in text or "PUT" in text or "NO_TRADE" in text:
+            if "CALL" in text:
+                direction = "CALL"
+            elif "PUT" in text:
+                direction = "PUT"
+            else:
+                direction = "NO_TRADE"
+        # Find confidence number: "CALL|82" or "82%"
+        m = re.search(r"\|\s*(\d{1,3})\b", text) or re.search(r"(\d{2,3})\s*%", text)
+        if m:
+            conf = float(m.group(1))
+        return direction, conf
+
+    async def _create_chat(self, prompt: str, items: int = 0):
+        """`items` > 0 asks for a batch reply, one verdict line per row."""
+        completion = await self.client.chat.completions.create(
+            model=self.settings.deepseek_model,
+            messages=[
+                {"role": "system", "content": system_prompt(batch=items > 0)},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.2,
+            max_tokens=16 * items + 16 if items else 64,
         )
+        return completion.choices[0].message.content
 
-    async def _throttle(self):
-        # Simple time-based throttle with semaphore
-        async with self._sem:
-            now = asyncio.get_event_loop().time()
-            wait = max(0.0, self._last_call + self._min_interval - now)
-            if wait > 0:
-                await asyncio.sleep(wait)
-            self._last_call = asyncio.get_event_loop().time()
\ No newline at end of file
+    @staticmethod
+    def _format_prompt(s: Dict[str, Any]) -> str:
+        # One compact row under a fixed header; the field legend is in the system prompt
+        return encode(s)
+
+
+_ai: Optional[AIConfirmation] = None
+
+
+def get_ai_confirmation() -> AIConfirmation:
+    global _ai
+    if _ai is None:
+        _ai = AIConfirmation()
+    return _ai
+
+
+def peek_ai_confirmation() -> Optional[AIConfirmation]:
+    """The shared instance if it was created already; never creates it."""
+    return _ai
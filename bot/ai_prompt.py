@@ -0,0 +1,64 @@
+"""Compact prompt encoding for AI confirmation.
+
+A snapshot goes out as one pipe-separated row under a fixed header, for example
+
+    mkt|asset|exp|px|atr|ema|str|rsi|bo|rj
+    OTC|EURUSD_otc|60|1.08523|0.000412|up|0.0123|63.2|1|0
+
+The field legend and the task live in a constant system prompt, so the per-call text
+is only the row. Several snapshots share one header in encode_batch, numbered from 1,
+for a single request that answers them all (one reply line per row).
+"""
+from typing import Any, Mapping, Sequence
+
+COLUMNS = ("mkt", "asset", "exp", "px", "atr", "ema", "str", "rsi", "bo", "rj")
+HEADER = "|".join(COLUMNS)
+
+_LEGEND = (
+    "Strict PocketOption binary option validator. Rows: mkt=market, exp=expiry s, px=price, "
+    "atr=ATR/price, ema=trend, str=EMA strength, rsi=RSI14, bo/rj=breakout/rejection wick (1/0). "
+    "Reject choppy or manipulated setups. "
+)
+SYSTEM_PROMPT = _LEGEND + "Reply CALL|NN, PUT|NN or NO_TRADE|NN (NN=confidence 0-100)."
+BATCH_SYSTEM_PROMPT = _LEGEND + "Reply one line per row: i|CALL|NN, i|PUT|NN or i|NO_TRADE|NN (i=row, NN=confidence 0-100), nothing else."
+
+
+def _num(value: Any, fmt: str) -> str:
+    return "" if value is None else format(float(value), fmt)
+
+
+def _flag(value: Any) -> str:
+    return "1" if value else "0"
+
+
+def encode_row(s: Mapping[str, Any]) -> str:
+    """One snapshot (Snapshot or dict) as a COLUMNS row; precision follows the cache steps."""
+    return "|".join((
+        str(s.get("market_type") or ""),
+        str(s.get("asset") or ""),
+        str(s.get("expiry_seconds") or ""),
+        _num(s.get("current_price"), ".6g"),
+        _num(s.get("atr_rel"), ".3g"),
+        str(s.get("ema_trend") or ""),
+        _num(s.get("ema_strength"), ".4f"),
+        _num(s.get("rsi"), ".1f"),
+        _flag(s.get("breakout")),
+        _flag(s.get("reject")),
+    ))
+
+
+def encode(s: Mapping[str, Any]) -> str:
+    """User message for a single-snapshot request (answered per SYSTEM_PROMPT)."""
+    return f"{HEADER}\n{encode_row(s)}"
+
+
+def encode_batch(snapshots: Sequence[Mapping[str, Any]], start: int = 1) -> str:
+    """User message for one request over several snapshots (answered per BATCH_SYSTEM_PROMPT)."""
+    rows = [f"i|{HEADER}"]
+    rows.extend(f"{i}|{encode_row(s)}" for i, s in enumerate(snapshots, start))
+    return "\n".join(rows)
+
+
+def system_prompt(batch: bool = False) -> str:
+    """The constant system message matching encode (single) or encode_batch (batch)."""
+    return BATCH_SYSTEM_PROMPT if batch else SYSTEM_PROMPT
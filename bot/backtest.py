@@ -0,0 +1,261 @@
+"""Offline backtest: replay stored OHLCV through the SignalEngine vote logic.
+
+    python -m bot.backtest data/EURUSD_otc.csv data/GBPUSD_otc.parquet --expiries 5,60 --ai local
+
+Input files hold timestamp/open/high/low/close[/volume][/asset] columns (CSV or
+Parquet; one asset per file unless an `asset` column is present). For every expiry
+the base bars are resampled to the expiry timeframe, exactly as a live session
+trades it, and the trend view uses `higher_timeframe_seconds`.
+
+Indicators are computed once over the whole history with the bot.indicators
+functions (all causal rolling/ewm windows), so a bar's vote only sees data up to
+that bar; the whole replay is O(bars) per asset and expiry. The trend EMA is the
+full-history EMA of the trend timeframe including its forming bar. A signal is
+entered at its bar's close and settled at the next bar's close (one expiry later);
+equal prices count as ties.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bot.candle_builder import CandleBuilder
+from bot.indicators.atr import atr
+from bot.indicators.confluence import DEFAULT_PARAMS, MIN_TRADE_BARS, StrategyParams, confluence
+from bot.indicators.ema import ema
+from bot.indicators.rsi import rsi
+from bot.markets import EXPIRIES_SECONDS, higher_timeframe_seconds
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+# (snapshot, direction) -> (direction or NO_TRADE, confidence); e.g. LogisticValidator.confirm
+ConfirmFn = Callable[[Dict, str], Tuple[str, float]]
+
+
+@dataclass
+class ExpiryStats:
+    asset: str
+    expiry_seconds: int
+    bars: int = 0
+    candidates: int = 0
+    signals: int = 0
+    wins: int = 0
+    losses: int = 0
+    ties: int = 0
+
+    @property
+    def win_rate(self) -> float:
+        decided = self.wins + self.losses
+        return self.wins / decided if decided else 0.0
+
+    def merge(self, other: "ExpiryStats") -> None:
+        self.bars += other.bars
+        self.candidates += other.candidates
+        self.signals += other.signals
+        self.wins += other.wins
+        self.losses += other.losses
+        self.ties += other.ties
+
+    def to_dict(self) -> Dict:
+        d = asdict(self)
+        d["win_rate"] = round(self.win_rate, 4)
+        return d
+
+
+def _epoch_column(ts: pd.Series) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(ts):
+        return ts.astype("int64")
+    return (pd.to_datetime(ts, utc=True).astype("int64") // 10**9).astype("int64")
+
+
+def load_ohlcv(path: str) -> Dict[str, pd.DataFrame]:
+    """Read a CSV/Parquet file into {asset: sorted OHLCV frame}."""
+    if path.endswith((".parquet", ".pq")):
+        raw = pd.read_parquet(path)
+    else:
+        raw = pd.read_csv(path)
+    raw.columns = [c.lower() for c in raw.columns]
+    if "volume" not in raw:
+        raw["volume"] = 0.0
+    raw["timestamp"] = _epoch_column(raw["timestamp"])
+    default_asset = os.path.splitext(os.path.basename(path))[0]
+    groups = raw.groupby("asset") if "asset" in raw else [(default_asset, raw)]
+    out = {}
+    for asset, df in groups:
+        df = df[COLUMNS].astype({c: "float64" for c in COLUMNS[1:]})
+        df = df.drop_duplicates("timestamp", keep="last").sort_values("timestamp").reset_index(drop=True)
+        out[str(asset)] = df
+    return out
+
+
+def base_timeframe(df: pd.DataFrame) -> int:
+    if len(df) < 2:
+        return 0
+    return int(np.median(np.diff(df["timestamp"].to_numpy())))
+
+
+def trend_ema(ts: np.ndarray, close: np.ndarray, trend_seconds: int, period: int) -> np.ndarray:
+    """EMA of the trend timeframe as seen at every trade bar, forming trend bar included.
+
+    The forming trend bar's close is the trade bar's close, so the value is one EMA
+    step from the previous closed trend bar's EMA.
+    """
+    bucket = (ts // trend_seconds) * trend_seconds
+    starts = np.r_[True, bucket[1:] != bucket[:-1]]
+    k = np.cumsum(starts) - 1  # trend bar index per trade bar
+    ends = np.r_[starts[1:], True]
+    closed = ema(pd.Series(close[ends]), period).to_numpy()
+    prev = np.r_[np.nan, closed[:-1]][k]
+    a = 2.0 / (period + 1.0)
+    return np.where(np.isnan(prev), close, a * close + (1 - a) * prev)
+
+
+def vote_frame(df: pd.DataFrame, trend_seconds: int, params: StrategyParams = DEFAULT_PARAMS) -> pd.DataFrame:
+    """Per-bar readings plus CALL/PUT/'' direction, from the same `confluence` rules as _confirm_all."""
+    p = params
+    ts = df["timestamp"].to_numpy()
+    o, h, l, c = (df[k].to_numpy() for k in ("open", "high", "low", "close"))
+
+    e50 = trend_ema(ts, c, trend_seconds, p.ema_fast)
+    e200 = trend_ema(ts, c, trend_seconds, p.ema_slow)
+    ema_up = e50 > e200
+    strength = np.abs(e50 - e200) / (e200 + 1e-9)
+
+    r = rsi(df["close"], p.rsi_period)
+    r_prev = r.shift(1).to_numpy()
+    r = r.to_numpy()
+    rel = atr(df, p.atr_period).to_numpy() / (c + 1e-9)
+    prior_high = df["high"].shift(1).rolling(p.lookback).max().to_numpy()
+    prior_low = df["low"].shift(1).rolling(p.lookback).min().to_numpy()
+
+    # _confirm_all needs MIN_TRADE_BARS trade bars of history
+    warm = np.arange(len(df)) >= MIN_TRADE_BARS - 1
+    votes = confluence(ema_up, r, r_prev, rel, o, h, l, c, prior_high, prior_low, valid=warm, params=p)
+
+    return pd.DataFrame({
+        "timestamp": ts,
+        "current_price": c,
+        "direction": votes.direction,
+        "ema_trend": np.where(ema_up, "up", "down"),
+        "ema_strength": strength,
+        "rsi": r,
+        "atr_rel": rel,
+        "breakout": votes.breakout,
+        "reject": votes.reject,
+    })
+
+
+def resample_for_expiry(df_base: pd.DataFrame, expiry_seconds: int) -> Optional[pd.DataFrame]:
+    """Base bars at the expiry timeframe, or None if the data is too coarse for it."""
+    base_tf = base_timeframe(df_base)
+    if base_tf <= 0 or expiry_seconds < base_tf or expiry_seconds % base_tf:
+        return None
+    return df_base if expiry_seconds == base_tf else CandleBuilder.aggregate_timeframe(df_base, expiry_seconds)
+
+
+def backtest_frame(
+    df_base: pd.DataFrame,
+    asset: str,
+    expiry_seconds: int,
+    confirm: Optional[ConfirmFn] = None,
+    params: StrategyParams = DEFAULT_PARAMS,
+    resampled: bool = False,
+) -> ExpiryStats:
+    """Backtest one asset at one expiry; pass `resampled=True` if df_base is already at the expiry timeframe."""
+    stats = ExpiryStats(asset=asset, expiry_seconds=expiry_seconds)
+    df = df_base if resampled else resample_for_expiry(df_base, expiry_seconds)
+    if df is None or not len(df):
+        return stats
+    votes = vote_frame(df, higher_timeframe_seconds(expiry_seconds), params)
+    stats.bars = len(df)
+
+    ts = votes["timestamp"].to_numpy()
+    close = votes["current_price"].to_numpy()
+    # Settle on the next bar, only if it is exactly one expiry later (no gap)
+    nxt = np.r_[close[1:], np.nan]
+    settled = np.r_[ts[1:] - ts[:-1] == expiry_seconds, False]
+
+    fired = np.flatnonzero(votes["direction"].to_numpy() != "")
+    stats.candidates = len(fired)
+    if confirm is not None and len(fired):
+        keep = []
+        for i in fired:
+            row = votes.iloc[i]
+            snap = {k: row[k] for k in ("current_price", "ema_trend", "ema_strength", "rsi", "atr_rel", "breakout", "reject")}
+            snap.update({"asset": asset, "expiry_seconds": expiry_seconds, "bar_ts": int(row["timestamp"])})
+            d, conf = confirm(snap, row["direction"])
+            if d == row["direction"] and conf >= params.min_confidence:
+                keep.append(i)
+        fired = np.asarray(keep, dtype=np.int64)
+
+    fired = fired[settled[fired]]
+    stats.signals = len(fired)
+    if not len(fired):
+        return stats
+    move = nxt[fired] - close[fired]
+    sign = np.where(votes["direction"].to_numpy()[fired] == "CALL", 1.0, -1.0)
+    pnl = sign * move
+    stats.wins = int((pnl > 0).sum())
+    stats.losses = int((pnl < 0).sum())
+    stats.ties = int((pnl == 0).sum())
+    return stats
+
+
+def run(
+    paths: Iterable[str],
+    expiries: Sequence[int],
+    confirm: Optional[ConfirmFn] = None,
+) -> Tuple[List[ExpiryStats], Dict[int, ExpiryStats]]:
+    """Backtest every asset in `paths`; returns per-asset rows and per-expiry totals."""
+    rows: List[ExpiryStats] = []
+    totals = {e: ExpiryStats(asset="*", expiry_seconds=e) for e in expiries}
+    for path in paths:
+        for asset, df in load_ohlcv(path).items():
+            for e in expiries:
+                st = backtest_frame(df, asset, e, confirm)
+                rows.append(st)
+                totals[e].merge(st)
+            logger.info(f"Backtested {asset}: {len(df)} bars")
+    return rows, totals
+
+
+def _parse_expiries(text: Optional[str]) -> List[int]:
+    if not text:
+        return list(EXPIRIES_SECONDS.values())
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Replay stored candles through the signal vote logic.")
+    ap.add_argument("paths", nargs="+", help="CSV or Parquet OHLCV files")
+    ap.add_argument("--expiries", help="comma-separated seconds (default: all EXPIRIES_SECONDS)")
+    ap.add_argument("--ai", choices=("none", "local"), default="none", help="confirmation step: none (votes only) or the local validator")
+    ap.add_argument("--model", help="local validator JSON weights (with --ai local)")
+    ap.add_argument("--json", help="write results to this JSON file")
+    args = ap.parse_args(argv)
+
+    confirm = None
+    if args.ai == "local":
+        from bot.local_validator import load_validator
+        confirm = load_validator(args.model).confirm
+
+    rows, totals = run(args.paths, _parse_expiries(args.expiries), confirm)
+    print(f"{'expiry':>7} {'bars':>10} {'cands':>8} {'signals':>8} {'wins':>7} {'losses':>7} {'ties':>6} {'win%':>6}")
+    for e, t in totals.items():
+        print(f"{e:>6}s {t.bars:>10} {t.candidates:>8} {t.signals:>8} {t.wins:>7} {t.losses:>7} {t.ties:>6} {100 * t.win_rate:>5.1f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"per_asset": [r.to_dict() for r in rows], "per_expiry": [t.to_dict() for t in totals.values()]}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
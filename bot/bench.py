@@ -0,0 +1,339 @@
+"""Benchmarks for the candle -> indicator -> signal pipeline on synthetic data.
+
+    python -m bot.bench --out bench.json
+    python -m bot.bench --only indicators --sizes 300,10000
+    python -m bot.bench --tick-rate 20000 --tick-seconds 5 --assets 30 --sessions 10
+    python -m bot.bench --only startup
+
+Every case runs on seeded random-walk OHLCV, so numbers are comparable between
+versions on the same machine. Micro benchmarks report the best and median time per
+call over several timeit repeats. The tick benchmark drives a MarketHub through a
+FakePocketOptionClient that emits updateStream ticks at --tick-rate (0 = as fast as
+the hub absorbs them) to `assets x sessions` MarketStream subscribers, each with
+its own EvaluationScheduler running `_confirm_all`. Results go to --out as JSON
+together with interpreter and library versions. The startup section times cold
+imports of the entry points in fresh interpreters and lists which heavy libraries
+each one pulled in.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from bot.ai_prompt import encode, encode_batch
+from bot.candle_builder import CandleBuilder
+from bot.indicators.atr import IncrementalATR, atr, atr_filter
+from bot.indicators.ema import IncrementalEMATrend, ema, ema_trend
+from bot.indicators.price_action import recent_breakout, rejection_wick
+from bot.indicators.rolling import RollingMean
+from bot.indicators.rsi import IncrementalRSI, rsi, rsi_signal
+from bot.indicators.vectorized import batch_votes, stack_frames
+from bot.synthetic import SyntheticCandle, synthetic_candles, synthetic_ohlcv
+
+SECTIONS = ("candles", "indicators", "signals", "ticks", "startup")
+# Entry points timed by the startup section, and the slow-to-import libraries to watch for
+STARTUP_MODULES = ("bot.config", "bot.main", "bot.worker", "bot.signal_engine")
+HEAVY_MODULES = ("pandas", "openai", "pocketoptionapi_async", "telegram")
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5) -> Dict[str, float]:
+    """Per-call seconds (best and median of `repeat` timeit runs of >= 0.2s each)."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    runs = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {"best_s": min(runs), "median_s": statistics.median(runs), "calls": number * repeat}
+
+
+def _case(results: List[Dict], name: str, fn: Callable[[], Any], **params) -> None:
+    row = {"name": name, **params, **measure(fn)}
+    results.append(row)
+    extra = " ".join(f"{k}={v}" for k, v in params.items())
+    print(f"{name:<34} {extra:<24} {1e6 * row['best_s']:>12.1f} us", flush=True)
+
+
+def bench_candles(sizes: Sequence[int]) -> List[Dict]:
+    results: List[Dict] = []
+    for n in sizes:
+        candles = synthetic_candles(n)
+        df = CandleBuilder.to_dataframe(candles)
+        _case(results, "CandleBuilder.to_dataframe", lambda: CandleBuilder.to_dataframe(candles), bars=n)
+        _case(results, "CandleBuilder.aggregate_timeframe", lambda: CandleBuilder.aggregate_timeframe(df, 300), bars=n)
+    return results
+
+
+def bench_indicators(sizes: Sequence[int]) -> List[Dict]:
+    results: List[Dict] = []
+    for n in sizes:
+        df = synthetic_ohlcv(n)
+        close = df["close"]
+        rsi_series = rsi(close, 14)
+        atr_series = atr(df, 14)
+        _case(results, "ema", lambda: ema(close, 50), bars=n)
+        _case(results, "ema_trend", lambda: ema_trend(close), bars=n)
+        _case(results, "rsi", lambda: rsi(close, 14), bars=n)
+        _case(results, "rsi_signal", lambda: rsi_signal(rsi_series), bars=n)
+        _case(results, "atr", lambda: atr(df, 14), bars=n)
+        _case(results, "atr_filter", lambda: atr_filter(atr_series, close), bars=n)
+        _case(results, "recent_breakout", lambda: recent_breakout(df, lookback=20), bars=n)
+        _case(results, "rejection_wick", lambda: rejection_wick(df, min_ratio=1.5), bars=n)
+
+    # Streaming variants: cost of one bar update, independent of history length
+    h, l, c = 1.1010, 1.0990, 1.1000
+    ema_state, rsi_state, atr_state, mean_state = IncrementalEMATrend(), IncrementalRSI(14), IncrementalATR(14), RollingMean(20)
+    _case(results, "IncrementalEMATrend.update", lambda: ema_state.update(c))
+    _case(results, "IncrementalRSI.update", lambda: rsi_state.update(c))
+    _case(results, "IncrementalATR.update", lambda: atr_state.update(h, l, c))
+    _case(results, "RollingMean.update", lambda: mean_state.update(c))
+    return results
+
+
+def bench_signals(sizes: Sequence[int], assets: int, sessions: int) -> List[Dict]:
+    from bot.signal_engine import AI_MODE_LOCAL, SignalEngine
+
+    engine = SignalEngine(mode=AI_MODE_LOCAL)
+    results: List[Dict] = []
+    for n in sizes:
+        df = synthetic_ohlcv(n)
+        df_trend = CandleBuilder.aggregate_timeframe(df, 300)
+        _case(results, "SignalEngine._confirm_all", lambda: engine._confirm_all(df, df_trend), bars=n)
+
+    # Many sessions: one _confirm_all per (asset, session) versus one vectorized scan per tick
+    frames = [synthetic_ohlcv(300, seed=i) for i in range(assets)]
+    trends = [synthetic_ohlcv(500, timeframe=300, seed=1000 + i) for i in range(assets)]
+
+    def per_session():
+        for _ in range(sessions):
+            for f, t in zip(frames, trends):
+                engine._confirm_all(f, t)
+
+    names = [f"A{i}" for i in range(assets)]
+    ohlcv, lengths = stack_frames(frames)
+    trend_close = np.stack([t["close"].to_numpy() for t in trends])
+    _case(results, "_confirm_all x assets x sessions", per_session, assets=assets, sessions=sessions)
+    _case(results, "batch_votes (all assets)", lambda: batch_votes(names, ohlcv, trend_close, lengths=lengths), assets=assets)
+    _case(results, "stack_frames (all assets)", lambda: stack_frames(frames), assets=assets)
+
+    # Per-candidate cost: snapshot construction and prompt encoding for the AI call
+    votes = batch_votes(names, ohlcv, trend_close, lengths=lengths)
+    snaps = [votes.snapshot(i) for i in range(assets)]
+    for i, snap in enumerate(snaps):
+        snap.update(market_type="OTC", asset=names[i], expiry_seconds=60)
+    _case(results, "BatchVotes.snapshot (all assets)", lambda: [votes.snapshot(i) for i in range(assets)], assets=assets)
+    _case(results, "encode (per snapshot)", lambda: [encode(s) for s in snaps], assets=assets)
+    _case(results, "encode_batch (all assets)", lambda: encode_batch(snaps), assets=assets)
+    return results
+
+
+_IMPORT_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, *[m for m in {heavy!r} if m in sys.modules])
+"""
+
+
+def bench_startup(repeat: int = 5) -> List[Dict]:
+    """Cold import of each entry point in a fresh interpreter, plus settings access."""
+    from bot.config import load_settings, reload_settings
+
+    results: List[Dict] = []
+    for module in STARTUP_MODULES:
+        code = _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)
+        runs: List[float] = []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+            runs.append(float(out[0]))
+        heavy = out[1:]
+        row = {"name": f"import {module}", "best_s": min(runs), "median_s": statistics.median(runs), "calls": repeat, "heavy": heavy}
+        results.append(row)
+        print(f"{row['name']:<34} {'heavy=' + ','.join(heavy or ['-']):<24} {1e3 * row['best_s']:>12.1f} ms", flush=True)
+
+    # Sessions read settings on creation: the cached instance versus re-reading env and ssid.txt
+    _case(results, "load_settings (cached)", load_settings)
+    _case(results, "reload_settings", reload_settings)
+    return results
+
+
+class FakePocketOptionClient:
+    """In-process AsyncPocketOptionClient stand-in: synthetic history plus scripted ticks."""
+
+    def __init__(self, **kwargs):
+        self._callbacks: Dict[str, List[Callable]] = {}
+        self.candle_requests = 0
+
+    def add_event_callback(self, event: str, cb: Callable) -> None:
+        self._callbacks.setdefault(event, []).append(cb)
+
+    async def connect(self) -> bool:
+        return True
+
+    async def disconnect(self) -> None:
+        return None
+
+    async def get_candles(self, asset: str, timeframe: int, count: int = 300, end_time=None) -> List[SyntheticCandle]:
+        self.candle_requests += 1
+        return synthetic_candles(count, asset=asset, timeframe=timeframe, seed=zlib.crc32(asset.encode()) % 1000)
+
+    async def emit(self, event: str, data: Any) -> None:
+        for cb in self._callbacks.get(event, []):
+            await cb(data)
+
+
+async def _tick_run(assets: int, sessions: int, rate: float, seconds: float, timeframe: int) -> Dict:
+    from bot.eval_scheduler import MODE_INTERVAL, EvaluationScheduler
+    from bot.market_hub import MarketHub
+    from bot.market_stream import MarketStream
+    from bot.multi_timeframe import trend_state
+    from bot.signal_engine import AI_MODE_LOCAL, SignalEngine
+
+    clients: List[FakePocketOptionClient] = []
+
+    def factory(**kwargs):
+        clients.append(FakePocketOptionClient(**kwargs))
+        return clients[-1]
+
+    hub = MarketHub(client_factory=factory)
+    hub.archives = None
+    engine = SignalEngine(mode=AI_MODE_LOCAL)
+    names = [f"BENCH{i:03d}_otc" for i in range(assets)]
+    schedulers: List[EvaluationScheduler] = []
+    streams: List[MarketStream] = []
+    states: List[Dict[str, Any]] = []
+    for name in names:
+        for _ in range(sessions):
+            stream = MarketStream(name, timeframe, hub=hub)
+            state: Dict[str, Any] = {}
+            states.append(state)
+
+            async def evaluate(state=state):
+                store = state.get("store")
+                if store is not None and len(store):
+                    engine._confirm_all(store.to_dataframe(), None, ema_info=trend_state(store).current())
+
+            sched = EvaluationScheduler(evaluate, mode=MODE_INTERVAL, interval_ms=1000)
+            stream.add_candle_callback(lambda store, state=state: state.__setitem__("store", store))
+            stream.add_stream_callback(lambda data, sched=sched: sched.on_tick(None))
+            schedulers.append(sched)
+            streams.append(stream)
+    for s in streams:
+        await s.connect()
+    # Wait for every feed loop to load its history
+    while not all("store" in st for st in states):
+        await asyncio.sleep(0.01)
+
+    client = clients[0]
+    loop = asyncio.get_running_loop()
+    price = {n: 1.1 for n in names}
+    rng = np.random.default_rng(0)
+    batch = max(1, int(rate * 0.01)) if rate else len(names)
+    latencies: List[float] = []
+    sent = 0
+    start = loop.time()
+    ts0 = time.time()
+    while loop.time() - start < seconds:
+        rows = []
+        for _ in range(batch):
+            name = names[sent % len(names)]
+            price[name] *= 1.0 + rng.normal(0.0, 1e-4)
+            rows.append([name, ts0 + (loop.time() - start), price[name]])
+            sent += 1
+        t = time.perf_counter()
+        await client.emit("stream_update", rows)
+        latencies.append((time.perf_counter() - t) / len(rows))
+        if rate:
+            ahead = sent / rate - (loop.time() - start)
+            if ahead > 0:
+                await asyncio.sleep(ahead)
+        else:
+            await asyncio.sleep(0)
+    elapsed = loop.time() - start
+    await asyncio.sleep(0.05)
+    for s in streams:
+        await s.disconnect()
+    for sched in schedulers:
+        await sched.close()
+
+    lat = np.array(latencies)
+    return {
+        "name": "tick_throughput",
+        "assets": assets,
+        "sessions": sessions,
+        "subscribers": len(streams),
+        "target_rate": rate,
+        "ticks": sent,
+        "seconds": round(elapsed, 3),
+        "ticks_per_s": round(sent / elapsed, 1),
+        "tick_handle_p50_us": round(1e6 * float(np.percentile(lat, 50)), 2),
+        "tick_handle_p99_us": round(1e6 * float(np.percentile(lat, 99)), 2),
+        "evaluations": sum(s.runs for s in schedulers),
+        "coalesced": sum(s.coalesced for s in schedulers),
+        "candle_requests": client.candle_requests,
+    }
+
+
+def bench_ticks(assets: int, sessions: int, rate: float, seconds: float, timeframe: int = 60) -> List[Dict]:
+    row = asyncio.run(_tick_run(assets, sessions, rate, seconds, timeframe))
+    print(
+        f"{'tick_throughput':<34} {row['subscribers']} subscribers: {row['ticks_per_s']:.0f} ticks/s,"
+        f" p50 {row['tick_handle_p50_us']:.1f} us/tick, {row['evaluations']} evaluations",
+        flush=True,
+    )
+    return [row]
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark the candle -> indicator -> signal pipeline.")
+    ap.add_argument("--only", action="append", choices=SECTIONS, help="run only these sections (repeatable)")
+    ap.add_argument("--sizes", default="300,10000", help="comma-separated bar counts")
+    ap.add_argument("--assets", type=int, default=30)
+    ap.add_argument("--sessions", type=int, default=10, help="sessions per asset")
+    ap.add_argument("--tick-rate", type=float, default=0.0, help="ticks per second to emit (0 = unthrottled)")
+    ap.add_argument("--tick-seconds", type=float, default=3.0)
+    ap.add_argument("--out", default="bench.json", help="results JSON file")
+    args = ap.parse_args(argv)
+
+    sections = args.only or list(SECTIONS)
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results: List[Dict] = []
+    if "candles" in sections:
+        results += bench_candles(sizes)
+    if "indicators" in sections:
+        results += bench_indicators(sizes)
+    if "signals" in sections:
+        results += bench_signals(sizes, args.assets, args.sessions)
+    if "ticks" in sections:
+        results += bench_ticks(args.assets, args.sessions, args.tick_rate, args.tick_seconds)
+    if "startup" in sections:
+        results += bench_startup()
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "args": vars(args), "results": results}, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
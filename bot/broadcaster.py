@@ -0,0 +1,220 @@
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from bot import metrics
+from bot.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Telegram rejects longer texts; batched messages are split below this
+MAX_MESSAGE_CHARS = 4096
+BATCH_SEPARATOR = "\n\n"
+
+_SEND_SECONDS = metrics.histogram("telegram_send_seconds", "Telegram send_message round-trip time")
+_DELIVERY_SECONDS = metrics.histogram("telegram_delivery_seconds", "Time from enqueue to delivered message")
+_SENT = metrics.counter("telegram_messages_sent_total", "Messages delivered (batched messages count individually)")
+_FAILED = metrics.counter("telegram_messages_failed_total", "Messages dropped after a non-retryable send error")
+_DROPPED = metrics.counter("telegram_messages_dropped_total", "Messages dropped because a chat queue was full")
+_RETRY_AFTER = metrics.counter("telegram_retry_after_total", "Flood-control (RetryAfter) responses")
+
+
+@dataclass
+class _Outgoing:
+    text: str
+    enqueued: float
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Seconds to back off for a flood-control error (telegram.error.RetryAfter), else None."""
+    value = getattr(exc, "retry_after", None)
+    if value is None:
+        return None
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Broadcaster:
+    """Fan-out send queue in front of the Telegram Bot API.
+
+    - publish() only enqueues, so the evaluation path never waits on Telegram
+    - One drain task sends round-robin over chats, each send taking a token from the
+      global bucket and from the chat's own bucket; sends run concurrently, one per chat
+    - Messages that pile up for a chat while it waits are merged into one send
+    - A RetryAfter response pauses all sending for its duration and requeues the batch;
+      other errors drop the batch (e.g. the user blocked the bot)
+    - Enqueue-to-delivery latency is kept for percentiles (see latency_percentiles)
+    """
+
+    def __init__(
+        self,
+        send: Callable[[int, str], Awaitable[None]],
+        global_rate: float = 25.0,
+        chat_rate: float = 1.0,
+        max_pending_per_chat: int = 50,
+    ):
+        self._send = send
+        self._global = TokenBucket(global_rate, max(1.0, global_rate))
+        self.chat_rate = chat_rate
+        self.max_pending_per_chat = max_pending_per_chat
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._queues: Dict[int, Deque[_Outgoing]] = {}
+        self._ready: Deque[int] = deque()
+        self._busy: Set[int] = set()
+        self._paused_until = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._drainer: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        self._latencies: Deque[float] = deque(maxlen=2048)
+
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retries = 0
+        self.batches = 0
+        metrics.gauge("telegram_queue_depth", "Messages waiting to be sent").set_function(self.pending)
+
+    def pending(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def publish(self, chat_ids: Iterable[int], text: str) -> int:
+        """Queue `text` for every chat; returns how many were queued. Never blocks."""
+        loop = asyncio.get_running_loop()
+        if self._drainer is None or self._drainer.done():
+            self._wakeup = asyncio.Event()
+            self._drainer = asyncio.create_task(self._drain())
+        now = loop.time()
+        n = 0
+        for chat_id in chat_ids:
+            q = self._queues.get(chat_id)
+            if q is None:
+                q = self._queues[chat_id] = deque()
+            if len(q) >= self.max_pending_per_chat:
+                q.popleft()
+                self.dropped += 1
+                _DROPPED.inc()
+            q.append(_Outgoing(text, now))
+            if chat_id not in self._busy and chat_id not in self._ready:
+                self._ready.append(chat_id)
+            n += 1
+        self.enqueued += n
+        self._wakeup.set()
+        return n
+
+    def _bucket(self, chat_id: int) -> TokenBucket:
+        b = self._buckets.get(chat_id)
+        if b is None:
+            b = self._buckets[chat_id] = TokenBucket(self.chat_rate, 1.0)
+        return b
+
+    def _next_chat(self) -> Tuple[Optional[int], float]:
+        """First ready chat whose own bucket has a token, else (None, shortest wait)."""
+        wait = float("inf")
+        for chat_id in self._ready:
+            d = self._bucket(chat_id).delay()
+            if d <= 0:
+                return chat_id, 0.0
+            wait = min(wait, d)
+        return None, wait
+
+    def _take_batch(self, chat_id: int) -> List[_Outgoing]:
+        q = self._queues[chat_id]
+        batch = [q.popleft()]
+        size = len(batch[0].text)
+        while q and size + len(BATCH_SEPARATOR) + len(q[0].text) <= MAX_MESSAGE_CHARS:
+            size += len(BATCH_SEPARATOR) + len(q[0].text)
+            batch.append(q.popleft())
+        return batch
+
+    async def _sleep_or_wake(self, timeout: float) -> None:
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            pause = self._paused_until - loop.time()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            if not self._ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            wait = self._global.delay()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            chat_id, wait = self._next_chat()
+            if chat_id is None:
+                # New chats or finished sends can make something ready sooner
+                await self._sleep_or_wake(wait)
+                continue
+            self._ready.remove(chat_id)
+            self._busy.add(chat_id)
+            self._global.take()
+            self._bucket(chat_id).take()
+            task = asyncio.create_task(self._send_batch(chat_id, self._take_batch(chat_id)))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _send_batch(self, chat_id: int, batch: List[_Outgoing]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            with _SEND_SECONDS.time():
+                await self._send(chat_id, BATCH_SEPARATOR.join(m.text for m in batch))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            retry = retry_after_seconds(e)
+            if retry is not None:
+                self.retries += 1
+                _RETRY_AFTER.inc()
+                self._paused_until = max(self._paused_until, loop.time() + retry)
+                self._queues[chat_id].extendleft(reversed(batch))
+                logger.warning(f"Telegram flood control: pausing sends for {retry:.1f}s")
+            else:
+                self.failed += len(batch)
+                _FAILED.inc(len(batch))
+                logger.exception(f"Failed to send {len(batch)} message(s) to {chat_id}")
+        else:
+            now = loop.time()
+            self.sent += len(batch)
+            self.batches += 1
+            _SENT.inc(len(batch))
+            for m in batch:
+                self._latencies.append(now - m.enqueued)
+                _DELIVERY_SECONDS.observe(now - m.enqueued)
+        finally:
+            self._busy.discard(chat_id)
+            if self._queues.get(chat_id):
+                self._ready.append(chat_id)
+            else:
+                self._queues.pop(chat_id, None)
+            self._wakeup.set()
+
+    def latency_percentiles(self) -> Dict[str, float]:
+        """Delivery latency (seconds) over the most recent messages."""
+        data = sorted(self._latencies)
+        if not data:
+            return {}
+        out = {f"p{int(q * 100)}": data[min(len(data) - 1, int(q * len(data)))] for q in (0.5, 0.95, 0.99)}
+        out["max"] = data[-1]
+        return out
+
+    async def close(self) -> None:
+        tasks = [t for t in (self._drainer, *self._running) if t is not None]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,143 @@
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from bot.ohlcv_buffer import FIELDS, TS
+
+logger = logging.getLogger(__name__)
+
+DTYPE = np.dtype("<f8")
+
+
+class CandleArchive:
+    """Columnar candle archive for one (asset, timeframe).
+
+    Layout: <root>/<ASSET>_<timeframe>/<field>.f8, one raw little-endian float64
+    file per OHLCV column. Closed bars newer than the last archived one are appended;
+    bars whose timestamp is already archived overwrite that row in place (backfill
+    corrections). Reads memory-map the column files, so loading deep history costs no
+    parsing and no copy until the caller slices it.
+    """
+
+    def __init__(self, root: str, asset: str, timeframe: int):
+        self.asset = asset
+        self.timeframe = timeframe
+        safe = "".join(ch if ch.isalnum() else "_" for ch in asset.upper())
+        self.path = os.path.join(root, f"{safe}_{timeframe}")
+        os.makedirs(self.path, exist_ok=True)
+        self._files = {name: os.path.join(self.path, f"{name}.f8") for name in FIELDS}
+        self._last_ts: Optional[float] = None
+        self._repair()
+
+    def _repair(self) -> None:
+        # Trim columns left uneven by an interrupted append so rows stay aligned
+        n = len(self)
+        for p in self._files.values():
+            if os.path.exists(p) and os.path.getsize(p) > n * DTYPE.itemsize:
+                logger.warning(f"Truncating torn archive column {p}")
+                with open(p, "r+b") as f:
+                    f.truncate(n * DTYPE.itemsize)
+
+    def __len__(self) -> int:
+        # A crash mid-append can leave columns uneven; the shortest one is authoritative
+        return min(
+            (os.path.getsize(p) if os.path.exists(p) else 0) // DTYPE.itemsize
+            for p in self._files.values()
+        )
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        if self._last_ts is None:
+            n = len(self)
+            if n:
+                self._last_ts = float(self._column("timestamp", n)[-1])
+        return self._last_ts
+
+    def _column(self, name: str, n: int) -> np.ndarray:
+        return np.memmap(self._files[name], dtype=DTYPE, mode="r", shape=(n,))
+
+    def columns(self, n: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Read-only memmap views of the newest n bars (all if None), per column."""
+        total = len(self)
+        if total == 0:
+            return {name: np.empty(0, dtype=DTYPE) for name in FIELDS}
+        n = total if n is None else min(n, total)
+        return {name: self._column(name, total)[total - n:] for name in FIELDS}
+
+    def window(self, n: Optional[int] = None) -> Tuple[np.ndarray, ...]:
+        """Newest n bars as per-field column views in OHLCVBuffer field order (index with TS, ...).
+
+        The newest bars are one contiguous range of every column file, so each entry is
+        a read-only memmap slice; nothing is copied or stacked.
+        """
+        cols = self.columns(n)
+        return tuple(cols[name] for name in FIELDS)
+
+    def _overwrite(self, bars: np.ndarray) -> int:
+        """Rewrite archived rows whose timestamp matches a bar in `bars` and whose values differ."""
+        n = len(self)
+        ts = self._column("timestamp", n)
+        idx = np.searchsorted(ts, bars[TS])
+        found = idx < n
+        found[found] = ts[idx[found]] == bars[TS, found]
+        idx, bars = idx[found], bars[:, found]
+        if not len(idx):
+            return 0
+        stored = np.stack([self._column(name, n)[idx] for name in FIELDS])
+        changed = (stored != bars).any(axis=0)
+        idx, bars = idx[changed], bars[:, changed]
+        if not len(idx):
+            return 0
+        # Timestamps match by construction, so only the value columns are written
+        for name in FIELDS:
+            if name == "timestamp":
+                continue
+            col = np.memmap(self._files[name], dtype=DTYPE, mode="r+", shape=(n,))
+            col[idx] = bars[FIELDS.index(name)]
+            col.flush()
+            del col
+        return len(idx)
+
+    def append(self, bars: np.ndarray) -> int:
+        """Store a (fields, n) block of closed bars; returns how many rows were written.
+
+        Bars newer than the archive are appended. Older bars overwrite the archived row
+        with the same timestamp when their values differ (e.g. a broker backfill
+        correcting tick-built bars); older bars with no archived row are dropped, since
+        the columns are append-only.
+        """
+        if bars.shape[1] == 0:
+            return 0
+        written = 0
+        last = self.last_timestamp
+        if last is not None:
+            old = bars[TS] <= last
+            if old.any():
+                written = self._overwrite(bars[:, old])
+                bars = bars[:, ~old]
+            if bars.shape[1] == 0:
+                return written
+        # Columns first, timestamp last; _repair() trims whatever a crash leaves behind
+        order = [name for name in FIELDS if name != "timestamp"] + ["timestamp"]
+        for name in order:
+            with open(self._files[name], "ab") as f:
+                f.write(np.ascontiguousarray(bars[FIELDS.index(name)], dtype=DTYPE).tobytes())
+        self._last_ts = float(bars[TS, -1])
+        return written + bars.shape[1]
+
+
+class ArchiveRegistry:
+    """Keeps one CandleArchive per (asset, timeframe) under a root directory."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._archives: Dict[Tuple[str, int], CandleArchive] = {}
+
+    def get(self, asset: str, timeframe: int) -> CandleArchive:
+        key = (asset, timeframe)
+        archive = self._archives.get(key)
+        if archive is None:
+            archive = self._archives[key] = CandleArchive(self.root, asset, timeframe)
+        return archive
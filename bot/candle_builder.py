@@ -1,12 +1,14 @@
 import pandas as pd
-from typing import List, Dict, Any
-from pocketoptionapi_async.models import Candle
+from typing import TYPE_CHECKING, List, Dict, Any
+
+if TYPE_CHECKING:
+    from pocketoptionapi_async.models import Candle
 
 class CandleBuilder:
     """Utility to convert PocketOption candles to pandas DataFrame and build multi-timeframe views."""
 
     @staticmethod
-    def to_dataframe(candles: List[Candle]) -> pd.DataFrame:
+    def to_dataframe(candles: List["Candle"]) -> pd.DataFrame:
         records = [
             {
                 "timestamp": c.timestamp,
@@ -0,0 +1,138 @@
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+from bot.ohlcv_buffer import CLOSE, TS, OHLCVBuffer
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Tick outcomes reported by CandleStore.on_tick
+TICK_IGNORED = "ignored"
+TICK_UPDATE = "update"
+TICK_CLOSE = "close"
+TICK_GAP = "gap"
+
+
+def epoch_seconds(ts) -> float:
+    # Also covers pd.Timestamp, a datetime subclass
+    if isinstance(ts, datetime):
+        return ts.timestamp()
+    return float(ts)
+
+
+class CandleStore:
+    """Rolling OHLCV history for one (asset, timeframe), kept current from stream ticks.
+
+    - History is loaded once; afterwards ticks update the forming bar and open new ones
+    - A skipped bucket or a reconnect flags the store for a get_candles backfill
+    - Bars live in an OHLCVBuffer with bucket-aligned timestamps
+    """
+
+    def __init__(self, asset: str, timeframe: int, capacity: int = 300):
+        self.asset = asset
+        self.timeframe = timeframe
+        self.capacity = capacity
+        self.bars = OHLCVBuffer(capacity, asset=asset)
+        self.loaded = False
+        self.needs_backfill = False
+        self.last_tick_at: Optional[float] = None
+        # Bumped whenever history is replaced or rewritten, so derived state knows to rebuild
+        self.generation = 0
+        # Per-feed state derived from the bars (e.g. incremental indicators), shared by subscribers
+        self.derived: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.bars)
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return int(self.bars.last(TS)) if len(self.bars) else None
+
+    @property
+    def last_price(self) -> Optional[float]:
+        return self.bars.last(CLOSE) if len(self.bars) else None
+
+    def _bucket(self, ts: float) -> int:
+        return int(ts // self.timeframe) * self.timeframe
+
+    def load(self, candles: Iterable) -> None:
+        """Replace the history with a get_candles result."""
+        self.bars.clear()
+        self.backfill(candles)
+        self.loaded = True
+
+    def seed(self, bars: Sequence[np.ndarray]) -> None:
+        """Warm-start from archived bars; a backfill still tops up the recent gap.
+
+        `bars` is a (fields, n) array or per-field columns such as CandleArchive.window().
+        """
+        self.bars.clear()
+        for row in zip(*(col[-self.capacity:] for col in bars)):
+            self.bars.append(*row)
+        self.loaded = len(self.bars) > 0
+        self.needs_backfill = True
+        self.generation += 1
+
+    def ensure_capacity(self, capacity: int) -> bool:
+        """Grow the history depth for a subscriber that needs more bars; True if it grew."""
+        if capacity <= self.capacity:
+            return False
+        bars = self.bars.window()
+        self.capacity = capacity
+        self.bars = OHLCVBuffer(capacity, asset=self.asset)
+        for row in bars.T:
+            self.bars.append(*row)
+        # The older bars only exist upstream
+        self.needs_backfill = True
+        self.generation += 1
+        return True
+
+    def backfill(self, candles: Iterable) -> None:
+        """Merge a get_candles result; broker bars win over tick-built ones."""
+        w = self.bars.window()
+        merged = {int(row[TS]): tuple(row) for row in w.T}
+        for c in candles:
+            ts = self._bucket(epoch_seconds(c.timestamp))
+            vol = c.volume if c.volume is not None else 0.0
+            merged[ts] = (ts, float(c.open), float(c.high), float(c.low), float(c.close), float(vol))
+        self.bars.clear()
+        for k in sorted(merged)[-self.capacity:]:
+            self.bars.append(*merged[k])
+        self.needs_backfill = False
+        self.generation += 1
+
+    def on_tick(self, ts: float, price: float) -> str:
+        """Fold one price tick into the store and report what happened."""
+        if not self.loaded:
+            return TICK_IGNORED
+        self.last_tick_at = time.monotonic()
+        bucket = self._bucket(ts)
+        gap = False
+        if len(self.bars):
+            last_ts = self.bars.last(TS)
+            if bucket < last_ts:
+                return TICK_IGNORED
+            if bucket == last_ts:
+                self.bars.update_last_price(price)
+                return TICK_UPDATE
+            gap = bucket > last_ts + self.timeframe
+        self.bars.append(bucket, price, price, price, price, 0.0)
+        if gap:
+            self.needs_backfill = True
+            return TICK_GAP
+        return TICK_CLOSE
+
+    def gap_bars(self) -> int:
+        """Bars to request when backfilling: enough to cover the outage, capped at capacity."""
+        if len(self.bars) < 2:
+            return self.capacity
+        steps = np.diff(self.bars.timestamps) // self.timeframe - 1
+        missing = int(steps[steps > 0].sum())
+        return min(self.capacity, missing + 2) if missing else self.capacity
+
+    def to_dataframe(self, closed_only: bool = False) -> "pd.DataFrame":
+        """History as a DataFrame; `closed_only` drops the forming bar."""
+        return self.bars.to_pandas(skip=1 if closed_only else 0)
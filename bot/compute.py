@@ -0,0 +1,199 @@
+import asyncio
+import dataclasses
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bot import metrics
+from bot.config import load_settings
+from bot.indicators.vectorized import BatchVotes, batch_votes
+
+logger = logging.getLogger(__name__)
+
+# Where indicator math runs (COMPUTE_EXECUTOR)
+COMPUTE_INLINE = "inline"    # on the event loop (original behaviour)
+COMPUTE_THREAD = "thread"    # thread pool; inputs are copied off the live buffers first
+COMPUTE_PROCESS = "process"  # process pool; scan blocks travel through shared memory
+COMPUTE_KINDS = (COMPUTE_INLINE, COMPUTE_THREAD, COMPUTE_PROCESS)
+
+_WAIT_SECONDS = metrics.histogram("compute_queue_wait_seconds", "Time a compute job waited for its key and a slot")
+_RUN_SECONDS = metrics.histogram("compute_run_seconds", "Time a compute job ran in the executor")
+_JOBS = metrics.counter("compute_jobs_total", "Jobs run on the compute executor")
+
+
+def _timed(fn: Callable, args: Tuple, kwargs: Dict) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _attach(name: str) -> SharedMemory:
+    try:
+        # 3.13+: leave tracking to the parent, which owns and unlinks the block
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        # Spawned workers report to the parent's resource tracker, so this registration is a no-op
+        return SharedMemory(name=name)
+
+
+def _detach(votes: BatchVotes) -> BatchVotes:
+    """Copy every array so nothing in the result still points into shared memory."""
+    for f in dataclasses.fields(votes):
+        value = getattr(votes, f.name)
+        if isinstance(value, np.ndarray):
+            setattr(votes, f.name, value.copy())
+    return votes
+
+
+def _scan_shared(name: str, shape: Tuple[int, ...], assets: Sequence[str], kwargs: Dict) -> BatchVotes:
+    """batch_votes over an ohlcv block the parent placed in shared memory."""
+    shm = _attach(name)
+    try:
+        ohlcv = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        votes = _detach(batch_votes(assets, ohlcv, None, **kwargs))
+        # The parent keeps its own copy of the block and puts it back on the result
+        votes.ohlcv = None
+        del ohlcv
+        return votes
+    finally:
+        shm.close()
+
+
+class ComputeExecutor:
+    """Runs indicator evaluation off the event loop.
+
+    - Jobs with the same key run one at a time, in submission order (per-asset or
+      per-channel ordering), whatever the number of workers
+    - At most `max_pending` jobs are queued or running; further submits wait. Only the
+      evaluating coroutine waits: tick ingestion never touches the executor, and each
+      channel's EvaluationScheduler coalesces triggers while its evaluation is pending
+    - Callers snapshot their inputs (stack_windows copies) before submitting, so workers
+      never read buffers that ticks are writing
+    - Process mode needs picklable, module-level functions; scan() hands the OHLCV block
+      over in shared memory instead of pickling it
+    """
+
+    def __init__(self, kind: str = COMPUTE_THREAD, workers: int = 2, max_pending: int = 64):
+        if kind not in COMPUTE_KINDS:
+            raise ValueError(f"Unknown COMPUTE_EXECUTOR {kind!r}; expected one of {COMPUTE_KINDS}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._pool: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tails: Dict[Hashable, asyncio.Future] = {}
+        self.pending = 0
+        self.jobs = 0
+        metrics.gauge("compute_pending", "Compute jobs queued or running").set_function(lambda: self.pending)
+
+    def _executor(self) -> Executor:
+        if self._pool is None:
+            if self.kind == COMPUTE_PROCESS:
+                # spawn: forking a process that runs an event loop and threads is unsafe
+                ctx = multiprocessing.get_context("spawn")
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="compute")
+        return self._pool
+
+    async def run(
+        self,
+        key: Hashable,
+        fn: Callable,
+        *args,
+        timer=None,
+        release: Optional[Callable[[], None]] = None,
+        **kwargs,
+    ) -> Any:
+        """Run fn(*args, **kwargs) after earlier jobs for `key`; `timer` also gets the run time.
+
+        `release` is called once the job can no longer touch its inputs: when it finishes
+        in the executor, even after the caller was cancelled, or at once if it never started.
+        """
+        if self.kind == COMPUTE_INLINE:
+            try:
+                result, elapsed = _timed(fn, args, kwargs)
+            finally:
+                if release is not None:
+                    release()
+            self._observe(elapsed, timer)
+            return result
+
+        loop = asyncio.get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        queued = loop.time()
+        prev = self._tails.get(key)
+        done = loop.create_future()
+        self._tails[key] = done
+        self.pending += 1
+        fut = None
+        try:
+            if prev is not None:
+                await asyncio.shield(prev)
+            await self._slots.acquire()
+            _WAIT_SECONDS.observe(loop.time() - queued)
+            fut = loop.run_in_executor(self._executor(), _timed, fn, args, kwargs)
+            # The slot is held until the job really finishes, even if the caller is cancelled
+            fut.add_done_callback(lambda _: self._slots.release())
+            if release is not None:
+                fut.add_done_callback(lambda _: release())
+            result, elapsed = await asyncio.shield(fut)
+            self._observe(elapsed, timer)
+            return result
+        finally:
+            if fut is None and release is not None:
+                release()
+            self.pending -= 1
+            done.set_result(None)
+            if self._tails.get(key) is done:
+                del self._tails[key]
+
+    def _observe(self, elapsed: float, timer) -> None:
+        self.jobs += 1
+        _JOBS.inc()
+        _RUN_SECONDS.observe(elapsed)
+        if timer is not None:
+            timer.observe(elapsed)
+
+    async def scan(self, key: Hashable, assets: Sequence[str], ohlcv: np.ndarray, timer=None, **kwargs) -> BatchVotes:
+        """batch_votes(assets, ohlcv, None, **kwargs) on the executor; `ohlcv` must be a private copy."""
+        if self.kind != COMPUTE_PROCESS:
+            return await self.run(key, batch_votes, assets, ohlcv, None, timer=timer, **kwargs)
+        block = np.ascontiguousarray(ohlcv, dtype=np.float64)
+        shm = SharedMemory(create=True, size=max(1, block.nbytes))
+
+        def release() -> None:
+            # Not before the worker is done: a cancelled caller must not pull the block from under it
+            shm.close()
+            shm.unlink()
+
+        try:
+            np.ndarray(block.shape, dtype=np.float64, buffer=shm.buf)[...] = block
+        except BaseException:
+            release()
+            raise
+        votes = await self.run(key, _scan_shared, shm.name, block.shape, list(assets), kwargs, timer=timer, release=release)
+        votes.ohlcv = block
+        return votes
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_compute: Optional[ComputeExecutor] = None
+
+
+def get_compute() -> ComputeExecutor:
+    global _compute
+    if _compute is None:
+        s = load_settings()
+        _compute = ComputeExecutor(s.compute_executor, s.compute_workers, s.compute_max_pending)
+    return _compute
@@ -1,7 +1,7 @@
 import os
 import sys
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
 
 from dotenv import load_dotenv
 
@@ -13,20 +13,80 @@ if os.path.isdir(PO_API_REPO) and PO_API_REPO not in sys.path:
 
 load_dotenv()
 
-@dataclass
+
+def _flag(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes")
+
+
+def _env(name: str, default: str, cast: Callable[[str], Any] = str) -> Any:
+    """Field read from the environment when Settings is built (not when this module is imported)."""
+    return field(default_factory=lambda: cast(os.getenv(name, default)))
+
+
+@dataclass(frozen=True)
 class Settings:
+    """Process configuration; read once and shared, see load_settings/reload_settings."""
+
     telegram_token: str
     openrouter_api_key: str
     openrouter_base_url: str = "https://openrouter.ai/api/v1"
-    deepseek_model: str = os.getenv("DEEPSEEK_MODEL", "deepseek/deepseek-chat")
+    deepseek_model: str = _env("DEEPSEEK_MODEL", "deepseek/deepseek-chat")
     pocket_option_ssid: Optional[str] = None
     is_demo: bool = True
-    log_file: str = os.getenv("LOG_FILE", "bot.log")
-    log_level: str = os.getenv("LOG_LEVEL", "INFO")
-    rate_limit_ai_qps: float = float(os.getenv("AI_QPS", "0.33"))  # ~1 call per 3s
+    log_file: str = _env("LOG_FILE", "bot.log")
+    log_level: str = _env("LOG_LEVEL", "INFO")
+    rate_limit_ai_qps: float = _env("AI_QPS", "0.33", float)  # ~1 call per 3s
+    ai_burst: int = _env("AI_BURST", "1", int)
+    ai_timeout_seconds: float = _env("AI_TIMEOUT", "20", float)
+    # Confirmation path: llm | local | prefilter | fallback (see bot.signal_engine)
+    ai_mode: str = _env("AI_MODE", "llm")
+    ai_latency_budget_ms: int = _env("AI_LATENCY_BUDGET_MS", "3000", int)
+    local_model_path: Optional[str] = _env("LOCAL_MODEL_PATH", "", lambda v: v or None)
+    ai_queue_depth: int = _env("AI_QUEUE_DEPTH", "64", int)
+    # Candidates confirmed together in one LLM request (1 = one per request), gathered for up to the window
+    ai_batch_size: int = _env("AI_BATCH_SIZE", "8", int)
+    ai_batch_window_ms: int = _env("AI_BATCH_WINDOW_MS", "250", int)
+    ai_cache_size: int = _env("AI_CACHE_SIZE", "1024", int)
+    ai_cache_ttl_seconds: float = _env("AI_CACHE_TTL", "60", float)
+    # Bars kept in memory per feed, and where closed bars are archived ("" disables)
+    candle_history_bars: int = _env("CANDLE_HISTORY_BARS", "300", int)
+    # Depth of the higher (trend) timeframe feed; EMA200 needs well over 200 bars to settle
+    trend_history_bars: int = _env("TREND_HISTORY_BARS", "500", int)
+    candle_archive_dir: str = _env("CANDLE_ARCHIVE_DIR", os.path.join(ROOT_DIR, "data", "candles"))
+    candle_fetch_concurrency: int = _env("CANDLE_FETCH_CONCURRENCY", "8", int)
+    # Durable session definitions resumed on restart ("" disables)
+    session_db_path: str = _env("SESSION_DB", os.path.join(ROOT_DIR, "data", "sessions.sqlite3"))
+    # When sessions re-evaluate: bar_close | interval | price_change
+    eval_mode: str = _env("EVAL_MODE", "interval")
+    eval_interval_ms: int = _env("EVAL_INTERVAL_MS", "1000", int)
+    eval_price_threshold: float = _env("EVAL_PRICE_THRESHOLD", "0.0002", float)  # relative move
+    # Where indicator math runs: inline (event loop) | thread | process (see bot.compute)
+    compute_executor: str = _env("COMPUTE_EXECUTOR", "thread")
+    compute_workers: int = _env("COMPUTE_WORKERS", "2", int)
+    compute_max_pending: int = _env("COMPUTE_MAX_PENDING", "64", int)
+    # Telegram send limits (per the Bot API: ~30 msg/s overall, ~1 msg/s per chat)
+    telegram_global_rate: float = _env("TELEGRAM_GLOBAL_RATE", "25", float)
+    telegram_chat_rate: float = _env("TELEGRAM_CHAT_RATE", "1", float)
+    # Update intake: polling | webhook (see bot.webhook); updates run concurrently, in order per user
+    telegram_mode: str = _env("TELEGRAM_MODE", "polling")
+    concurrent_updates: int = _env("CONCURRENT_UPDATES", "256", int)
+    webhook_listen: str = _env("WEBHOOK_LISTEN", "0.0.0.0")
+    webhook_port: int = _env("WEBHOOK_PORT", "8443", int)
+    webhook_path: str = _env("WEBHOOK_PATH", "/telegram")
+    webhook_url: str = _env("WEBHOOK_URL", "")  # public URL to register with Telegram; "" skips setWebhook
+    webhook_secret: str = _env("WEBHOOK_SECRET", "")
+    # Answer Bot API calls locally instead of calling Telegram (webhook load tests)
+    telegram_offline: bool = _env("TELEGRAM_OFFLINE", "false", _flag)
+    # Instrumentation; METRICS_PORT=0 keeps metrics in /status only
+    metrics_enabled: bool = _env("METRICS_ENABLED", "true", _flag)
+    metrics_host: str = _env("METRICS_HOST", "127.0.0.1")
+    metrics_port: int = _env("METRICS_PORT", "9108", int)
+    # Sharded mode: N worker processes own market data and evaluation (0 = everything in-process)
+    worker_processes: int = _env("WORKER_PROCESSES", "0", int)
+    worker_socket_dir: str = _env("WORKER_SOCKET_DIR", "")  # "" = fresh temp dir
 
 
-def load_settings() -> Settings:
+def _read_settings() -> Settings:
     # Prefer env var; fallback to ssid.txt first non-empty line
     ssid = os.getenv("POCKET_OPTION_SSID")
     if not ssid:
@@ -52,4 +112,23 @@ def load_settings() -> Settings:
         openrouter_base_url=base_url,
         pocket_option_ssid=ssid,
         is_demo=is_demo,
-    )
\ No newline at end of file
+    )
+
+
+_settings: Optional[Settings] = None
+
+
+def load_settings() -> Settings:
+    """The process-wide Settings, read from env/.env/ssid.txt on first use."""
+    global _settings
+    if _settings is None:
+        _settings = _read_settings()
+    return _settings
+
+
+def reload_settings() -> Settings:
+    """Re-read env (plus keys new to .env) and ssid.txt; objects built before keep their instance."""
+    global _settings
+    load_dotenv()
+    _settings = _read_settings()
+    return _settings
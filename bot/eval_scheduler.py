@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+MODE_BAR_CLOSE = "bar_close"
+MODE_INTERVAL = "interval"
+MODE_PRICE_CHANGE = "price_change"
+MODES = (MODE_BAR_CLOSE, MODE_INTERVAL, MODE_PRICE_CHANGE)
+
+
+class EvaluationScheduler:
+    """Decides when a session re-evaluates, so tick bursts don't pile up evaluations.
+
+    Modes:
+    - bar_close: once per closed trade bar (on_bar_close)
+    - interval: at most once every `interval_ms`; ticks in between coalesce into one trailing run
+    - price_change: when price moved by `price_threshold` (relative) since the last run
+
+    At most one evaluation runs at a time. Triggers that arrive while one is in flight
+    collapse into a single follow-up run; the ticks themselves are never queued.
+    """
+
+    def __init__(
+        self,
+        evaluate: Callable[[], Awaitable[None]],
+        mode: str = MODE_INTERVAL,
+        interval_ms: int = 1000,
+        price_threshold: float = 0.0002,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown evaluation mode {mode!r}; expected one of {MODES}")
+        self._evaluate = evaluate
+        self.mode = mode
+        self.interval = max(0, interval_ms) / 1000.0
+        self.price_threshold = price_threshold
+
+        self._task: Optional[asyncio.Task] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._pending = False
+        self._last_run = float("-inf")
+        self._last_price: Optional[float] = None
+        self._closed = False
+
+        # Counters for /status
+        self.triggers = 0
+        self.runs = 0
+        self.coalesced = 0
+
+    @property
+    def in_flight(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def on_tick(self, price: Optional[float]) -> None:
+        """Feed a stream tick; cheap and non-blocking."""
+        if self._closed:
+            return
+        if self.mode == MODE_INTERVAL:
+            self._schedule_interval()
+        elif self.mode == MODE_PRICE_CHANGE and price is not None:
+            ref = self._last_price
+            if ref is None or abs(price - ref) >= self.price_threshold * abs(ref):
+                self._last_price = price
+                self._trigger()
+
+    def on_bar_close(self) -> None:
+        if not self._closed and self.mode == MODE_BAR_CLOSE:
+            self._trigger()
+
+    def _schedule_interval(self) -> None:
+        if self._timer is not None:
+            self.coalesced += 1
+            return
+        loop = asyncio.get_running_loop()
+        delay = self._last_run + self.interval - loop.time()
+        if delay <= 0:
+            self._trigger()
+        else:
+            self._timer = loop.call_later(delay, self._fire_timer)
+
+    def _fire_timer(self) -> None:
+        self._timer = None
+        self._trigger()
+
+    def _trigger(self) -> None:
+        self.triggers += 1
+        if self.in_flight:
+            if self._pending:
+                self.coalesced += 1
+            self._pending = True
+            return
+        self._pending = True
+        self._task = asyncio.create_task(self._drain())
+
+    async def _drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending and not self._closed:
+            self._pending = False
+            self._last_run = loop.time()
+            self.runs += 1
+            try:
+                await self._evaluate()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Scheduled evaluation failed")
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.in_flight:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
@@ -1,6 +1,14 @@
-import pandas as pd
+import math
+from typing import TYPE_CHECKING, Optional
+
+from bot.indicators.rolling import RollingMean
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+def atr(df: "pd.DataFrame", period: int = 14) -> "pd.Series":
+    import pandas as pd
 
-def atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
     high = df["high"]
     low = df["low"]
     close = df["close"]
@@ -15,8 +23,36 @@ def atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
     ).max(axis=1)
     return tr.rolling(window=period).mean()
 
-def atr_filter(atr_series: pd.Series, close: pd.Series) -> dict:
+def atr_filter(atr_series: "pd.Series", close: "pd.Series") -> dict:
     val = atr_series.iloc[-1]
     rel = val / (close.iloc[-1] + 1e-9)  # relative ATR
     ok = 0.0005 < rel < 0.02  # reject too low/high volatility
-    return {"atr": val, "relative": rel, "valid": ok}
\ No newline at end of file
+    return {"atr": val, "relative": rel, "valid": ok}
+
+class IncrementalATR:
+    """Streaming `atr(df, period)`: O(1) per bar, with peek() for the forming bar."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._tr = RollingMean(period)
+        self._prev_close: Optional[float] = None
+        self.value = math.nan
+
+    def reset(self) -> None:
+        self._tr.reset()
+        self._prev_close = None
+        self.value = math.nan
+
+    def _true_range(self, high: float, low: float) -> float:
+        if self._prev_close is None:
+            return high - low
+        pc = self._prev_close
+        return max(high - low, abs(high - pc), abs(low - pc))
+
+    def peek(self, high: float, low: float) -> float:
+        return self._tr.peek(self._true_range(high, low))
+
+    def update(self, high: float, low: float, close: float) -> float:
+        self.value = self._tr.update(self._true_range(high, low))
+        self._prev_close = close
+        return self.value
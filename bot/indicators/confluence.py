@@ -0,0 +1,107 @@
+"""The confluence vote rules, shared by confirm_all, batch_votes and the backtest.
+
+`confluence` takes the readings of the bar being judged as scalars or same-shape
+arrays (one entry per asset, or per bar of a history), so the single-frame,
+multi-asset and whole-history paths apply one definition of the rules.
+"""
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+# Vote encoding; columns follow the order the votes are collected in
+CALL, PUT, NONE = 1, -1, 0
+VOTE_COLUMNS = ("ema", "rsi", "breakout", "reject")
+MIN_TRADE_BARS = 60
+
+
+@dataclass(frozen=True)
+class StrategyParams:
+    """Thresholds of the confluence rules; defaults are the live SignalEngine values."""
+
+    rsi_period: int = 14
+    ema_fast: int = 50
+    ema_slow: int = 200
+    atr_period: int = 14
+    atr_min: float = 0.0005
+    atr_max: float = 0.02
+    lookback: int = 20
+    min_ratio: float = 1.5
+    min_votes: int = 3
+    min_confidence: float = 70.0
+
+
+DEFAULT_PARAMS = StrategyParams()
+
+
+@dataclass
+class Votes:
+    """Per-entry outcome of `confluence`; `votes` has a trailing VOTE_COLUMNS axis."""
+
+    votes: np.ndarray
+    atr_valid: np.ndarray
+    breakout: np.ndarray
+    reject: np.ndarray
+    direction: np.ndarray
+
+
+def confluence(
+    ema_up: Any,
+    rsi: Any,
+    rsi_prev: Any,
+    atr_rel: Any,
+    open_: Any,
+    high: Any,
+    low: Any,
+    close: Any,
+    prior_high: Any,
+    prior_low: Any,
+    valid: Any = True,
+    params: StrategyParams = DEFAULT_PARAMS,
+) -> Votes:
+    """Vote CALL/PUT per indicator and derive the direction ("CALL", "PUT" or "").
+
+    `prior_high`/`prior_low` span the `params.lookback` bars before the judged one
+    (NaN when there are too few); `valid` masks out entries with too little history.
+    """
+    p = params
+    r, r_prev, rel = np.asarray(rsi), np.asarray(rsi_prev), np.asarray(atr_rel)
+    o, h, l, c = (np.asarray(x) for x in (open_, high, low, close))
+
+    # RSI momentum
+    rsi_vote = np.where((r > 50) & (r > r_prev), CALL, np.where((r < 50) & (r < r_prev), PUT, NONE))
+
+    # ATR volatility gate
+    atr_valid = (p.atr_min < rel) & (rel < p.atr_max)
+
+    # Structure: breakout of the prior `lookback` bars
+    high_break = (c > prior_high) & (c > o)
+    low_break = (c < prior_low) & (c < o)
+    breakout_vote = np.where(high_break, CALL, np.where(low_break, PUT, NONE))
+
+    # Structure: rejection wick on the judged bar
+    body = np.abs(c - o) + 1e-9
+    upper = h - np.maximum(c, o) + 1e-9
+    lower = np.minimum(c, o) - l + 1e-9
+    bull = (lower / body >= p.min_ratio) & (c > o)
+    bear = (upper / body >= p.min_ratio) & (c < o)
+    reject_vote = np.where(bull, CALL, np.where(bear, PUT, NONE))
+
+    # EMA trend always votes
+    ema_vote = np.where(ema_up, CALL, PUT)
+    votes = np.stack(np.broadcast_arrays(ema_vote, rsi_vote, breakout_vote, reject_vote), axis=-1).astype(np.int8)
+    calls = (votes == CALL).sum(axis=-1)
+    puts = (votes == PUT).sum(axis=-1)
+
+    gate = valid & atr_valid
+    direction = np.where(
+        gate & (calls >= p.min_votes) & (puts == 0), "CALL",
+        np.where(gate & (puts >= p.min_votes) & (calls == 0), "PUT", ""),
+    )
+    return Votes(
+        votes=votes,
+        atr_valid=atr_valid,
+        breakout=high_break | low_break,
+        reject=bull | bear,
+        direction=direction,
+    )
@@ -1,12 +1,63 @@
+from typing import TYPE_CHECKING
+
 import numpy as np
-import pandas as pd
 
-def ema(series: pd.Series, period: int) -> pd.Series:
+if TYPE_CHECKING:
+    import pandas as pd
+
+def ema(series: "pd.Series", period: int) -> "pd.Series":
     return series.ewm(span=period, adjust=False).mean()
 
-def ema_trend(close: pd.Series) -> dict:
-    ema50 = ema(close, 50)
-    ema200 = ema(close, 200)
+def ema_trend(close: "pd.Series", fast: int = 50, slow: int = 200) -> dict:
+    ema50 = ema(close, fast)
+    ema200 = ema(close, slow)
     trend = "up" if ema50.iloc[-1] > ema200.iloc[-1] else "down"
     strength = abs(ema50.iloc[-1] - ema200.iloc[-1]) / (ema200.iloc[-1] + 1e-9)
-    return {"ema50": ema50, "ema200": ema200, "trend": trend, "strength": strength}
\ No newline at end of file
+    return {"ema50": ema50, "ema200": ema200, "trend": trend, "strength": strength}
+
+class IncrementalEMA:
+    """Streaming `ema(series, period)`: O(1) per bar, with peek() for the forming bar."""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2.0 / (period + 1.0)
+        self.value = float("nan")
+        self.count = 0
+
+    def reset(self) -> None:
+        self.value = float("nan")
+        self.count = 0
+
+    def peek(self, x: float) -> float:
+        if self.count == 0:
+            return float(x)
+        return self.alpha * x + (1.0 - self.alpha) * self.value
+
+    def update(self, x: float) -> float:
+        self.value = self.peek(x)
+        self.count += 1
+        return self.value
+
+
+class IncrementalEMATrend:
+    """Streaming `ema_trend`: EMA50/EMA200 state committed on bar close."""
+
+    def __init__(self, fast: int = 50, slow: int = 200):
+        self.fast = IncrementalEMA(fast)
+        self.slow = IncrementalEMA(slow)
+
+    def reset(self) -> None:
+        self.fast.reset()
+        self.slow.reset()
+
+    @staticmethod
+    def _info(e_fast: float, e_slow: float) -> dict:
+        trend = "up" if e_fast > e_slow else "down"
+        strength = abs(e_fast - e_slow) / (e_slow + 1e-9)
+        return {"ema50": e_fast, "ema200": e_slow, "trend": trend, "strength": strength}
+
+    def update(self, close: float) -> dict:
+        return self._info(self.fast.update(close), self.slow.update(close))
+
+    def peek(self, close: float) -> dict:
+        return self._info(self.fast.peek(close), self.slow.peek(close))
@@ -1,8 +1,11 @@
-import pandas as pd
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Simple structure rules: recent high/low break and rejection wick logic
 
-def recent_breakout(df: pd.DataFrame, lookback: int = 10) -> dict:
+def recent_breakout(df: "pd.DataFrame", lookback: int = 10) -> dict:
     if df.empty or len(df) < lookback + 1:
         return {"break": False, "direction": "none"}
     recent = df.iloc[-lookback - 1 : -1]
@@ -12,7 +15,7 @@ def recent_breakout(df: pd.DataFrame, lookback: int = 10) -> dict:
     direction = "call" if high_break else ("put" if low_break else "none")
     return {"break": high_break or low_break, "direction": direction}
 
-def rejection_wick(df: pd.DataFrame, min_ratio: float = 1.5) -> dict:
+def rejection_wick(df: "pd.DataFrame", min_ratio: float = 1.5) -> dict:
     if df.empty:
         return {"rejection": False, "direction": "none"}
     last = df.iloc[-1]
@@ -0,0 +1,52 @@
+import math
+from collections import deque
+from typing import Deque
+
+
+class RollingMean:
+    """O(1) fixed-window mean, equivalent to pandas `rolling(window).mean()`.
+
+    NaN until the window is full. The running sum is re-derived once per window
+    to keep float drift bounded over long streams.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self._values: Deque[float] = deque(maxlen=window)
+        self._sum = 0.0
+        self._since_resync = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def reset(self) -> None:
+        self._values.clear()
+        self._sum = 0.0
+        self._since_resync = 0
+
+    def _next_sum(self, x: float) -> float:
+        if len(self._values) == self.window:
+            return self._sum - self._values[0] + x
+        return self._sum + x
+
+    def update(self, x: float) -> float:
+        self._sum = self._next_sum(x)
+        self._values.append(x)
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            self._sum = math.fsum(self._values)
+            self._since_resync = 0
+        return self.value
+
+    def peek(self, x: float) -> float:
+        """Mean as if x were appended, without committing it."""
+        filled = min(len(self._values) + 1, self.window)
+        if filled < self.window:
+            return math.nan
+        return self._next_sum(x) / self.window
+
+    @property
+    def value(self) -> float:
+        if len(self._values) < self.window:
+            return math.nan
+        return self._sum / self.window
@@ -1,14 +1,61 @@
-import pandas as pd
+import math
+from typing import TYPE_CHECKING, Optional
+
+from bot.indicators.rolling import RollingMean
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Standard RSI(14)
-def rsi(close: pd.Series, period: int = 14) -> pd.Series:
+def rsi(close: "pd.Series", period: int = 14) -> "pd.Series":
     delta = close.diff()
     gain = (delta.clip(lower=0)).rolling(window=period).mean()
     loss = (-delta.clip(upper=0)).rolling(window=period).mean()
     rs = gain / (loss + 1e-9)
     return 100 - (100 / (1 + rs))
 
-def rsi_signal(rsi_series: pd.Series) -> dict:
+def rsi_signal(rsi_series: "pd.Series") -> dict:
     r = rsi_series.iloc[-1]
     direction = "call" if r > 50 and r > rsi_series.iloc[-2] else ("put" if r < 50 and r < rsi_series.iloc[-2] else "none")
-    return {"rsi": r, "direction": direction}
\ No newline at end of file
+    return {"rsi": r, "direction": direction}
+
+class IncrementalRSI:
+    """Streaming `rsi(close, period)`: O(1) per bar, with peek() for the forming bar.
+
+    `previous` holds the RSI of the bar before the last committed one so
+    `rsi_signal`-style slope checks need no history.
+    """
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._gain = RollingMean(period)
+        self._loss = RollingMean(period)
+        self._prev_close: Optional[float] = None
+        self.value = math.nan
+        self.previous = math.nan
+
+    def reset(self) -> None:
+        self._gain.reset()
+        self._loss.reset()
+        self._prev_close = None
+        self.value = math.nan
+        self.previous = math.nan
+
+    @staticmethod
+    def _rsi(gain: float, loss: float) -> float:
+        rs = gain / (loss + 1e-9)
+        return 100 - (100 / (1 + rs))
+
+    def peek(self, close: float) -> float:
+        if self._prev_close is None:
+            return math.nan
+        delta = close - self._prev_close
+        return self._rsi(self._gain.peek(max(delta, 0.0)), self._loss.peek(max(-delta, 0.0)))
+
+    def update(self, close: float) -> float:
+        if self._prev_close is not None:
+            delta = close - self._prev_close
+            self.previous = self.value
+            self.value = self._rsi(self._gain.update(max(delta, 0.0)), self._loss.update(max(-delta, 0.0)))
+        self._prev_close = close
+        return self.value
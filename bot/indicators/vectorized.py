@@ -0,0 +1,200 @@
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bot.indicators.confluence import (
+    CALL,
+    DEFAULT_PARAMS,
+    MIN_TRADE_BARS,
+    NONE,
+    PUT,
+    VOTE_COLUMNS,
+    StrategyParams,
+    confluence,
+)
+from bot.ohlcv_buffer import CLOSE, FIELDS, HIGH, LOW, OPEN, TS
+from bot.snapshot import Snapshot
+
+
+def stack_windows(windows: Sequence[np.ndarray], n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Stack (fields, bars) windows into an (assets, fields, n) block.
+
+    Short rows are left-padded with their first bar, which leaves EMA(adjust=False)
+    unchanged; rows shorter than MIN_TRADE_BARS are masked out downstream anyway.
+    Returns the block and the real length of each row.
+    """
+    fields = windows[0].shape[0] if windows else len(FIELDS)
+    out = np.full((len(windows), fields, n), np.nan)
+    lengths = np.zeros(len(windows), dtype=np.int64)
+    for i, w in enumerate(windows):
+        m = min(n, w.shape[1])
+        lengths[i] = m
+        if m == 0:
+            continue
+        out[i, :, n - m:] = w[:, -m:]
+        out[i, :, :n - m] = w[:, -m, None]
+    return out, lengths
+
+
+def stack_series(series: Sequence[np.ndarray], n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """1-D variant of stack_windows, e.g. for trend-timeframe closes."""
+    out, lengths = stack_windows([np.asarray(s, dtype=np.float64)[None, :] for s in series], n)
+    return out[:, 0, :], lengths
+
+
+def stack_frames(frames: Sequence, n: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """stack_windows for CandleBuilder-style DataFrames."""
+    windows = [f[list(FIELDS)].to_numpy(dtype=np.float64).T if len(f) else np.empty((len(FIELDS), 0)) for f in frames]
+    if n is None:
+        n = max((w.shape[1] for w in windows), default=0)
+    return stack_windows(windows, n)
+
+
+def ema_last(close: np.ndarray, period: int) -> np.ndarray:
+    """Last value of `ema(close, period)` for every row, as one matrix-vector product."""
+    bars = close.shape[1]
+    a = 2.0 / (period + 1.0)
+    w = a * (1.0 - a) ** np.arange(bars - 1, -1, -1, dtype=np.float64)
+    w[0] = (1.0 - a) ** (bars - 1)
+    return close @ w
+
+
+def rsi_last2(close: np.ndarray, period: int = 14) -> Tuple[np.ndarray, np.ndarray]:
+    """Last and previous `rsi(close, period)` values per row."""
+    delta = np.diff(close[:, -(period + 2):], axis=1)
+    gain = np.clip(delta, 0, None)
+    loss = np.clip(-delta, 0, None)
+
+    def _rsi(g, l):
+        rs = g.mean(axis=1) / (l.mean(axis=1) + 1e-9)
+        return 100 - (100 / (1 + rs))
+
+    return _rsi(gain[:, -period:], loss[:, -period:]), _rsi(gain[:, -period - 1:-1], loss[:, -period - 1:-1])
+
+
+def atr_last(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """Last value of `atr(df, period)` per row."""
+    h = high[:, -period:]
+    l = low[:, -period:]
+    pc = close[:, -period - 1:-1]
+    tr = np.maximum(h - l, np.maximum(np.abs(h - pc), np.abs(l - pc)))
+    return tr.mean(axis=1)
+
+
+@dataclass
+class BatchVotes:
+    """Per-asset indicator readings and the (assets x VOTE_COLUMNS) vote matrix."""
+
+    assets: List[str]
+    votes: np.ndarray
+    valid: np.ndarray
+    atr_valid: np.ndarray
+    direction: np.ndarray
+    current_price: np.ndarray
+    ema_up: np.ndarray
+    ema_strength: np.ndarray
+    rsi: np.ndarray
+    atr_rel: np.ndarray
+    breakout: np.ndarray
+    reject: np.ndarray
+    ohlcv: Optional[np.ndarray] = None
+
+    @property
+    def call_votes(self) -> np.ndarray:
+        return (self.votes == CALL).sum(axis=1)
+
+    @property
+    def put_votes(self) -> np.ndarray:
+        return (self.votes == PUT).sum(axis=1)
+
+    def fired(self) -> np.ndarray:
+        return np.flatnonzero(self.direction != "")
+
+    def snapshot(self, i: int) -> Snapshot:
+        """Snapshot for row i, shaped like SignalEngine._confirm_all's."""
+        snap = Snapshot(
+            current_price=float(self.current_price[i]),
+            ema_trend="up" if self.ema_up[i] else "down",
+            ema_strength=float(self.ema_strength[i]),
+            rsi=float(self.rsi[i]),
+            atr_rel=float(self.atr_rel[i]),
+            breakout=bool(self.breakout[i]),
+            reject=bool(self.reject[i]),
+        )
+        if self.ohlcv is not None:
+            snap.bar_ts = int(self.ohlcv[i, TS, -1])
+            # A view into the scan's private block; last20() copies out only if asked
+            snap._window = self.ohlcv[i]
+        return snap
+
+    def candidates(self) -> Iterator[Tuple[str, Dict]]:
+        """(asset, {"direction", "snapshot"}) for every row that passed the vote rule."""
+        for i in self.fired():
+            yield self.assets[i], {"direction": str(self.direction[i]), "snapshot": self.snapshot(i)}
+
+
+def batch_votes(
+    assets: Sequence[str],
+    ohlcv: np.ndarray,
+    trend_close: Optional[np.ndarray],
+    lengths: Optional[np.ndarray] = None,
+    trend_lengths: Optional[np.ndarray] = None,
+    trend_ema: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    params: StrategyParams = DEFAULT_PARAMS,
+) -> BatchVotes:
+    """Vectorized `_confirm_all` over every asset at once (rules from `confluence`).
+
+    `ohlcv` is (assets, fields, bars) in OHLCVBuffer field order; `trend_close` is
+    (assets, trend_bars). Rows need at least `params.lookback + 1` and
+    `params.rsi_period + 2` bars. `trend_ema` supplies per-asset (fast, slow) EMAs
+    instead, e.g. from TrendState; NaN marks an asset without trend history.
+    """
+    n_assets = len(assets)
+    bars = ohlcv.shape[2]
+    if lengths is None:
+        lengths = np.full(n_assets, bars)
+
+    o = ohlcv[:, OPEN]
+    h = ohlcv[:, HIGH]
+    l = ohlcv[:, LOW]
+    c = ohlcv[:, CLOSE]
+    last_o, last_h, last_l, last_c = o[:, -1], h[:, -1], l[:, -1], c[:, -1]
+
+    # EMA trend on the confirmation timeframe
+    if trend_ema is not None:
+        e50, e200 = (np.asarray(e, dtype=np.float64) for e in trend_ema)
+        if trend_lengths is None:
+            trend_lengths = np.isfinite(e200).astype(np.int64)
+    else:
+        if trend_lengths is None:
+            trend_lengths = np.full(n_assets, trend_close.shape[1])
+        e50 = ema_last(trend_close, params.ema_fast)
+        e200 = ema_last(trend_close, params.ema_slow)
+    ema_up = e50 > e200
+    strength = np.abs(e50 - e200) / (e200 + 1e-9)
+
+    lookback = params.lookback
+    r, r_prev = rsi_last2(c, params.rsi_period)
+    rel = atr_last(h, l, c, params.atr_period) / (last_c + 1e-9)
+    prior_high = h[:, -lookback - 1:-1].max(axis=1)
+    prior_low = l[:, -lookback - 1:-1].min(axis=1)
+
+    valid = (lengths >= MIN_TRADE_BARS) & (trend_lengths > 0)
+    v = confluence(ema_up, r, r_prev, rel, last_o, last_h, last_l, last_c, prior_high, prior_low, valid=valid, params=params)
+
+    return BatchVotes(
+        assets=list(assets),
+        votes=v.votes,
+        valid=valid,
+        atr_valid=v.atr_valid,
+        direction=v.direction,
+        current_price=last_c,
+        ema_up=ema_up,
+        ema_strength=strength,
+        rsi=r,
+        atr_rel=rel,
+        breakout=v.breakout,
+        reject=v.reject,
+        ohlcv=ohlcv,
+    )
@@ -0,0 +1,84 @@
+import asyncio
+import dataclasses
+import json
+import logging
+import struct
+import zlib
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from bot.market_hub import normalize_asset
+from bot.markets import symbol_to_pocket_option
+from bot.signal_engine import Signal
+from bot.snapshot import Snapshot
+
+logger = logging.getLogger(__name__)
+
+# Frames between the Telegram process and market workers: 4-byte big-endian length + UTF-8 JSON.
+#   front -> worker: {"op": "join", "chat_id", "key", "market_type", "assets"}, {"op": "leave", "chat_id", "key"}
+#   worker -> front: {"op": "signal", "key", "chat_ids", "signal"}, {"op": "stats", "key", "stats"},
+#                    {"op": "ended", "key", "error"}
+_HEADER = struct.Struct("!I")
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def encode(msg: Dict[str, Any]) -> bytes:
+    body = json.dumps(msg, default=_default, separators=(",", ":")).encode()
+    return _HEADER.pack(len(body)) + body
+
+
+def write_frame(writer: asyncio.StreamWriter, msg: Dict[str, Any]) -> None:
+    """Queue one frame; the transport buffers it, so callers on the hot path never await."""
+    if not writer.is_closing():
+        writer.write(encode(msg))
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+    """Next frame, or None once the peer has closed the connection.
+
+    An oversized or undecodable frame also returns None: the stream is out of sync
+    after it, so callers handle it like a disconnect (the pool restarts the worker).
+    """
+    try:
+        (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+        if size > MAX_FRAME_BYTES:
+            raise ValueError(f"IPC frame of {size} bytes exceeds {MAX_FRAME_BYTES}")
+        msg = json.loads(await reader.readexactly(size))
+        if not isinstance(msg, dict):
+            raise ValueError(f"IPC frame is a {type(msg).__name__}, not an object")
+        return msg
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    except ValueError as e:
+        # Also JSONDecodeError and UnicodeDecodeError
+        logger.error(f"Dropping IPC connection after a bad frame: {e}")
+        return None
+
+
+def signal_to_dict(sig: Signal) -> Dict[str, Any]:
+    meta = sig.meta.to_dict() if isinstance(sig.meta, Snapshot) else sig.meta
+    return dataclasses.asdict(dataclasses.replace(sig, meta=meta))
+
+
+def signal_from_dict(d: Dict[str, Any]) -> Signal:
+    return Signal(**d)
+
+
+def shard_for(asset: str, shards: int) -> int:
+    """Worker that owns `asset`; stable across restarts and processes (unlike hash())."""
+    return zlib.crc32(normalize_asset(symbol_to_pocket_option(asset)).encode()) % shards
+
+
+def partition(assets: Sequence[str], shards: int) -> Dict[int, List[str]]:
+    """Split an asset list by owning worker, keeping each worker's assets in list order."""
+    out: Dict[int, List[str]] = {}
+    for a in assets:
+        out.setdefault(shard_for(a, shards), []).append(a)
+    return out
@@ -0,0 +1,193 @@
+"""Load driver: thousands of simulated Telegram sessions against a simulated broker.
+
+    python -m bot.loadtest --sessions 100,500,1000,2000 --assets 40 --tick-rate 4 \
+        --expiries 5,15,60 --disconnect-rate 0.5 --out loadtest.json
+
+Sessions are started through TelegramUI._run_stream_loop exactly as /start does,
+against a MarketHub whose client is a MarketSimulator (see bot.simulator), so the
+whole live path runs: hub fan-out, MarketStream callbacks, channel scheduling,
+the vectorized scan, confirmation (AI_MODE defaults to local here) and the
+Broadcaster, whose bot.send_message is replaced by a sleep of --send-latency.
+
+The session count ramps through --sessions. After each step settles, the driver
+measures event-loop lag, simulator emit lag, tick and evaluation rates and
+delivery latency over --step-seconds. The ramp stops at the first step whose p99
+loop lag or emit lag exceeds --lag-limit (the saturation point), unless --no-stop
+is given.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class _LoadBot:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.messages = 0
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> None:
+        await asyncio.sleep(self.latency)
+        self.messages += 1
+
+
+class _LoadApplication:
+    def __init__(self, latency: float):
+        self.bot = _LoadBot(latency)
+
+
+class _LoadContext:
+    """Just enough of telegram.ext.CallbackContext for _run_stream_loop."""
+
+    def __init__(self, app: _LoadApplication):
+        self.user_data: Dict[str, Any] = {}
+        self.bot = app.bot
+
+
+def _p(values: Sequence[float], q: float) -> float:
+    return float(np.percentile(values, q)) if len(values) else 0.0
+
+
+async def _probe_lag(samples: List[float], interval: float = 0.05) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - start - interval))
+
+
+async def run(args) -> Dict:
+    from bot.market_hub import MarketHub
+    from bot.metrics import get_metrics
+    from bot.simulator import MarketSimulator
+    from bot.telegram_ui import RuntimeSession, TelegramUI
+
+    assets = [f"SIM{i:03d}_otc" for i in range(args.assets)]
+    expiries = [int(e) for e in args.expiries.split(",")]
+    sim = MarketSimulator(
+        assets,
+        tick_rate=args.tick_rate,
+        disconnect_rate=args.disconnect_rate,
+        candle_latency=args.candle_latency,
+        seed=args.seed,
+    )
+    hub = MarketHub(client_factory=sim.client)
+    hub.archives = None
+    app = _LoadApplication(args.send_latency)
+    ui = TelegramUI(app, hub=hub)
+    metrics = get_metrics()
+
+    lag: List[float] = []
+    probe = asyncio.create_task(_probe_lag(lag))
+    tasks: List[asyncio.Task] = []
+    steps: List[Dict] = []
+    for target in (int(s) for s in args.sessions.split(",")):
+        while len(tasks) < target:
+            i = len(tasks)
+            ctx = _LoadContext(app)
+            ctx.user_data["session"] = RuntimeSession(
+                market_type="OTC",
+                asset_class="Forex",
+                asset=assets[i % len(assets)],
+                expiry_seconds=expiries[(i // len(assets)) % len(expiries)],
+            )
+            tasks.append(asyncio.create_task(ui._run_stream_loop(10_000 + i, ctx)))
+        await asyncio.sleep(args.warmup)
+
+        def totals() -> Dict[str, float]:
+            channels = ui.scanners.all()
+            return {
+                "ticks": sim.ticks,
+                "evaluations": sum(c.scheduler.runs for c in channels),
+                "coalesced": sum(c.scheduler.coalesced for c in channels),
+                "signals": sum(c.signals for c in channels),
+                "sent": ui.broadcaster.sent,
+            }
+
+        lag_from, emit_from = len(lag), len(sim.emit_lag)
+        before = totals()
+        start = time.perf_counter()
+        await asyncio.sleep(args.step_seconds)
+        elapsed = time.perf_counter() - start
+        after = totals()
+        window_lag = lag[lag_from:]
+        emit_lag = sim.emit_lag[emit_from:]
+        delivery = ui.broadcaster.latency_percentiles()
+        step = {
+            "sessions": len(tasks),
+            "channels": len(ui.scanners.all()),
+            "feeds": hub.feed_count(),
+            "ticks_per_s": round((after["ticks"] - before["ticks"]) / elapsed, 1),
+            "evaluations_per_s": round((after["evaluations"] - before["evaluations"]) / elapsed, 1),
+            "coalesced_per_s": round((after["coalesced"] - before["coalesced"]) / elapsed, 1),
+            "signals": after["signals"] - before["signals"],
+            "messages_sent": after["sent"] - before["sent"],
+            "send_queue": ui.broadcaster.pending(),
+            "loop_lag_p50_ms": round(1000 * _p(window_lag, 50), 2),
+            "loop_lag_p99_ms": round(1000 * _p(window_lag, 99), 2),
+            "emit_lag_p99_ms": round(1000 * _p(emit_lag, 99), 2),
+            "delivery_p99_ms": round(1000 * delivery.get("p99", 0.0), 1),
+            "stream_callback_p99_ms": round(1000 * metrics.get("stream_tick_callbacks_seconds").quantile(0.99), 3),
+            "scan_p99_ms": round(1000 * metrics.get("signal_scan_seconds").quantile(0.99), 3),
+            "disconnects": sim.disconnects,
+            "candle_requests": sim.candle_requests,
+        }
+        # Ticks are delivered inline, so a slow tick path shows up as emit lag before loop lag
+        step["saturated"] = max(step["loop_lag_p99_ms"], step["emit_lag_p99_ms"]) > 1000 * args.lag_limit
+        steps.append(step)
+        print(
+            f"{step['sessions']:>6} sessions {step['channels']:>4} channels | {step['ticks_per_s']:>8.0f} ticks/s"
+            f" {step['evaluations_per_s']:>7.0f} evals/s | loop lag p99 {step['loop_lag_p99_ms']:>7.1f} ms"
+            f" | emit lag p99 {step['emit_lag_p99_ms']:>7.1f} ms | sent {step['messages_sent']}"
+            + ("  SATURATED" if step["saturated"] else ""),
+            flush=True,
+        )
+        if step["saturated"] and not args.no_stop:
+            break
+
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    probe.cancel()
+    await ui.broadcaster.close()
+    await sim.stop()
+    saturated = next((s["sessions"] for s in steps if s["saturated"]), None)
+    return {"args": vars(args), "saturated_at_sessions": saturated, "steps": steps}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Ramp simulated sessions until the live path saturates.")
+    ap.add_argument("--sessions", default="100,500,1000,2000,5000", help="comma-separated session counts to ramp through")
+    ap.add_argument("--assets", type=int, default=40)
+    ap.add_argument("--expiries", default="5,15,60", help="comma-separated expiries sessions are spread over")
+    ap.add_argument("--tick-rate", type=float, default=4.0, help="ticks per second per asset")
+    ap.add_argument("--disconnect-rate", type=float, default=0.0, help="random disconnects per minute")
+    ap.add_argument("--candle-latency", type=float, default=0.05, help="simulated get_candles round trip (s)")
+    ap.add_argument("--send-latency", type=float, default=0.05, help="simulated Telegram send round trip (s)")
+    ap.add_argument("--warmup", type=float, default=3.0, help="seconds to settle after adding sessions")
+    ap.add_argument("--step-seconds", type=float, default=10.0)
+    ap.add_argument("--lag-limit", type=float, default=0.1, help="p99 loop/emit lag (s) that counts as saturated")
+    ap.add_argument("--no-stop", action="store_true", help="keep ramping past saturation")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="loadtest.json")
+    args = ap.parse_args(argv)
+
+    # Confirmation stays in-process unless the caller explicitly wants the LLM in the loop
+    os.environ.setdefault("AI_MODE", "local")
+    os.environ.setdefault("METRICS_PORT", "0")
+    os.environ.setdefault("SESSION_DB", "")
+
+    report = asyncio.run(run(args))
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saturated at {report['saturated_at_sessions']} sessions; wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
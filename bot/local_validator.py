@@ -0,0 +1,69 @@
+import json
+import math
+from typing import Any, Dict, Optional, Tuple
+
+# Features are signed toward the candidate direction so one weight vector serves CALL and PUT
+FEATURES = ("bias", "trend_agrees", "ema_strength", "rsi_momentum", "atr_rel", "breakout", "reject")
+
+# Hand-calibrated defaults: a clean 3-vote setup with some momentum lands around 80-90%,
+# a trend-only setup with flat RSI stays below the engine's 70% bar.
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    "bias": -0.5,
+    "trend_agrees": 1.0,
+    "ema_strength": 50.0,
+    "rsi_momentum": 2.0,
+    "atr_rel": 0.0,
+    "breakout": 0.6,
+    "reject": 0.4,
+}
+
+
+def features(s: Dict[str, Any], direction: str) -> Dict[str, float]:
+    sign = 1.0 if direction == "CALL" else -1.0
+    trend_up = s.get("ema_trend") == "up"
+    return {
+        "bias": 1.0,
+        "trend_agrees": 1.0 if trend_up == (sign > 0) else -1.0,
+        "ema_strength": float(s.get("ema_strength") or 0.0),
+        "rsi_momentum": sign * (float(s.get("rsi") or 50.0) - 50.0) / 50.0,
+        "atr_rel": float(s.get("atr_rel") or 0.0),
+        "breakout": 1.0 if s.get("breakout") else 0.0,
+        "reject": 1.0 if s.get("reject") else 0.0,
+    }
+
+
+class LogisticValidator:
+    """In-process confirmation scorer: a logistic model over the snapshot fields.
+
+    Scores the same inputs the AI prompt sees (ema_strength, rsi, atr_rel, breakout,
+    reject) in microseconds. Weights come from DEFAULT_WEIGHTS or a JSON file:
+    {"weights": {"bias": -0.5, "rsi_momentum": 2.0, ...}, "threshold": 0.7}
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, threshold: float = 0.7):
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        unknown = set(self.weights) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown validator features: {sorted(unknown)}")
+        self.threshold = threshold
+
+    @classmethod
+    def from_file(cls, path: str) -> "LogisticValidator":
+        with open(path, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        return cls(weights=spec.get("weights"), threshold=float(spec.get("threshold", 0.7)))
+
+    def score(self, snapshot: Dict[str, Any], direction: str) -> float:
+        """Probability that `direction` is right for this snapshot."""
+        x = features(snapshot, direction)
+        z = sum(w * x[name] for name, w in self.weights.items())
+        return 1.0 / (1.0 + math.exp(-z))
+
+    def confirm(self, snapshot: Dict[str, Any], direction: str) -> Tuple[str, float]:
+        """Same contract as AIConfirmation.confirm: (direction or NO_TRADE, confidence %)."""
+        p = self.score(snapshot, direction)
+        return (direction if p >= self.threshold else "NO_TRADE"), round(100.0 * p, 1)
+
+
+def load_validator(path: Optional[str] = None) -> LogisticValidator:
+    return LogisticValidator.from_file(path) if path else LogisticValidator()
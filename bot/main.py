@@ -2,9 +2,12 @@ import asyncio
 import logging
 from logging.handlers import RotatingFileHandler
 
-from telegram.ext import ApplicationBuilder
+from telegram.ext import Application, ApplicationBuilder
 
 from bot.config import load_settings
+from bot.metrics import serve_metrics
+from bot.sharding import WorkerPool
+from bot.webhook import OfflineRequest, PerUserUpdateProcessor, run_webhook
 from bot.telegram_ui import TelegramUI
 
 
@@ -24,17 +27,64 @@ def setup_logging(log_file: str, level: str = "INFO"):
     logger.addHandler(fh)
 
 
+async def run_polling(application: Application) -> None:
+    """Poll for updates until cancelled (Ctrl+C), inside the already running event loop.
+
+    Application.run_polling starts and closes its own loop, so it cannot run under
+    asyncio.run; this is its start/stop sequence, as run_webhook does for webhooks.
+    The post_init hook runs once the application is started.
+    """
+    async with application:
+        await application.start()
+        await application.updater.start_polling()
+        if application.post_init:
+            await application.post_init(application)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await application.updater.stop()
+            await application.stop()
+
+
 async def main():
     settings = load_settings()
     setup_logging(settings.log_file, settings.log_level)
 
-    app = ApplicationBuilder().token(settings.telegram_token).build()
+    async def post_init(application: Application) -> None:
+        # Sessions that were running before the restart pick up where they left off;
+        # `ui` is built below, before the application starts
+        await ui.resume_sessions()
+
+    builder = (
+        ApplicationBuilder()
+        .token(settings.telegram_token or ("0:offline" if settings.telegram_offline else ""))
+        .concurrent_updates(PerUserUpdateProcessor(settings.concurrent_updates))
+        .post_init(post_init)
+    )
+    if settings.telegram_offline:
+        builder = builder.request(OfflineRequest()).get_updates_request(OfflineRequest())
+    app = builder.build()
 
-    ui = TelegramUI(app)
+    # Sharded mode: market data and evaluation live in worker processes, polling stays here
+    workers = WorkerPool(settings.worker_processes, settings.worker_socket_dir) if settings.worker_processes > 0 else None
+    if workers:
+        await workers.start()
+
+    ui = TelegramUI(app, workers=workers)
     ui.setup()
 
-    # Run bot polling until Ctrl+C
-    await app.run_polling(close_loop=False)
+    # Prometheus scrape target for the hot-path timings (METRICS_PORT=0 disables)
+    await serve_metrics(settings.metrics_host, settings.metrics_port)
+
+    # Serve updates until Ctrl+C
+    try:
+        if settings.telegram_mode == "webhook":
+            await run_webhook(app, settings)
+        else:
+            await run_polling(app)
+    finally:
+        if workers:
+            await workers.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,342 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from bot import metrics
+from bot.candle_archive import ArchiveRegistry, CandleArchive
+from bot.candle_store import TICK_CLOSE, TICK_GAP, TICK_IGNORED, CandleStore
+from bot.config import load_settings
+from bot.ohlcv_buffer import TS
+
+if TYPE_CHECKING:
+    from pocketoptionapi_async import AsyncPocketOptionClient
+
+logger = logging.getLogger(__name__)
+
+FeedKey = Tuple[str, int]
+Tick = Tuple[str, float, float]
+
+RETRY_SECONDS = 5
+
+_TICKS = metrics.counter("market_ticks_total", "Price ticks received on the shared stream")
+_GET_CANDLES_SECONDS = metrics.histogram("get_candles_seconds", "PocketOption get_candles round-trip time")
+_GET_CANDLES_FAILURES = metrics.counter("get_candles_failures_total", "get_candles calls that raised")
+
+
+def pocket_option_client(**kwargs) -> "AsyncPocketOptionClient":
+    """The real broker client, imported on first connect rather than with this module."""
+    try:
+        # PocketOptionAPI cloned repo path is added in config
+        from pocketoptionapi_async import AsyncPocketOptionClient
+    except Exception as e:
+        raise RuntimeError("PocketOptionAPI import failed. Ensure repo is present and importable.") from e
+    return AsyncPocketOptionClient(**kwargs)
+
+
+def normalize_asset(asset: str) -> str:
+    # "EURUSD OTC", "EURUSD_otc" and "eurusd_otc" all name the same feed
+    return asset.replace(" ", "").replace("_", "").upper()
+
+
+def stream_ticks(data: Any) -> List[Tick]:
+    """Extract (asset, timestamp, price) ticks from a stream_update payload.
+
+    Handles the raw updateStream rows ([["EURUSD_otc", 1700000000.1, 1.0845], ...])
+    as well as dict payloads carrying asset/timestamp/price keys.
+    """
+    if isinstance(data, dict):
+        asset = data.get("asset")
+        price = data.get("price", data.get("value"))
+        ts = data.get("timestamp", data.get("time"))
+        if asset and price is not None and ts is not None:
+            try:
+                return [(str(asset), float(ts), float(price))]
+            except (TypeError, ValueError):
+                return []
+        return []
+    if not isinstance(data, (list, tuple)) or not data:
+        return []
+    rows = data if isinstance(data[0], (list, tuple)) else [data]
+    ticks: List[Tick] = []
+    for row in rows:
+        if len(row) >= 3 and isinstance(row[0], str):
+            try:
+                ticks.append((row[0], float(row[1]), float(row[2])))
+            except (TypeError, ValueError):
+                continue
+    return ticks
+
+
+@dataclass
+class _Feed:
+    store: CandleStore
+    subscribers: List[Any] = field(default_factory=list)
+    task: Optional[asyncio.Task] = None
+    resync: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def asset(self) -> str:
+        return self.store.asset
+
+    @property
+    def timeframe(self) -> int:
+        return self.store.timeframe
+
+    @property
+    def stale_after(self) -> int:
+        # Fall back to a get_candles refresh if the stream goes quiet for a few bars
+        return max(30, 3 * self.timeframe)
+
+
+class MarketHub:
+    """Process-wide market-data hub shared by every Telegram session.
+
+    - Owns a single persistent AsyncPocketOptionClient connection
+    - Keeps one feed per (asset, timeframe), reference-counted by its subscribers
+    - Sizes each feed to the deepest history any subscriber asked for (`history`)
+    - Loads each feed's history once, then keeps it current from stream_update ticks
+    - Backfills with get_candles only after a reconnect, a detected gap or a silent stream
+    - Warm-starts feeds from the on-disk CandleArchive and appends closed bars to it
+    - Runs at most CANDLE_FETCH_CONCURRENCY get_candles at once, so mass resumes don't storm
+    - Fans candle and stream_update events out to every subscriber of a feed
+    - Stops a feed when its last subscriber leaves, and disconnects with the last feed
+    """
+
+    def __init__(self, client_factory: Optional[Callable[..., Any]] = None):
+        self.settings = load_settings()
+        # Builds the broker client; benchmarks and load tests swap in a simulated one
+        self._client_factory = client_factory or pocket_option_client
+        self.client: Optional["AsyncPocketOptionClient"] = None
+        self._feeds: Dict[FeedKey, _Feed] = {}
+        self._lock = asyncio.Lock()
+        # Bounds concurrent get_candles so a restart or reconnect doesn't fire one per feed at once
+        self._fetch_slots = asyncio.Semaphore(max(1, self.settings.candle_fetch_concurrency))
+        root = self.settings.candle_archive_dir
+        self.archives: Optional[ArchiveRegistry] = ArchiveRegistry(root) if root else None
+        metrics.gauge("market_feeds", "Open (asset, timeframe) feeds").set_function(self.feed_count)
+
+    def feed_count(self) -> int:
+        return len(self._feeds)
+
+    def subscriber_count(self, asset: str, timeframe: int) -> int:
+        feed = self._feeds.get((normalize_asset(asset), timeframe))
+        return len(feed.subscribers) if feed else 0
+
+    async def subscribe(self, subscriber) -> bool:
+        """Attach a subscriber (anything with async `_emit_candles`/`_emit_stream`)."""
+        async with self._lock:
+            if not await self._ensure_connected():
+                return False
+            key = (normalize_asset(subscriber.asset), subscriber.timeframe)
+            depth = getattr(subscriber, "history", None) or self.settings.candle_history_bars
+            feed = self._feeds.get(key)
+            if feed is None:
+                store = CandleStore(subscriber.asset, subscriber.timeframe, capacity=depth)
+                feed = _Feed(store=store)
+                self._feeds[key] = feed
+                feed.task = asyncio.create_task(self._feed_loop(feed))
+                logger.info(f"Opened feed {feed.asset} @ {feed.timeframe}s")
+            elif feed.store.ensure_capacity(depth):
+                # A trade feed can double as another session's trend feed, which wants more bars
+                feed.resync.set()
+                logger.info(f"Deepened feed {feed.asset} @ {feed.timeframe}s to {depth} bars")
+            if subscriber not in feed.subscribers:
+                feed.subscribers.append(subscriber)
+            store = feed.store
+        # Late joiners get the current history right away instead of waiting for a bar close
+        if store.loaded:
+            await self._deliver(subscriber, "_emit_candles", store)
+        return True
+
+    async def unsubscribe(self, subscriber) -> None:
+        """Detach a subscriber; safe to call more than once."""
+        async with self._lock:
+            key = (normalize_asset(subscriber.asset), subscriber.timeframe)
+            feed = self._feeds.get(key)
+            if feed is None or subscriber not in feed.subscribers:
+                return
+            feed.subscribers.remove(subscriber)
+            if feed.subscribers:
+                return
+            del self._feeds[key]
+            if feed.task:
+                feed.task.cancel()
+            logger.info(f"Closed feed {feed.asset} @ {feed.timeframe}s")
+            if not self._feeds:
+                await self._disconnect()
+
+    async def _ensure_connected(self) -> bool:
+        if self.client is not None:
+            return True
+        if not self.settings.pocket_option_ssid and self._client_factory is pocket_option_client:
+            logger.error("Missing POCKET_OPTION_SSID. Configure .env or ssid.txt.")
+            return False
+        try:
+            client = self._client_factory(
+                ssid=self.settings.pocket_option_ssid,
+                is_demo=self.settings.is_demo,
+                enable_logging=False,
+                persistent_connection=True,
+            )
+        except RuntimeError as e:
+            logger.error(str(e))
+            return False
+        client.add_event_callback("stream_update", self._handle_stream_update)
+        client.add_event_callback("disconnected", self._handle_disconnected)
+        if not await client.connect():
+            logger.error("Failed to connect PocketOption client")
+            return False
+        self.client = client
+        logger.info("Connected shared PocketOption client")
+        return True
+
+    async def _disconnect(self) -> None:
+        client, self.client = self.client, None
+        if client:
+            try:
+                await client.disconnect()
+            except Exception:
+                logger.exception("PocketOption disconnect failed")
+
+    async def _handle_disconnected(self, data: Dict) -> None:
+        # persistent_connection lets the client reconnect on its own; resync history once it does
+        logger.warning("Shared PocketOption connection dropped; waiting for reconnect")
+        for feed in list(self._feeds.values()):
+            feed.store.needs_backfill = True
+            feed.resync.set()
+
+    def _feeds_for(self, asset: str) -> List[_Feed]:
+        norm = normalize_asset(asset)
+        return [f for (a, _), f in list(self._feeds.items()) if a == norm]
+
+    async def _handle_stream_update(self, data: Any) -> None:
+        ticks = stream_ticks(data)
+        if not ticks:
+            # Unknown payload shape: pass it through untouched
+            for feed in list(self._feeds.values()):
+                await self._fan_out(feed, "_emit_stream", data)
+            return
+        _TICKS.inc(len(ticks))
+        for asset, ts, price in ticks:
+            for feed in self._feeds_for(asset):
+                event = feed.store.on_tick(ts, price)
+                if event == TICK_IGNORED:
+                    continue
+                if event == TICK_GAP:
+                    feed.resync.set()
+                if event in (TICK_CLOSE, TICK_GAP):
+                    self._archive(feed)
+                    await self._fan_out(feed, "_emit_candles", feed.store)
+                await self._fan_out(feed, "_emit_stream", data)
+
+    async def _fetch(self, feed: _Feed, count: int):
+        try:
+            async with self._fetch_slots:
+                with _GET_CANDLES_SECONDS.time():
+                    return await self.client.get_candles(
+                        asset=feed.asset,
+                        timeframe=feed.timeframe,
+                        count=count,
+                    )
+        except Exception:
+            _GET_CANDLES_FAILURES.inc()
+            raise
+
+    def _archive_for(self, feed: _Feed) -> Optional[CandleArchive]:
+        return self.archives.get(normalize_asset(feed.asset), feed.timeframe) if self.archives else None
+
+    def _archive(self, feed: _Feed, full: bool = False) -> None:
+        """Write the feed's closed bars (never the forming one) to the disk archive.
+
+        On a bar close only the bars newer than the archive are passed, so the write is
+        O(1); `full` passes the whole closed window after a load or backfill, whose
+        corrected bars overwrite their archived rows.
+        """
+        archive = self._archive_for(feed)
+        if archive is None:
+            return
+        try:
+            bars = feed.store.bars.window(skip=1)
+            last = archive.last_timestamp
+            if not full and last is not None:
+                bars = bars[:, np.searchsorted(bars[TS], last, side="right"):]
+            archive.append(bars)
+        except OSError:
+            logger.exception(f"Archiving {feed.asset} @ {feed.timeframe}s failed")
+
+    def _warm_start(self, feed: _Feed) -> bool:
+        archive = self._archive_for(feed)
+        if archive is None or not len(archive):
+            return False
+        feed.store.seed(archive.window(feed.store.capacity))
+        logger.info(f"Warm-started {feed.asset} @ {feed.timeframe}s with {len(feed.store)} archived bars")
+        return feed.store.loaded
+
+    async def _feed_loop(self, feed: _Feed) -> None:
+        """Load history once, then backfill only when the tick stream can't be trusted."""
+        store = feed.store
+        if self._warm_start(feed):
+            # Subscribers see archived history right away; scanners wait for the backfill to close the gap
+            await self._fan_out(feed, "_emit_candles", store)
+            feed.resync.set()
+        while True:
+            try:
+                if not store.loaded:
+                    candles = await self._fetch(feed, store.capacity)
+                    if not candles:
+                        await asyncio.sleep(RETRY_SECONDS)
+                        continue
+                    store.load(candles)
+                    self._archive(feed, full=True)
+                    await self._fan_out(feed, "_emit_candles", store)
+                    continue
+
+                try:
+                    await asyncio.wait_for(feed.resync.wait(), timeout=feed.stale_after)
+                except asyncio.TimeoutError:
+                    last = store.last_tick_at
+                    if last is not None and time.monotonic() - last < feed.stale_after:
+                        continue
+                    logger.info(f"No ticks for {feed.asset} @ {feed.timeframe}s; backfilling")
+                feed.resync.clear()
+
+                candles = await self._fetch(feed, store.gap_bars())
+                if candles:
+                    store.backfill(candles)
+                    self._archive(feed, full=True)
+                    await self._fan_out(feed, "_emit_candles", store)
+                else:
+                    feed.resync.set()
+                    await asyncio.sleep(RETRY_SECONDS)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"get_candles failed for {feed.asset}; will retry")
+                if store.loaded:
+                    feed.resync.set()
+                await asyncio.sleep(RETRY_SECONDS)
+
+    async def _fan_out(self, feed: _Feed, method: str, payload: Any) -> None:
+        # Concurrent so one slow session does not hold back the others on the feed
+        await asyncio.gather(*(self._deliver(sub, method, payload) for sub in list(feed.subscribers)))
+
+    @staticmethod
+    async def _deliver(sub, method: str, payload: Any) -> None:
+        try:
+            await getattr(sub, method)(payload)
+        except Exception:
+            logger.exception(f"Subscriber {method} failed")
+
+
+_hub: Optional[MarketHub] = None
+
+
+def get_market_hub() -> MarketHub:
+    global _hub
+    if _hub is None:
+        _hub = MarketHub()
+    return _hub
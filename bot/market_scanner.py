@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bot import metrics
+from bot.config import load_settings
+from bot.eval_scheduler import MODE_BAR_CLOSE, MODE_INTERVAL, MODE_PRICE_CHANGE, EvaluationScheduler
+from bot.indicators.vectorized import stack_windows
+from bot.market_hub import MarketHub, get_market_hub
+from bot.markets import (
+    CRYPTO_ASSETS,
+    OTC_ASSETS_FOREX,
+    REAL_ASSETS_FOREX,
+    higher_timeframe_seconds,
+    symbol_to_pocket_option,
+)
+from bot.multi_timeframe import MultiTimeframeFeed
+from bot.ohlcv_buffer import CLOSE
+from bot.signal_engine import AI_MODE_LOCAL, Signal, SignalEngine
+
+logger = logging.getLogger(__name__)
+
+# (channel name, expiry_seconds): a /scan universe name, or "<market>:<asset>" for a /start session
+ScanKey = Tuple[str, int]
+PublishSignal = Callable[[List[int], Signal], None]
+
+_TICK_TO_SIGNAL = metrics.histogram("tick_to_signal_seconds", "Latest tick of an evaluation to its signal being queued")
+_SIGNALS = metrics.counter("signals_published_total", "Confirmed signals handed to the broadcaster")
+
+# /scan universes: name -> (market_type, assets)
+SCAN_UNIVERSES: Dict[str, Tuple[str, List[str]]] = {
+    "otc": ("OTC", OTC_ASSETS_FOREX),
+    "real": ("REAL", REAL_ASSETS_FOREX),
+    "crypto": ("REAL", CRYPTO_ASSETS),
+}
+
+
+class MarketScanner:
+    """Watches an asset list at one expiry and publishes whatever fires to its chats.
+
+    - One MultiTimeframeFeed per asset on the shared hub (no extra connections)
+    - Every evaluation screens all assets in a single SignalEngine.scan pass, using the
+      feeds' incremental trend state, so CPU does not grow with the number of chats
+    - Only candidates are confirmed, at most once per (asset, bar, direction)
+    - Shared by every chat watching the same channel: a /scan universe, or a single
+      asset for /start sessions, so each signal is computed once per (asset, expiry)
+    """
+
+    def __init__(
+        self,
+        market_type: str,
+        assets: Sequence[str],
+        expiry_seconds: int,
+        publish: PublishSignal,
+        engine: Optional[SignalEngine] = None,
+        hub: Optional[MarketHub] = None,
+    ):
+        settings = load_settings()
+        hub = hub or get_market_hub()
+        self.market_type = market_type
+        self.assets = list(assets)
+        self.expiry_seconds = expiry_seconds
+        self.engine = engine or SignalEngine()
+        self._publish = publish
+        self.chats: List[int] = []
+        trend_seconds = higher_timeframe_seconds(expiry_seconds)
+        self.feeds: Dict[str, MultiTimeframeFeed] = {
+            a: MultiTimeframeFeed(symbol_to_pocket_option(a), expiry_seconds, trend_seconds, hub=hub)
+            for a in self.assets
+        }
+        # Ticks of different assets aren't comparable, so multi-asset price_change scans on an interval
+        mode = settings.eval_mode
+        if mode == MODE_PRICE_CHANGE and len(self.assets) > 1:
+            mode = MODE_INTERVAL
+        self.scheduler = EvaluationScheduler(
+            self._evaluate,
+            mode=mode,
+            interval_ms=settings.eval_interval_ms,
+            price_threshold=settings.eval_price_threshold,
+        )
+        for feed in self.feeds.values():
+            feed.add_candle_callback(lambda store: self.scheduler.on_bar_close())
+            feed.add_stream_callback(lambda data, f=feed: self.scheduler.on_tick(f.last_price))
+        self._seen: Dict[str, Tuple[int, str]] = {}
+        self.task: Optional[asyncio.Task] = None
+
+        # Counters for /status
+        self.scans = 0
+        self.candidates = 0
+        self.signals = 0
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def run(self) -> None:
+        tasks = [asyncio.create_task(feed.run()) for feed in self.feeds.values()]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.scheduler.close()
+
+    @property
+    def ready_count(self) -> int:
+        return sum(1 for f in self.feeds.values() if f.ready)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for /status, as plain values so a worker process can ship them."""
+        sched = self.scheduler
+        out = {
+            "feeds": len(self.feeds),
+            "ready": self.ready_count,
+            "warm": sum(1 for f in self.feeds.values() if f.ready and not f.trade_store.needs_backfill),
+            "candles": sum(len(f.trade_store) for f in self.feeds.values() if f.trade_store is not None),
+            "scans": self.scans,
+            "candidates": self.candidates,
+            "signals": self.signals,
+            "evals": sched.runs,
+            "coalesced": sched.coalesced,
+            "mode": sched.mode,
+        }
+        ai = self.engine.ai_if_started if self.engine.mode != AI_MODE_LOCAL else None
+        if ai is not None:
+            out.update({
+                "ai_calls": ai.calls,
+                # Candidates sent to the LLM; above ai_calls when requests were batched
+                "ai_items": ai.queue.dispatched,
+                "ai_shared": ai.coalesced,
+                "ai_cache_hit": float(ai.cache.hit_rate),
+                "ai_queued": len(ai.queue),
+                "ai_dropped": ai.queue.dropped,
+                "ai_wait_avg": float(ai.queue.wait_avg),
+            })
+        return out
+
+    async def _evaluate(self) -> None:
+        # Skip assets whose history has a known gap (restart, reconnect) until it is backfilled
+        ready = [(a, f) for a, f in self.feeds.items() if f.ready and not f.trade_store.needs_backfill]
+        if not ready:
+            return
+        skip = 1 if self.scheduler.mode == MODE_BAR_CLOSE else 0
+        windows = [f.trade_store.bars.window(skip=skip) for _, f in ready]
+        n = max(w.shape[1] for w in windows)
+        if n == 0:
+            return
+        ohlcv, lengths = stack_windows(windows, n)
+        tick_at = max((f.trade_store.last_tick_at or 0.0) for _, f in ready)
+        e50 = np.full(len(ready), np.nan)
+        e200 = np.full(len(ready), np.nan)
+        for i, ((_, feed), w) in enumerate(zip(ready, windows)):
+            info = feed.trend_info(float(w[CLOSE, -1])) if w.shape[1] else None
+            if info is not None:
+                e50[i], e200[i] = info["ema50"], info["ema200"]
+
+        # Off the loop: ohlcv is already a copy, so ticks keep landing in the live buffers meanwhile
+        batch = await self.engine.scan_async(self, [a for a, _ in ready], ohlcv, lengths=lengths, trend_ema=(e50, e200))
+        self.scans += 1
+        fresh = []
+        for asset, base in batch.candidates():
+            mark = (base["snapshot"]["bar_ts"], base["direction"])
+            if self._seen.get(asset) == mark:
+                continue
+            # Marked up front so a scan overlapping this confirmation skips the candidate
+            self._seen[asset] = mark
+            fresh.append((asset, base, mark))
+        if not fresh:
+            return
+        self.candidates += len(fresh)
+        results = await asyncio.gather(*(
+            self.engine.judge_candidate(asset, self.expiry_seconds, base, self.market_type)
+            for asset, base, _ in fresh
+        ))
+        for (asset, _, mark), (sig, judged) in zip(fresh, results):
+            if not judged and self._seen.get(asset) == mark:
+                # No verdict (shed, timed out, rate-limited): the next scan in this bar asks again
+                del self._seen[asset]
+            if sig is None:
+                continue
+            self.signals += 1
+            _SIGNALS.inc()
+            if tick_at:
+                _TICK_TO_SIGNAL.observe(time.monotonic() - tick_at)
+            self._publish(list(self.chats), sig)
+
+
+class ScannerRegistry:
+    """One MarketScanner per channel (ScanKey), reference-counted by chat."""
+
+    def __init__(self, publish: PublishSignal, hub: Optional[MarketHub] = None):
+        self._publish = publish
+        self._hub = hub
+        self._scanners: Dict[ScanKey, MarketScanner] = {}
+
+    def get(self, key: ScanKey) -> Optional[MarketScanner]:
+        return self._scanners.get(key)
+
+    def all(self) -> List[MarketScanner]:
+        return list(self._scanners.values())
+
+    def items(self) -> List[Tuple[ScanKey, MarketScanner]]:
+        return list(self._scanners.items())
+
+    def join(
+        self,
+        chat_id: int,
+        key: ScanKey,
+        market_type: str,
+        assets: Sequence[str],
+    ) -> MarketScanner:
+        scanner = self._scanners.get(key)
+        if scanner is not None and scanner.task is not None and scanner.task.done():
+            # A crashed channel is replaced; its chats' sessions end with the old task
+            # and their leave() finds nothing to remove on the new one
+            error = None if scanner.task.cancelled() else scanner.task.exception()
+            logger.error(f"Replacing ended {key[0]} scanner @ {key[1]}s: {error!r}", exc_info=error)
+            scanner = None
+        if scanner is None:
+            scanner = MarketScanner(market_type, assets, key[1], self._publish, hub=self._hub)
+            self._scanners[key] = scanner
+            scanner.start()
+            logger.info(f"Started {key[0]} scanner over {len(assets)} assets @ {key[1]}s")
+        if chat_id not in scanner.chats:
+            scanner.chats.append(chat_id)
+        return scanner
+
+    async def leave(self, chat_id: int, key: ScanKey) -> None:
+        scanner = self._scanners.get(key)
+        if scanner is None or chat_id not in scanner.chats:
+            return
+        scanner.chats.remove(chat_id)
+        if not scanner.chats:
+            del self._scanners[key]
+            await scanner.stop()
+            logger.info(f"Stopped {key[0]} scanner @ {key[1]}s")
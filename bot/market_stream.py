@@ -2,121 +2,89 @@ import asyncio
 import logging
 from typing import Callable, Dict, List, Optional
 
-from bot.config import load_settings
-
-try:
-    # PocketOptionAPI cloned repo path is added in config
-    from pocketoptionapi_async import AsyncPocketOptionClient
-    from pocketoptionapi_async.models import TimeFrame, Candle
-except Exception as e:
-    raise RuntimeError("PocketOptionAPI import failed. Ensure repo is present and importable.") from e
+from bot import metrics
+from bot.candle_store import CandleStore
+from bot.market_hub import MarketHub, get_market_hub
 
 logger = logging.getLogger(__name__)
 
+_CANDLE_CB_SECONDS = metrics.histogram("stream_candle_callbacks_seconds", "Time in a session's candle callbacks per event")
+_STREAM_CB_SECONDS = metrics.histogram("stream_tick_callbacks_seconds", "Time in a session's stream callbacks per tick")
+
 class MarketStream:
-    """Event-driven market stream built on AsyncPocketOptionClient.
+    """Per-session view of an (asset, timeframe) feed on the shared MarketHub.
 
-    - Maintains a persistent websocket connection
-    - Requests candle streams via changeSymbol messages
-    - Emits updates through async callbacks
+    - Subscribes to the hub instead of opening its own websocket
+    - Emits the feed's CandleStore (on load, bar close, backfill) and raw stream updates
+    - Releases its hub reference on disconnect; the hub closes idle feeds
     - Auto-reconnects and region fallback handled by the API
     """
 
-    def __init__(self, asset: str, timeframe_seconds: int):
-        self.settings = load_settings()
+    def __init__(
+        self,
+        asset: str,
+        timeframe_seconds: int,
+        hub: Optional[MarketHub] = None,
+        history: Optional[int] = None,
+    ):
+        self.hub = hub or get_market_hub()
         self.asset = asset
         self.timeframe = timeframe_seconds
-        self.client: Optional[AsyncPocketOptionClient] = None
+        # Bars of history this view needs; None uses the hub default
+        self.history = history
         self._connected = asyncio.Event()
         self._stop = asyncio.Event()
 
         # Callbacks
-        self._on_candles: List[Callable[[List[Candle]], None]] = []
+        self._on_candles: List[Callable[[CandleStore], None]] = []
         self._on_stream: List[Callable[[Dict], None]] = []
 
-        # Internal refresh cadence to keep stream fresh
-        self._refresh_interval = max(2, min(10, self.timeframe // 2))
-
-    def add_candle_callback(self, cb: Callable[[List[Candle]], None]) -> None:
+    def add_candle_callback(self, cb: Callable[[CandleStore], None]) -> None:
         self._on_candles.append(cb)
 
     def add_stream_callback(self, cb: Callable[[Dict], None]) -> None:
         self._on_stream.append(cb)
 
     async def connect(self) -> bool:
-        if not self.settings.pocket_option_ssid:
-            logger.error("Missing POCKET_OPTION_SSID. Configure .env or ssid.txt.")
-            return False
-        self.client = AsyncPocketOptionClient(
-            ssid=self.settings.pocket_option_ssid,
-            is_demo=self.settings.is_demo,
-            enable_logging=False,
-            persistent_connection=True,
-        )
-        # Register high-level callbacks
-        self.client.add_event_callback("candles_received", self._handle_candles_received)
-        self.client.add_event_callback("stream_update", self._handle_stream_update)
-        self.client.add_event_callback("disconnected", self._handle_disconnected)
-
-        success = await self.client.connect()
+        success = await self.hub.subscribe(self)
         if success:
             self._connected.set()
-            logger.info(f"Connected to PocketOption for {self.asset} @ {self.timeframe}s")
+            logger.info(f"Subscribed to {self.asset} @ {self.timeframe}s")
             return True
-        logger.error("Failed to connect PocketOption client")
+        logger.error(f"Failed to subscribe to {self.asset} @ {self.timeframe}s")
         return False
 
     async def disconnect(self) -> None:
         self._stop.set()
-        if self.client:
-            await self.client.disconnect()
+        await self.hub.unsubscribe(self)
         self._connected.clear()
 
-    async def _handle_candles_received(self, data: Dict) -> None:
-        # The client resolves candle requests via futures; we still parse downstream by calling get_candles
-        pass
-
-    async def _handle_stream_update(self, data: Dict) -> None:
-        for cb in self._on_stream:
-            try:
-                res = cb(data)
-                if asyncio.iscoroutine(res):
-                    await res
-            except Exception:
-                logger.exception("Stream callback error")
-
-    async def subscribe(self) -> None:
-        """Starts periodic changeSymbol candle requests to maintain a live stream.
-        The API will respond via websocket with loadHistoryPeriod/updateStream.
-        """
-        await self._connected.wait()
-        assert self.client is not None
-
-        while not self._stop.is_set():
-            try:
-                candles = await self.client.get_candles(
-                    asset=self.asset,
-                    timeframe=self.timeframe,
-                    count=200,
-                )
-                if candles:
-                    for cb in self._on_candles:
-                        try:
-                            res = cb(candles)
-                            if asyncio.iscoroutine(res):
-                                await res
-                        except Exception:
-                            logger.exception("Candle callback error")
-            except Exception:
-                logger.exception("get_candles failed; will retry")
-            await asyncio.sleep(self._refresh_interval)
+    async def _emit_candles(self, store: CandleStore) -> None:
+        with _CANDLE_CB_SECONDS.time():
+            for cb in self._on_candles:
+                try:
+                    res = cb(store)
+                    if asyncio.iscoroutine(res):
+                        await res
+                except Exception:
+                    logger.exception("Candle callback error")
+
+    async def _emit_stream(self, data: Dict) -> None:
+        with _STREAM_CB_SECONDS.time():
+            for cb in self._on_stream:
+                try:
+                    res = cb(data)
+                    if asyncio.iscoroutine(res):
+                        await res
+                except Exception:
+                    logger.exception("Stream callback error")
 
     async def run(self) -> None:
-        """Run connection and subscription loop."""
+        """Subscribe and stay attached until disconnect() or cancellation."""
         try:
             ok = await self.connect()
             if not ok:
                 return
-            await self.subscribe()
+            await self._stop.wait()
         finally:
-            await self.disconnect()
\ No newline at end of file
+            await self.disconnect()
@@ -0,0 +1,42 @@
+# Asset universe, expiries and timeframe pairing shared by the UI, scanner and backtests
+
+REAL_ASSETS_FOREX = [
+    "EURUSD","GBPUSD","USDJPY","AUDUSD","USDCAD","USDCHF","EURGBP","EURJPY","GBPJPY","NZDUSD"
+]
+OTC_ASSETS_FOREX = [
+    "EURUSD OTC","GBPUSD OTC","USDJPY OTC","AUDUSD OTC","USDCAD OTC","USDCHF OTC","EURGBP OTC","EURJPY OTC","GBPJPY OTC","NZDUSD OTC"
+]
+CRYPTO_ASSETS = [
+    "BTCUSD","ETHUSD","BNBUSD","SOLUSD","XRPUSD","ADAUSD","DOGEUSD","LTCUSD","DOTUSD","AVAXUSD"
+]
+
+EXPIRIES_SECONDS = {
+    "5 seconds": 5,
+    "15 seconds": 15,
+    "30 seconds": 30,
+    "1 minute": 60,
+    "2 minutes": 120,
+    "3 minutes": 180,
+    "5 minutes": 300,
+}
+
+
+def higher_timeframe_seconds(s: int) -> int:
+    if s <= 5:
+        return 15
+    if s <= 15:
+        return 30
+    if s <= 30:
+        return 60
+    if s <= 60:
+        return 300
+    if s <= 120:
+        return 300
+    if s <= 180:
+        return 300
+    return 900
+
+
+def symbol_to_pocket_option(symbol: str) -> str:
+    # Simple mapping; adjust if API expects specific codes for OTC
+    return symbol
@@ -0,0 +1,280 @@
+"""Lightweight in-process metrics with a Prometheus text endpoint.
+
+Instruments are created once at import time by the modules they measure:
+
+    _CONFIRM_ALL = metrics.histogram("signal_confirm_all_seconds", "CPU time of SignalEngine._confirm_all")
+    with _CONFIRM_ALL.time():
+        ...
+
+With METRICS_ENABLED=false every factory returns one shared no-op instrument, so a
+disabled hot path costs a method call and nothing else.
+"""
+import asyncio
+import bisect
+import logging
+import math
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from bot.config import load_settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers a sub-millisecond indicator pass up to a slow AI call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Timer:
+    __slots__ = ("_hist", "_start")
+
+    def __init__(self, hist: "Histogram"):
+        self._hist = hist
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._hist.observe(time.perf_counter() - self._start)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+class _NullMetric:
+    """Stands in for every instrument when metrics are disabled."""
+
+    _timer = _NullTimer()
+    count = 0
+
+    def inc(self, amount: float = 1.0) -> None:
+        pass
+
+    def dec(self, amount: float = 1.0) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        pass
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def time(self) -> _NullTimer:
+        return self._timer
+
+    def quantile(self, q: float) -> float:
+        return float("nan")
+
+
+NULL = _NullMetric()
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def samples(self) -> List[Tuple[str, float]]:
+        return [(self.name, self.value)]
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.value = 0.0
+        self._fn: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        """Read the value from `fn` at scrape time instead of keeping it updated."""
+        self._fn = fn
+
+    def samples(self) -> List[Tuple[str, float]]:
+        value = self.value
+        if self._fn is not None:
+            try:
+                value = float(self._fn())
+            except Exception:
+                value = float("nan")
+        return [(self.name, value)]
+
+
+class Histogram:
+    """Fixed-bucket histogram; quantiles are interpolated within buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return float("nan")
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lo = self.bounds[i - 1] if i else 0.0
+                hi = self.bounds[i] if i < len(self.bounds) else lo
+                return lo + (hi - lo) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+    def samples(self) -> List[Tuple[str, float]]:
+        out = []
+        cumulative = 0
+        for bound, n in zip(self.bounds, self.counts):
+            cumulative += n
+            out.append((f'{self.name}_bucket{{le="{bound:g}"}}', cumulative))
+        out.append((f'{self.name}_bucket{{le="+Inf"}}', self.count))
+        out.append((f"{self.name}_sum", self.sum))
+        out.append((f"{self.name}_count", self.count))
+        return out
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, object] = {}
+
+    def _get(self, cls, name: str, help: str, **kw):
+        if not self.enabled:
+            return NULL
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, help, **kw)
+        return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def get(self, name: str):
+        return self._metrics.get(name, NULL)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for m in self._metrics.values():
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            for key, value in m.samples():
+                lines.append(f"{key} {_fmt(value)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, names: Sequence[str]) -> str:
+        """One-line p50/p95/p99 digest of the named histograms, for /status."""
+        parts = []
+        for name in names:
+            h = self._metrics.get(name)
+            if isinstance(h, Histogram) and h.count:
+                p = [1000.0 * h.quantile(q) for q in (0.5, 0.95, 0.99)]
+                parts.append(f"{name.replace('_seconds', '')} p50/p95/p99={p[0]:.0f}/{p[1]:.0f}/{p[2]:.0f}ms n={h.count}")
+        return " | ".join(parts)
+
+
+def _fmt(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return f"{value:.10g}"
+
+
+_registry: Optional[MetricsRegistry] = None
+
+
+def get_metrics() -> MetricsRegistry:
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry(enabled=load_settings().metrics_enabled)
+    return _registry
+
+
+def counter(name: str, help: str) -> Counter:
+    return get_metrics().counter(name, help)
+
+
+def gauge(name: str, help: str) -> Gauge:
+    return get_metrics().gauge(name, help)
+
+
+def histogram(name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return get_metrics().histogram(name, help, buckets)
+
+
+async def _handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Drain headers; the request line is all we route on
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request.decode("latin-1").split()
+        path = parts[1].split("?", 1)[0] if len(parts) > 1 else ""
+        if path == "/metrics":
+            status, body = "200 OK", get_metrics().render().encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_metrics(host: str, port: int) -> Optional[asyncio.AbstractServer]:
+    """Start the /metrics HTTP endpoint on the running loop (None if disabled)."""
+    if not get_metrics().enabled or not port:
+        return None
+    server = await asyncio.start_server(_handle_http, host, port)
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+import numpy as np
+
+from bot.candle_store import CandleStore
+from bot.config import load_settings
+from bot.indicators.ema import IncrementalEMATrend
+from bot.market_hub import MarketHub, get_market_hub
+from bot.market_stream import MarketStream
+from bot.ohlcv_buffer import CLOSE, TS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_TREND_KEY = "ema_trend"
+
+
+class TrendState:
+    """Incremental `ema_trend` over a trend-timeframe CandleStore.
+
+    - Closed bars are committed into EMA50/EMA200 once each, O(1) per bar close
+    - The forming bar is peeked at the caller's price, matching ema_trend on the full series
+    - Any history rewrite (load, backfill, seed, deepen) replays the store once
+    """
+
+    def __init__(self, store: CandleStore, fast: int = 50, slow: int = 200):
+        self.store = store
+        self.ema = IncrementalEMATrend(fast, slow)
+        self._generation = -1
+        self._last_ts: Optional[float] = None
+
+    def sync(self) -> None:
+        store = self.store
+        if store.generation != self._generation:
+            self.ema.reset()
+            self._last_ts = None
+            self._generation = store.generation
+        closed = store.bars.window(skip=1)
+        if not closed.shape[1]:
+            return
+        ts = closed[TS]
+        start = 0 if self._last_ts is None else int(np.searchsorted(ts, self._last_ts, side="right"))
+        for close in closed[CLOSE, start:]:
+            self.ema.update(float(close))
+        if start < ts.size:
+            self._last_ts = float(ts[-1])
+
+    def current(self, price: Optional[float] = None) -> Optional[Dict]:
+        """ema_trend info with the forming trend bar at `price` (default: its last tick)."""
+        if not len(self.store):
+            return None
+        self.sync()
+        return self.ema.peek(self.store.last_price if price is None else price)
+
+
+def trend_state(store: CandleStore) -> TrendState:
+    """The TrendState shared by every session reading this feed."""
+    state = store.derived.get(_TREND_KEY)
+    if state is None:
+        state = store.derived[_TREND_KEY] = TrendState(store)
+    return state
+
+
+class MultiTimeframeFeed:
+    """All timeframes one session evaluates on, each a native feed on the shared hub.
+
+    - The trade and trend timeframes are separate hub feeds built from the same ticks,
+      so no per-evaluation re-aggregation and each keeps its own history depth
+    - Candle callbacks fire for the trade timeframe; the trend feed only updates state
+    - Exposes the same callback/run/disconnect surface as MarketStream
+    """
+
+    def __init__(
+        self,
+        asset: str,
+        trade_seconds: int,
+        trend_seconds: int,
+        hub: Optional[MarketHub] = None,
+    ):
+        settings = load_settings()
+        hub = hub or get_market_hub()
+        self.asset = asset
+        self.timeframe = trade_seconds
+        self.trend_timeframe = trend_seconds
+        self.trade = MarketStream(asset, trade_seconds, hub=hub, history=settings.candle_history_bars)
+        self.trend = MarketStream(asset, trend_seconds, hub=hub, history=settings.trend_history_bars)
+        self.trade_store: Optional[CandleStore] = None
+        self.trend_store: Optional[CandleStore] = None
+        self._on_candles: List[Callable[[CandleStore], None]] = []
+        self.trade.add_candle_callback(self._trade_candles)
+        self.trend.add_candle_callback(self._trend_candles)
+
+    def add_candle_callback(self, cb: Callable[[CandleStore], None]) -> None:
+        self._on_candles.append(cb)
+
+    def add_stream_callback(self, cb: Callable[[Dict], None]) -> None:
+        self.trade.add_stream_callback(cb)
+
+    @property
+    def last_price(self) -> Optional[float]:
+        store = self.trade_store
+        return store.last_price if store is not None else None
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.trade_store and len(self.trade_store) and self.trend_store and len(self.trend_store))
+
+    async def _trade_candles(self, store: CandleStore) -> None:
+        self.trade_store = store
+        for cb in self._on_candles:
+            res = cb(store)
+            if asyncio.iscoroutine(res):
+                await res
+
+    def _trend_candles(self, store: CandleStore) -> None:
+        self.trend_store = store
+        trend_state(store).sync()
+
+    def trade_frame(self, closed_only: bool = False) -> "pd.DataFrame":
+        return self.trade_store.to_dataframe(closed_only=closed_only)
+
+    def trend_info(self, price: Optional[float] = None) -> Optional[Dict]:
+        """Higher-timeframe ema_trend, O(1) per call between trend bar closes."""
+        if self.trend_store is None:
+            return None
+        return trend_state(self.trend_store).current(price)
+
+    async def run(self) -> None:
+        """Attach both timeframes until disconnect() or cancellation."""
+        tasks = [asyncio.create_task(self.trade.run()), asyncio.create_task(self.trend.run())]
+        try:
+            # Either view ending (failed subscribe, disconnect) ends the session feed
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            await self.disconnect()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def disconnect(self) -> None:
+        await self.trade.disconnect()
+        await self.trend.disconnect()
@@ -0,0 +1,130 @@
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+FIELDS = ("timestamp", "open", "high", "low", "close", "volume")
+TS, OPEN, HIGH, LOW, CLOSE, VOLUME = range(len(FIELDS))
+
+
+class OHLCVBuffer:
+    """Fixed-capacity OHLCV ring buffer backed by a single NumPy block.
+
+    - Every bar is written twice (slot i and i + capacity), so the newest n bars are
+      always one contiguous slice: windows are zero-copy views
+    - append() and the update_last*() methods are O(1) and allocate nothing
+    - to_pandas() builds a DataFrame lazily and caches it until the next write
+    """
+
+    __slots__ = ("asset", "capacity", "_data", "_head", "_size", "_version", "_df", "_df_key")
+
+    def __init__(self, capacity: int, asset: str = ""):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.asset = asset
+        self.capacity = capacity
+        self._data = np.zeros((len(FIELDS), 2 * capacity), dtype=np.float64)
+        self._head = 0  # next slot to write
+        self._size = 0
+        self._version = 0
+        self._df: Optional["pd.DataFrame"] = None
+        self._df_key = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def version(self) -> int:
+        """Bumped on every write; lets readers cache derived values."""
+        return self._version
+
+    def clear(self) -> None:
+        self._head = 0
+        self._size = 0
+        self._version += 1
+
+    def _put(self, slot: int, field: int, value: float) -> None:
+        self._data[field, slot] = value
+        self._data[field, slot + self.capacity] = value
+
+    def _last_slot(self) -> int:
+        return (self._head - 1) % self.capacity
+
+    def append(self, ts: float, o: float, h: float, l: float, c: float, v: float = 0.0) -> None:
+        slot = self._head
+        self._put(slot, TS, ts)
+        self._put(slot, OPEN, o)
+        self._put(slot, HIGH, h)
+        self._put(slot, LOW, l)
+        self._put(slot, CLOSE, c)
+        self._put(slot, VOLUME, v)
+        self._head = (slot + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+        self._version += 1
+
+    def update_last(self, h: float, l: float, c: float, v: Optional[float] = None) -> None:
+        """Overwrite high/low/close (and optionally volume) of the newest bar."""
+        if not self._size:
+            raise IndexError("update_last on empty buffer")
+        slot = self._last_slot()
+        self._put(slot, HIGH, h)
+        self._put(slot, LOW, l)
+        self._put(slot, CLOSE, c)
+        if v is not None:
+            self._put(slot, VOLUME, v)
+        self._version += 1
+
+    def update_last_price(self, price: float) -> None:
+        """Fold a tick into the newest bar: extend the range and move the close."""
+        if not self._size:
+            raise IndexError("update_last_price on empty buffer")
+        slot = self._last_slot()
+        if price > self._data[HIGH, slot]:
+            self._put(slot, HIGH, price)
+        if price < self._data[LOW, slot]:
+            self._put(slot, LOW, price)
+        self._put(slot, CLOSE, price)
+        self._version += 1
+
+    def last(self, field: int) -> float:
+        if not self._size:
+            raise IndexError("last on empty buffer")
+        return float(self._data[field, self._last_slot()])
+
+    def window(self, n: Optional[int] = None, skip: int = 0) -> np.ndarray:
+        """View of the newest n bars (all if None) as a (fields, n) array, oldest first.
+
+        `skip` leaves out the newest bars, e.g. skip=1 for closed bars only.
+        """
+        avail = max(0, self._size - skip)
+        n = avail if n is None else max(0, min(n, avail))
+        end = self._head + self.capacity - min(skip, self._size)
+        return self._data[:, end - n:end]
+
+    def column(self, field: int, n: Optional[int] = None, skip: int = 0) -> np.ndarray:
+        return self.window(n, skip)[field]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.column(TS)
+
+    @property
+    def closes(self) -> np.ndarray:
+        return self.column(CLOSE)
+
+    def to_pandas(self, n: Optional[int] = None, skip: int = 0) -> "pd.DataFrame":
+        """DataFrame copy of the newest n bars with the CandleBuilder.to_dataframe columns."""
+        import pandas as pd
+
+        key = (self._version, n, skip)
+        if self._df is not None and self._df_key == key:
+            return self._df
+        w = self.window(n, skip)
+        df = pd.DataFrame({name: w[i].copy() for i, name in enumerate(FIELDS)})
+        df["timestamp"] = df["timestamp"].astype("int64")
+        df["asset"] = self.asset
+        self._df, self._df_key = df, key
+        return df
@@ -0,0 +1,38 @@
+import asyncio
+from typing import Optional
+
+
+class TokenBucket:
+    """Async token bucket: refills `rate` tokens per second, holds at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = max(1e-6, rate)
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        if self._updated is not None:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(asyncio.get_running_loop().time())
+        return max(0.0, (1.0 - self._tokens) / self.rate)
+
+    def take(self) -> None:
+        self._tokens -= 1.0
+
+    async def acquire(self) -> float:
+        """Take one token, sleeping until one is available. Returns seconds waited."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        async with self._lock:
+            wait = self.delay()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                self._refill(loop.time())
+            self.take()
+        return loop.time() - start
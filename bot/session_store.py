@@ -0,0 +1,96 @@
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from bot.config import load_settings
+
+logger = logging.getLogger(__name__)
+
+KIND_SESSION = "session"  # a /start stream: one asset at one expiry
+KIND_SCAN = "scan"        # a /scan subscription: `asset` holds the universe name
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    chat_id        INTEGER NOT NULL,
+    kind           TEXT    NOT NULL,
+    user_id        INTEGER NOT NULL,
+    market_type    TEXT    NOT NULL,
+    asset_class    TEXT    NOT NULL,
+    asset          TEXT    NOT NULL,
+    expiry_seconds INTEGER NOT NULL,
+    updated_at     REAL    NOT NULL,
+    PRIMARY KEY (chat_id, kind)
+)
+"""
+
+
+@dataclass
+class StoredSession:
+    chat_id: int
+    kind: str
+    user_id: int
+    market_type: str
+    asset_class: str
+    asset: str
+    expiry_seconds: int
+
+
+class SessionStore:
+    """Durable session definitions in a local SQLite file, so restarts can resume them.
+
+    - One row per (chat, kind): a chat has at most one /start stream and one /scan
+    - Only definitions are stored (no market state); writes happen on user commands,
+      so plain synchronous sqlite3 in WAL mode is cheap enough for the event loop
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(_SCHEMA)
+
+    def save(self, s: StoredSession) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (s.chat_id, s.kind, s.user_id, s.market_type, s.asset_class, s.asset, s.expiry_seconds, time.time()),
+        )
+
+    def delete(self, chat_id: int, kind: Optional[str] = None) -> None:
+        if kind is None:
+            self._db.execute("DELETE FROM sessions WHERE chat_id = ?", (chat_id,))
+        else:
+            self._db.execute("DELETE FROM sessions WHERE chat_id = ? AND kind = ?", (chat_id, kind))
+
+    def load_all(self) -> List[StoredSession]:
+        """Every stored session, ordered so rows sharing a channel are adjacent."""
+        rows = self._db.execute(
+            "SELECT chat_id, kind, user_id, market_type, asset_class, asset, expiry_seconds"
+            " FROM sessions ORDER BY kind, market_type, asset, expiry_seconds, chat_id"
+        ).fetchall()
+        return [StoredSession(*row) for row in rows]
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
+
+
+_store: Optional[SessionStore] = None
+
+
+def get_session_store() -> Optional[SessionStore]:
+    """The process-wide store, or None when SESSION_DB is empty (persistence disabled)."""
+    global _store
+    if _store is None:
+        path = load_settings().session_db_path
+        if not path:
+            return None
+        _store = SessionStore(path)
+    return _store
@@ -0,0 +1,280 @@
+"""Sharded mode: market workers in separate processes, Telegram routing in this one.
+
+With WORKER_PROCESSES=N the Telegram process no longer touches market data.
+WorkerPool starts N `python -m bot.worker` processes. Each one owns the assets that
+hash to it, along with their feeds, indicator math and AI confirmation. A CPU-heavy
+evaluation therefore stalls only its own shard and never Telegram polling.
+ShardedScannerRegistry stands in for ScannerRegistry in TelegramUI: joins and leaves
+are routed to the owning workers, and their signals come back to the Broadcaster.
+"""
+import asyncio
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from bot import ipc
+from bot.config import load_settings
+from bot.market_scanner import PublishSignal, ScanKey
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT_SECONDS = 30.0
+# Backoff before restarting a worker that died, doubled per consecutive failure
+RESTART_BACKOFF_SECONDS = (1.0, 30.0)
+
+
+class WorkerPool:
+    """Runs and supervises the worker processes; one Unix socket connection each.
+
+    - A worker that exits is restarted with backoff, and `on_restart(shard)` lets the
+      registry replay its channels, so a crash costs a resync rather than the sessions
+    - Each worker gets an equal share of AI_QPS (the LLM rate limit is global) and
+      its own METRICS_PORT after the front end's
+    """
+
+    def __init__(self, processes: int, socket_dir: str = ""):
+        if processes < 1:
+            raise ValueError("WorkerPool needs at least one process")
+        self.processes = processes
+        self.settings = load_settings()
+        self._own_dir = not socket_dir
+        self.socket_dir = socket_dir or tempfile.mkdtemp(prefix="ftb-")
+        self.on_message: Callable[[int, Dict[str, Any]], None] = lambda shard, msg: None
+        self.on_restart: Callable[[int], None] = lambda shard: None
+        self._procs: Dict[int, asyncio.subprocess.Process] = {}
+        self._writers: Dict[int, asyncio.StreamWriter] = {}
+        self._supervisors: List[asyncio.Task] = []
+        self.restarts = 0
+
+    def socket_path(self, shard: int) -> str:
+        return os.path.join(self.socket_dir, f"worker-{shard}.sock")
+
+    def shard_for(self, asset: str) -> int:
+        return ipc.shard_for(asset, self.processes)
+
+    def partition(self, assets: Sequence[str]) -> Dict[int, List[str]]:
+        return ipc.partition(assets, self.processes)
+
+    def _env(self, shard: int) -> Dict[str, str]:
+        env = dict(os.environ)
+        env["AI_QPS"] = str(self.settings.rate_limit_ai_qps / self.processes)
+        env["METRICS_PORT"] = str(self.settings.metrics_port + 1 + shard if self.settings.metrics_port else 0)
+        return env
+
+    async def start(self) -> None:
+        """Start every worker and wait until all of them accept connections."""
+        os.makedirs(self.socket_dir, exist_ok=True)
+        ready = [asyncio.get_running_loop().create_future() for _ in range(self.processes)]
+        self._supervisors = [asyncio.create_task(self._supervise(i, ready[i])) for i in range(self.processes)]
+        await asyncio.gather(*ready)
+        logger.info(f"Started {self.processes} market workers (sockets in {self.socket_dir})")
+
+    async def _spawn(self, shard: int) -> asyncio.StreamReader:
+        path = self.socket_path(shard)
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "bot.worker", "--index", str(shard), "--socket", path, env=self._env(shard)
+        )
+        self._procs[shard] = proc
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + CONNECT_TIMEOUT_SECONDS
+        while True:
+            if proc.returncode is not None:
+                raise RuntimeError(f"Worker {shard} exited with code {proc.returncode} during startup")
+            try:
+                reader, writer = await asyncio.open_unix_connection(path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if loop.time() > deadline:
+                    proc.kill()
+                    raise RuntimeError(f"Worker {shard} did not listen on {path} within {CONNECT_TIMEOUT_SECONDS:.0f}s")
+                await asyncio.sleep(0.1)
+        self._writers[shard] = writer
+        return reader
+
+    async def _supervise(self, shard: int, ready: asyncio.Future) -> None:
+        backoff = RESTART_BACKOFF_SECONDS[0]
+        while True:
+            try:
+                reader = await self._spawn(shard)
+            except Exception as e:
+                if not ready.done():
+                    ready.set_exception(e)
+                    return
+                logger.exception(f"Restarting worker {shard} failed")
+            else:
+                if not ready.done():
+                    ready.set_result(None)
+                else:
+                    self.restarts += 1
+                    self.on_restart(shard)
+                backoff = RESTART_BACKOFF_SECONDS[0]
+                while (msg := await ipc.read_frame(reader)) is not None:
+                    try:
+                        self.on_message(shard, msg)
+                    except Exception:
+                        logger.exception(f"Handling {msg.get('op')!r} from worker {shard} failed")
+                logger.warning(f"Worker {shard} disconnected; restarting in {backoff:.0f}s")
+            await self._stop_worker(shard)
+            await asyncio.sleep(backoff)
+            backoff = min(2 * backoff, RESTART_BACKOFF_SECONDS[1])
+
+    async def _stop_worker(self, shard: int) -> None:
+        writer = self._writers.pop(shard, None)
+        if writer is not None:
+            writer.close()
+        proc = self._procs.pop(shard, None)
+        if proc is None or proc.returncode is not None:
+            return
+        try:
+            await asyncio.wait_for(proc.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+
+    def send(self, shard: int, msg: Dict[str, Any]) -> None:
+        """Fire-and-forget; while a worker restarts, messages are dropped and replayed from state."""
+        writer = self._writers.get(shard)
+        if writer is not None:
+            ipc.write_frame(writer, msg)
+
+    async def close(self) -> None:
+        for t in self._supervisors:
+            t.cancel()
+        await asyncio.gather(*self._supervisors, return_exceptions=True)
+        # Closing the socket is the shutdown signal: workers stop their channels and exit
+        await asyncio.gather(*(self._stop_worker(i) for i in list(self._procs)), return_exceptions=True)
+        if self._own_dir:
+            shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+
+class RemoteScanner:
+    """Front-end view of a channel whose MarketScanners run in one or more workers.
+
+    Mirrors what TelegramUI reads from a MarketScanner: `assets`, `chats`, `task`
+    (awaited by session loops; fails if a worker reports the channel crashed) and
+    stats() (counters pushed by the workers, summed over shards).
+    """
+
+    def __init__(self, key: ScanKey, market_type: str, assets: Sequence[str], shards: Dict[int, List[str]]):
+        self.key = key
+        self.market_type = market_type
+        self.assets = list(assets)
+        self.expiry_seconds = key[1]
+        self.shards = shards
+        self.chats: List[int] = []
+        self.task: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._stats: Dict[int, Dict[str, Any]] = {}
+
+    def stats(self) -> Dict[str, Any]:
+        # Counters add up across shards; rates and averages (floats) report the worst shard
+        out: Dict[str, Any] = {}
+        for s in self._stats.values():
+            for k, v in s.items():
+                if isinstance(v, str):
+                    out.setdefault(k, v)
+                elif isinstance(v, float):
+                    out[k] = max(out.get(k, v), v)
+                else:
+                    out[k] = out.get(k, 0) + v
+        out.setdefault("feeds", len(self.assets))
+        return out
+
+    def _finish(self, error: Optional[str] = None) -> None:
+        if self.task.done():
+            return
+        if error:
+            self.task.set_exception(RuntimeError(f"Channel {self.key} failed in a worker: {error}"))
+        else:
+            self.task.set_result(None)
+
+
+class ShardedScannerRegistry:
+    """ScannerRegistry over a WorkerPool: same join/leave/get/all, channels split by shard."""
+
+    def __init__(self, publish: PublishSignal, pool: WorkerPool):
+        self._publish = publish
+        self.pool = pool
+        self._scanners: Dict[ScanKey, RemoteScanner] = {}
+        pool.on_message = self._on_message
+        pool.on_restart = self._on_restart
+
+    def get(self, key: ScanKey) -> Optional[RemoteScanner]:
+        return self._scanners.get(key)
+
+    def all(self) -> List[RemoteScanner]:
+        return list(self._scanners.values())
+
+    def items(self) -> List[Tuple[ScanKey, RemoteScanner]]:
+        return list(self._scanners.items())
+
+    def _join_msg(self, chat_id: int, scanner: RemoteScanner, assets: List[str]) -> Dict[str, Any]:
+        return {
+            "op": "join",
+            "chat_id": chat_id,
+            "key": list(scanner.key),
+            "market_type": scanner.market_type,
+            "assets": assets,
+        }
+
+    def join(
+        self,
+        chat_id: int,
+        key: ScanKey,
+        market_type: str,
+        assets: Sequence[str],
+    ) -> RemoteScanner:
+        scanner = self._scanners.get(key)
+        if scanner is not None and scanner.task.done():
+            # Ended in its worker; the join frames below make the worker replace it too
+            error = None if scanner.task.cancelled() else scanner.task.exception()
+            logger.error(f"Replacing ended {key[0]} channel @ {key[1]}s: {error!r}")
+            scanner = None
+        if scanner is None:
+            scanner = RemoteScanner(key, market_type, assets, self.pool.partition(assets))
+            self._scanners[key] = scanner
+            logger.info(f"Started {key[0]} channel over {len(assets)} assets @ {key[1]}s on shards {sorted(scanner.shards)}")
+        if chat_id not in scanner.chats:
+            scanner.chats.append(chat_id)
+            for shard, subset in scanner.shards.items():
+                self.pool.send(shard, self._join_msg(chat_id, scanner, subset))
+        return scanner
+
+    async def leave(self, chat_id: int, key: ScanKey) -> None:
+        scanner = self._scanners.get(key)
+        if scanner is None or chat_id not in scanner.chats:
+            return
+        scanner.chats.remove(chat_id)
+        for shard in scanner.shards:
+            self.pool.send(shard, {"op": "leave", "chat_id": chat_id, "key": list(key)})
+        if not scanner.chats:
+            del self._scanners[key]
+            scanner._finish()
+            logger.info(f"Stopped {key[0]} channel @ {key[1]}s")
+
+    def _on_message(self, shard: int, msg: Dict[str, Any]) -> None:
+        scanner = self._scanners.get((msg["key"][0], int(msg["key"][1]))) if "key" in msg else None
+        op = msg["op"]
+        if op == "signal":
+            # Chat lists come from our own join/leave frames, so the worker's are current
+            # up to signals already in flight when a chat leaves
+            self._publish(msg["chat_ids"], ipc.signal_from_dict(msg["signal"]))
+        elif op == "stats" and scanner is not None:
+            scanner._stats[shard] = msg["stats"]
+        elif op == "ended" and scanner is not None:
+            scanner._finish(msg.get("error"))
+
+    def _on_restart(self, shard: int) -> None:
+        """A restarted worker starts empty: re-join every chat on the channels it hosts."""
+        replayed = 0
+        for scanner in self._scanners.values():
+            subset = scanner.shards.get(shard)
+            if not subset:
+                continue
+            scanner._stats.pop(shard, None)
+            for chat_id in scanner.chats:
+                self.pool.send(shard, self._join_msg(chat_id, scanner, subset))
+            replayed += 1
+        logger.warning(f"Worker {shard} restarted; replayed {replayed} channels")
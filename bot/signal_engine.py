@@ -1,19 +1,102 @@
 import asyncio
 import logging
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import TYPE_CHECKING, Dict, Hashable, Optional, Sequence, Tuple
 
-import pandas as pd
+import numpy as np
 
-from bot.candle_builder import CandleBuilder
-from bot.indicators.ema import ema_trend
-from bot.indicators.rsi import rsi, rsi_signal
-from bot.indicators.atr import atr, atr_filter
-from bot.indicators.price_action import recent_breakout, rejection_wick
-from bot.ai_confirmation import AIConfirmation
+from bot import metrics
+from bot.indicators.confluence import DEFAULT_PARAMS, MIN_TRADE_BARS, StrategyParams, confluence
+from bot.indicators.vectorized import BatchVotes, batch_votes, ema_last, stack_frames
+from bot.ai_confirmation import AIConfirmation, get_ai_confirmation, peek_ai_confirmation
+from bot.compute import ComputeExecutor, get_compute
+from bot.config import load_settings
+from bot.local_validator import LogisticValidator, load_validator
+from bot.snapshot import Snapshot
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# How candidates are confirmed (AI_MODE)
+AI_MODE_LLM = "llm"              # LLM only (original behaviour)
+AI_MODE_LOCAL = "local"          # local validator only, no LLM call
+AI_MODE_PREFILTER = "prefilter"  # local validator must agree before the LLM is asked
+AI_MODE_FALLBACK = "fallback"    # LLM within a latency budget, local validator otherwise
+AI_MODES = (AI_MODE_LLM, AI_MODE_LOCAL, AI_MODE_PREFILTER, AI_MODE_FALLBACK)
+
+_CONFIRM_ALL_SECONDS = metrics.histogram("signal_confirm_all_seconds", "CPU time of one SignalEngine._confirm_all pass")
+_SCAN_SECONDS = metrics.histogram("signal_scan_seconds", "CPU time of one vectorized multi-asset scan")
+_CANDIDATES = metrics.counter("signal_candidates_total", "Indicator-confluence candidates sent to confirmation")
+_CONFIRMED = metrics.counter("signal_confirmed_total", "Candidates confirmed into signals")
+
+
+def confirm_all(
+    df_trade: "pd.DataFrame",
+    df_trend: Optional["pd.DataFrame"],
+    ema_info: Optional[Dict] = None,
+    params: StrategyParams = DEFAULT_PARAMS,
+) -> Optional[Dict]:
+    """Indicator confluence; `ema_info` (e.g. from a TrendState) replaces ema_trend(df_trend).
+
+    Readings come from the pandas indicators and votes from the shared `confluence` rules.
+    A pure function of its inputs, so it can run on the compute executor (see bot.compute).
+    """
+    # The pandas indicators load on first use; live scanners only run the vectorized path
+    from bot.indicators.atr import atr
+    from bot.indicators.ema import ema_trend
+    from bot.indicators.rsi import rsi
+
+    if df_trade.empty or len(df_trade) < MIN_TRADE_BARS:
+        return None
+    if ema_info is None:
+        if df_trend is None or df_trend.empty:
+            return None
+        ema_info = ema_trend(df_trend["close"], params.ema_fast, params.ema_slow)
+    close_trade = df_trade["close"]
+    rsi_series = rsi(close_trade, params.rsi_period)
+    atr_rel = atr(df_trade, params.atr_period).iloc[-1] / (close_trade.iloc[-1] + 1e-9)
+    lookback = params.lookback
+    last = df_trade.iloc[-1]
+    if len(df_trade) > lookback:
+        prior = df_trade.iloc[-lookback - 1:-1]
+        prior_high, prior_low = prior["high"].max(), prior["low"].min()
+    else:
+        prior_high = prior_low = float("nan")
+
+    votes = confluence(
+        ema_info["trend"] == "up",
+        rsi_series.iloc[-1],
+        rsi_series.iloc[-2],
+        atr_rel,
+        last["open"],
+        last["high"],
+        last["low"],
+        last["close"],
+        prior_high,
+        prior_low,
+        params=params,
+    )
+    direction = str(votes.direction)
+    if not direction:
+        return None
+
+    # The trailing bars are referenced, not copied; Snapshot.last20() builds them on demand
+    snapshot = Snapshot(
+        current_price=float(close_trade.iloc[-1]),
+        ema_trend=ema_info["trend"],
+        ema_strength=float(ema_info["strength"]),
+        rsi=float(rsi_series.iloc[-1]),
+        atr_rel=float(atr_rel),
+        breakout=bool(votes.breakout),
+        reject=bool(votes.reject),
+        bar_ts=int(df_trade["timestamp"].iloc[-1]),
+        window=df_trade,
+    )
+    return {"direction": direction, "snapshot": snapshot}
+
+
 @dataclass
 class Signal:
     asset: str
@@ -25,74 +108,164 @@ class Signal:
 class SignalEngine:
     """Aggregates indicators across multi-timeframe and gates signals via AI confirmation."""
 
-    def __init__(self):
-        self.ai = AIConfirmation()
+    def __init__(
+        self,
+        ai: Optional[AIConfirmation] = None,
+        local: Optional[LogisticValidator] = None,
+        mode: Optional[str] = None,
+        compute: Optional[ComputeExecutor] = None,
+        params: StrategyParams = DEFAULT_PARAMS,
+    ):
+        settings = load_settings()
+        self.params = params
+        self._ai = ai
+        self.compute = compute or get_compute()
+        self.local = local or load_validator(settings.local_model_path)
+        self.mode = mode or settings.ai_mode
+        if self.mode not in AI_MODES:
+            raise ValueError(f"Unknown AI_MODE {self.mode!r}; expected one of {AI_MODES}")
+        self.latency_budget = settings.ai_latency_budget_ms / 1000.0
 
-    def _confirm_all(self, df_trade: pd.DataFrame, df_trend: pd.DataFrame) -> Optional[Dict]:
-        if df_trade.empty or df_trend.empty or len(df_trade) < 60:
-            return None
-        close_trade = df_trade["close"]
-        close_trend = df_trend["close"]
-
-        ema_info = ema_trend(close_trend)
-        rsi_series = rsi(close_trade, 14)
-        rsi_info = rsi_signal(rsi_series)
-        atr_series = atr(df_trade, 14)
-        atr_info = atr_filter(atr_series, close_trade)
-        breakout = recent_breakout(df_trade, lookback=20)
-        reject = rejection_wick(df_trade, min_ratio=1.5)
-
-        # Direction confluence
-        directions = []
-        # EMA trend gives directional bias
-        directions.append("call" if ema_info["trend"] == "up" else "put")
-        if rsi_info["direction"] != "none":
-            directions.append(rsi_info["direction"])
-        if breakout["break"] and breakout["direction"] != "none":
-            directions.append(breakout["direction"])
-        if reject["rejection"] and reject["direction"] != "none":
-            directions.append(reject["direction"])
-
-        if not atr_info["valid"]:
-            return None
+    @property
+    def ai(self) -> AIConfirmation:
+        # Shared across engines: one HTTP pool, one rate limit, request de-duplication.
+        # Resolved on first use so indicator-only callers (local mode, benchmarks) need no LLM client.
+        if self._ai is None:
+            self._ai = get_ai_confirmation()
+        return self._ai
 
-        call_votes = sum(1 for d in directions if d == "call")
-        put_votes = sum(1 for d in directions if d == "put")
+    @property
+    def ai_if_started(self) -> Optional[AIConfirmation]:
+        # For stats: reading counters must not build the LLM client
+        return self._ai or peek_ai_confirmation()
 
-        if call_votes >= 3 and put_votes == 0:
-            direction = "CALL"
-        elif put_votes >= 3 and call_votes == 0:
-            direction = "PUT"
+    def _confirm_all(
+        self,
+        df_trade: "pd.DataFrame",
+        df_trend: Optional["pd.DataFrame"],
+        ema_info: Optional[Dict] = None,
+    ) -> Optional[Dict]:
+        with _CONFIRM_ALL_SECONDS.time():
+            return confirm_all(df_trade, df_trend, ema_info=ema_info, params=self.params)
+
+    def scan(
+        self,
+        assets: Sequence[str],
+        ohlcv: np.ndarray,
+        trend_close: Optional[np.ndarray],
+        lengths: Optional[np.ndarray] = None,
+        trend_lengths: Optional[np.ndarray] = None,
+        trend_ema: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ) -> BatchVotes:
+        """Screen many assets in one vectorized pass of the `_confirm_all` rules.
+
+        `ohlcv` is (assets, fields, bars) in OHLCVBuffer field order and `trend_close`
+        is (assets, trend_bars); see `stack_windows`/`stack_frames` to build them.
+        Pass `trend_ema` (ema50, ema200 per asset) instead when trend state is kept incrementally.
+        """
+        with _SCAN_SECONDS.time():
+            return batch_votes(
+                assets,
+                ohlcv,
+                trend_close,
+                lengths=lengths,
+                trend_lengths=trend_lengths,
+                trend_ema=trend_ema,
+                params=self.params,
+            )
+
+    async def scan_async(
+        self,
+        key: Hashable,
+        assets: Sequence[str],
+        ohlcv: np.ndarray,
+        lengths: Optional[np.ndarray] = None,
+        trend_ema: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ) -> BatchVotes:
+        """scan() on the compute executor, ordered per `key`; `ohlcv` must be a private copy."""
+        return await self.compute.scan(
+            key, assets, ohlcv, timer=_SCAN_SECONDS, lengths=lengths, trend_ema=trend_ema, params=self.params
+        )
+
+    async def evaluate(
+        self,
+        asset: str,
+        expiry_seconds: int,
+        df_trade: "pd.DataFrame",
+        df_trend: Optional["pd.DataFrame"],
+        market_type: str,
+        ema_info: Optional[Dict] = None,
+    ) -> Optional[Signal]:
+        """Evaluate indicator confluence; route through AI; return high-confidence signals only.
+
+        Runs as a one-asset scan_async, the path MarketScanner uses, so it is offloaded
+        the same way; the `confluence` rules make it agree with `_confirm_all`.
+        """
+        if df_trade.empty:
+            return None
+        if ema_info is not None:
+            # Floats from TrendState, full Series from ema_trend(): the last value either way
+            trend = tuple(np.asarray(ema_info[k], dtype=np.float64).reshape(-1)[-1:] for k in ("ema50", "ema200"))
+        elif df_trend is not None and not df_trend.empty:
+            close = df_trend["close"].to_numpy(dtype=np.float64)[None, :]
+            trend = (ema_last(close, self.params.ema_fast), ema_last(close, self.params.ema_slow))
         else:
             return None
+        ohlcv, lengths = stack_frames([df_trade])
+        batch = await self.scan_async((asset, expiry_seconds), [asset], ohlcv, lengths=lengths, trend_ema=trend)
+        for _, base in batch.candidates():
+            return await self.confirm_candidate(asset, expiry_seconds, base, market_type)
+        return None
 
-        snapshot = {
-            "current_price": float(close_trade.iloc[-1]),
-            "last20": df_trade.iloc[-20:].to_dict(orient="list"),
-            "ema_trend": ema_info["trend"],
-            "ema_strength": float(ema_info["strength"]),
-            "rsi": float(rsi_series.iloc[-1]),
-            "atr_rel": float(atr_info["relative"]),
-            "breakout": bool(breakout["break"]),
-            "reject": bool(reject["rejection"]),
-        }
-        return {"direction": direction, "snapshot": snapshot}
-
-    async def evaluate(self, asset: str, expiry_seconds: int, df_trade: pd.DataFrame, df_trend: pd.DataFrame, market_type: str) -> Optional[Signal]:
-        """Evaluate indicator confluence; route through AI; return high-confidence signals only."""
-        base = self._confirm_all(df_trade, df_trend)
-        if not base:
-            return None
+    async def confirm_candidate(self, asset: str, expiry_seconds: int, base: Dict, market_type: str) -> Optional[Signal]:
+        """Gate a `_confirm_all`/`BatchVotes.candidates` result through confirmation."""
+        signal, _ = await self.judge_candidate(asset, expiry_seconds, base, market_type)
+        return signal
+
+    async def judge_candidate(
+        self, asset: str, expiry_seconds: int, base: Dict, market_type: str
+    ) -> Tuple[Optional[Signal], bool]:
+        """confirm_candidate plus whether a verdict was obtained.
+
+        False means no verdict (AI_UNAVAILABLE: shed, timed out or failed), so the
+        candidate may be asked about again within the bar.
+        """
         direction = base["direction"]
-        snapshot = base["snapshot"]
-        snapshot.update({
-            "market_type": market_type,
-            "asset": asset,
-            "expiry_seconds": expiry_seconds,
-        })
-        ai_dir, conf = await self.ai.confirm(snapshot)
+        snapshot: Snapshot = base["snapshot"]
+        snapshot.market_type = market_type
+        snapshot.asset = asset
+        snapshot.expiry_seconds = expiry_seconds
+        _CANDIDATES.inc()
+        ai_dir, conf, source = await self._confirm_candidate(snapshot, direction)
+        if conf < 0:
+            return None, False
         if ai_dir != direction:
-            return None
-        if conf < 70.0:
-            return None
-        return Signal(asset=asset, expiry_seconds=expiry_seconds, direction=direction, confidence=conf, meta=snapshot)
\ No newline at end of file
+            return None, True
+        if conf < self.params.min_confidence:
+            return None, True
+        snapshot.confirmed_by = source
+        _CONFIRMED.inc()
+        return Signal(asset=asset, expiry_seconds=expiry_seconds, direction=direction, confidence=conf, meta=snapshot), True
+
+    async def _confirm_candidate(self, snapshot: Dict, direction: str) -> Tuple[str, float, str]:
+        """Route a candidate through the local validator and/or the LLM per `mode`."""
+        if self.mode == AI_MODE_LOCAL:
+            return (*self.local.confirm(snapshot, direction), "local")
+        if self.mode == AI_MODE_PREFILTER:
+            local_dir, _ = self.local.confirm(snapshot, direction)
+            if local_dir != direction:
+                return local_dir, 0.0, "local"
+            return (*await self.ai.confirm(snapshot, direction=direction), "ai")
+        if self.mode == AI_MODE_FALLBACK:
+            try:
+                # Shielded: a late LLM answer still lands in the cache for the next caller
+                ai_dir, conf = await asyncio.wait_for(
+                    asyncio.shield(self.ai.confirm(snapshot, direction=direction)),
+                    timeout=self.latency_budget,
+                )
+            except asyncio.TimeoutError:
+                ai_dir, conf = "NO_TRADE", -1.0
+            if conf >= 0:
+                return ai_dir, conf, "ai"
+            return (*self.local.confirm(snapshot, direction), "local")
+        return (*await self.ai.confirm(snapshot, direction=direction), "ai")
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bot.synthetic import SyntheticCandle
+
+logger = logging.getLogger(__name__)
+
+
+class MarketSimulator:
+    """Synthetic PocketOption market for load tests.
+
+    - Each asset follows its own random walk and ticks `tick_rate` times per second
+      on average (Poisson arrivals), delivered as raw updateStream rows in batches
+    - get_candles answers with history that ends at the asset's current price,
+      after `candle_latency` seconds
+    - With `disconnect_rate` > 0 the connection drops at random (per minute): clients
+      get a "disconnected" event, ticks stop for an outage, then resume as after the
+      API's own persistent reconnect
+    - Tracks emit lag (how late each batch went out), the first sign of a saturated loop
+
+    Hand `simulator.client` to MarketHub(client_factory=...).
+    """
+
+    def __init__(
+        self,
+        assets: Sequence[str],
+        tick_rate: float = 2.0,
+        disconnect_rate: float = 0.0,
+        outage_seconds: Tuple[float, float] = (1.0, 5.0),
+        candle_latency: float = 0.05,
+        batch_interval: float = 0.01,
+        seed: int = 0,
+    ):
+        self.assets = list(assets)
+        self.tick_rate = tick_rate
+        self.disconnect_rate = disconnect_rate
+        self.outage_seconds = outage_seconds
+        self.candle_latency = candle_latency
+        self.batch_interval = batch_interval
+        self._rng = np.random.default_rng(seed)
+        self._random = random.Random(seed)
+        self._price = {a: 1.0 + 0.1 * self._random.random() for a in self.assets}
+        self.clients: List["SimulatedPocketOptionClient"] = []
+        self._task: Optional[asyncio.Task] = None
+        self.online = True
+
+        self.ticks = 0
+        self.batches = 0
+        self.disconnects = 0
+        self.candle_requests = 0
+        self.emit_lag: List[float] = []
+
+    def client(self, **kwargs) -> "SimulatedPocketOptionClient":
+        c = SimulatedPocketOptionClient(self)
+        self.clients.append(c)
+        return c
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def history(self, asset: str, timeframe: int, count: int) -> List[SyntheticCandle]:
+        """`count` bars ending in the current bucket at the asset's current price."""
+        now = int(time.time()) // timeframe * timeframe
+        last = self._price.get(asset, 1.0)
+        steps = self._rng.normal(0.0, 0.0008, count)
+        close = last * np.exp(steps[::-1].cumsum()[::-1] - steps[-1])
+        open_ = np.concatenate([[close[0]], close[:-1]])
+        wick = np.abs(self._rng.normal(0.0, 0.0004, (2, count))) * close
+        high = np.maximum(open_, close) + wick[0]
+        low = np.minimum(open_, close) - wick[1]
+        return [
+            SyntheticCandle(float(now - (count - 1 - i) * timeframe), open_[i], high[i], low[i], close[i], 1.0, asset, timeframe)
+            for i in range(count)
+        ]
+
+    async def _broadcast(self, event: str, data: Any) -> None:
+        for c in list(self.clients):
+            if c.connected:
+                await c.emit(event, data)
+
+    async def _outage(self) -> None:
+        self.online = False
+        self.disconnects += 1
+        await self._broadcast("disconnected", {"reason": "simulated"})
+        await asyncio.sleep(self._random.uniform(*self.outage_seconds))
+        self.online = True
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        lam = self.tick_rate * self.batch_interval
+        while True:
+            next_at += self.batch_interval
+            delay = next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.emit_lag.append(max(0.0, loop.time() - next_at))
+            if self.disconnect_rate and self._random.random() < self.disconnect_rate * self.batch_interval / 60.0:
+                await self._outage()
+                next_at = loop.time()
+                continue
+            counts = self._rng.poisson(lam, len(self.assets))
+            now = time.time()
+            rows = []
+            for asset, k in zip(self.assets, counts):
+                for _ in range(k):
+                    p = self._price[asset] = self._price[asset] * (1.0 + self._rng.normal(0.0, 1e-4))
+                    rows.append([asset, now, round(p, 6)])
+            if rows:
+                self.ticks += len(rows)
+                self.batches += 1
+                await self._broadcast("stream_update", rows)
+
+
+class SimulatedPocketOptionClient:
+    """AsyncPocketOptionClient surface used by MarketHub, backed by a MarketSimulator."""
+
+    def __init__(self, sim: MarketSimulator):
+        self.sim = sim
+        self.connected = False
+        self._callbacks: Dict[str, List[Callable]] = {}
+
+    def add_event_callback(self, event: str, cb: Callable) -> None:
+        self._callbacks.setdefault(event, []).append(cb)
+
+    async def connect(self) -> bool:
+        self.connected = True
+        self.sim.start()
+        return True
+
+    async def disconnect(self) -> None:
+        self.connected = False
+
+    async def get_candles(self, asset: str, timeframe: int, count: int = 300, end_time=None) -> List[SyntheticCandle]:
+        self.sim.candle_requests += 1
+        await asyncio.sleep(self.sim.candle_latency)
+        if not self.sim.online:
+            raise ConnectionError("simulated outage")
+        return self.sim.history(asset, timeframe, count)
+
+    async def emit(self, event: str, data: Any) -> None:
+        for cb in self._callbacks.get(event, []):
+            try:
+                await cb(data)
+            except Exception:
+                logger.exception(f"Simulated {event} callback failed")
@@ -0,0 +1,119 @@
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+
+# Keys a snapshot carries, in prompt order; readers use these with dict-style get()
+KEYS = (
+    "market_type",
+    "asset",
+    "expiry_seconds",
+    "bar_ts",
+    "current_price",
+    "atr_rel",
+    "ema_trend",
+    "ema_strength",
+    "rsi",
+    "breakout",
+    "reject",
+    "confirmed_by",
+)
+_KEYS = frozenset(KEYS)
+WINDOW_BARS = 20
+
+
+class Snapshot:
+    """Indicator readings behind one candidate signal, as sent to confirmation.
+
+    - Slotted scalars instead of a dict: one small object per candidate, no per-key hashing
+    - Reads like a dict (get, [], update, to_dict), so the cache, validators, dedupe and
+      Signal.meta consumers take either a Snapshot or a plain dict
+    - The last WINDOW_BARS bars are not copied: `window` keeps a reference to the source
+      (DataFrame or (fields, bars) array) and last20() builds them only when asked.
+      The reference is dropped when the snapshot is pickled (process pool, IPC)
+    """
+
+    __slots__ = KEYS + ("_window",)
+
+    def __init__(
+        self,
+        current_price: float,
+        ema_trend: str,
+        ema_strength: float,
+        rsi: float,
+        atr_rel: float,
+        breakout: bool,
+        reject: bool,
+        bar_ts: Optional[int] = None,
+        window: Any = None,
+    ):
+        self.current_price = current_price
+        self.ema_trend = ema_trend
+        self.ema_strength = ema_strength
+        self.rsi = rsi
+        self.atr_rel = atr_rel
+        self.breakout = breakout
+        self.reject = reject
+        self.bar_ts = bar_ts
+        self.market_type: Optional[str] = None
+        self.asset: Optional[str] = None
+        self.expiry_seconds: Optional[int] = None
+        self.confirmed_by: Optional[str] = None
+        self._window = window
+
+    def last20(self) -> Dict[str, List[float]]:
+        """The trailing bars as {field: values}; empty once the source reference is gone."""
+        w = self._window
+        if w is None:
+            return {}
+        if hasattr(w, "iloc"):
+            return w.iloc[-WINDOW_BARS:].to_dict(orient="list")
+        from bot.ohlcv_buffer import FIELDS
+
+        tail = w[:, -WINDOW_BARS:]
+        return {name: tail[k].tolist() for k, name in enumerate(FIELDS)}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key) if key in _KEYS else None
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in _KEYS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: object) -> bool:
+        return key in _KEYS and getattr(self, key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def keys(self) -> List[str]:
+        return [k for k in KEYS if getattr(self, k) is not None]
+
+    def update(self, other: Mapping[str, Any] = (), **kwargs) -> None:
+        for k, v in dict(other, **kwargs).items():
+            self[k] = v
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self.keys()}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return self.to_dict()
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        for k in KEYS:
+            setattr(self, k, state.get(k))
+        self._window = None
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Snapshot):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Snapshot({self.to_dict()!r})"
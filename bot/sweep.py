@@ -0,0 +1,163 @@
+"""Parallel parameter sweep of the confluence thresholds over stored candle history.
+
+    python -m bot.sweep data/*.csv --grid rsi_period=10,14,21 --grid lookback=10,20,30 \
+        --expiries 60,300 --workers 8 --out sweep.csv
+
+Every combination of the --grid values (other StrategyParams keep their live
+defaults) is replayed through bot.backtest on a ProcessPoolExecutor. The candles
+are resampled per expiry once in the parent and written to a single .npy block
+that workers memory-map read-only, so the history is shared through the page
+cache instead of being pickled to every task. Results are ranked by win rate
+among combinations with at least --min-signals signals.
+"""
+import argparse
+import itertools
+import logging
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, fields, replace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bot.backtest import (
+    COLUMNS,
+    DEFAULT_PARAMS,
+    ExpiryStats,
+    StrategyParams,
+    _parse_expiries,
+    backtest_frame,
+    load_ohlcv,
+    resample_for_expiry,
+)
+
+logger = logging.getLogger(__name__)
+
+# (asset, expiry_seconds, start, length) into the packed block
+Segment = Tuple[str, int, int, int]
+
+_block: Optional[np.ndarray] = None
+_segments: List[Segment] = []
+# LogisticValidator.confirm with --ai local, loaded once per worker
+_confirm: Optional[Callable] = None
+
+
+def pack_history(paths: Sequence[str], expiries: Sequence[int], out_path: str) -> List[Segment]:
+    """Resample every asset to every expiry and store all bars in one (fields, bars) .npy file."""
+    parts: List[np.ndarray] = []
+    segments: List[Segment] = []
+    offset = 0
+    for path in paths:
+        for asset, df in load_ohlcv(path).items():
+            for e in expiries:
+                res = resample_for_expiry(df, e)
+                if res is None or not len(res):
+                    continue
+                arr = res[COLUMNS].to_numpy(dtype=np.float64).T
+                parts.append(arr)
+                segments.append((asset, e, offset, arr.shape[1]))
+                offset += arr.shape[1]
+    block = np.concatenate(parts, axis=1) if parts else np.empty((len(COLUMNS), 0))
+    np.save(out_path, block)
+    return segments
+
+
+def _init_worker(block_path: str, segments: List[Segment], use_local: bool, model_path: Optional[str]) -> None:
+    global _block, _segments, _confirm
+    _block = np.load(block_path, mmap_mode="r")
+    _segments = segments
+    _confirm = None
+    if use_local:
+        from bot.local_validator import load_validator
+        _confirm = load_validator(model_path).confirm
+
+
+def _evaluate(params: StrategyParams) -> Dict:
+    totals: Dict[int, ExpiryStats] = {}
+    for asset, expiry, start, length in _segments:
+        view = _block[:, start:start + length]
+        df = pd.DataFrame({name: view[i] for i, name in enumerate(COLUMNS)})
+        st = backtest_frame(df, asset, expiry, _confirm, params=params, resampled=True)
+        totals.setdefault(expiry, ExpiryStats(asset="*", expiry_seconds=expiry)).merge(st)
+    overall = ExpiryStats(asset="*", expiry_seconds=0)
+    for t in totals.values():
+        overall.merge(t)
+    row = asdict(params)
+    row.update({"signals": overall.signals, "wins": overall.wins, "losses": overall.losses, "win_rate": round(overall.win_rate, 4)})
+    for e, t in sorted(totals.items()):
+        row[f"win_rate_{e}s"] = round(t.win_rate, 4)
+        row[f"signals_{e}s"] = t.signals
+    return row
+
+
+def build_grid(specs: Sequence[str]) -> List[StrategyParams]:
+    """Expand ["name=v1,v2", ...] into StrategyParams combinations."""
+    types = {f.name: f.type for f in fields(StrategyParams)}
+    axes: Dict[str, List] = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        name = name.strip()
+        if name not in types:
+            raise ValueError(f"Unknown parameter {name!r}; choose from {sorted(types)}")
+        cast = int if types[name] in (int, "int") else float
+        axes[name] = [cast(v) for v in values.split(",") if v.strip()]
+    names = list(axes)
+    return [replace(DEFAULT_PARAMS, **dict(zip(names, combo))) for combo in itertools.product(*axes.values())]
+
+
+def rank(rows: List[Dict], min_signals: int) -> pd.DataFrame:
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    table["eligible"] = table["signals"] >= min_signals
+    return table.sort_values(["eligible", "win_rate", "signals"], ascending=False).reset_index(drop=True)
+
+
+def sweep(
+    paths: Sequence[str],
+    grid: List[StrategyParams],
+    expiries: Sequence[int],
+    workers: Optional[int] = None,
+    use_local: bool = False,
+    model_path: Optional[str] = None,
+    min_signals: int = 30,
+) -> pd.DataFrame:
+    with tempfile.TemporaryDirectory(prefix="sweep-") as tmp:
+        block_path = os.path.join(tmp, "candles.npy")
+        segments = pack_history(paths, expiries, block_path)
+        logger.info(f"Packed {len(segments)} series; sweeping {len(grid)} combinations")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(block_path, segments, use_local, model_path),
+        ) as pool:
+            rows = list(pool.map(_evaluate, grid, chunksize=max(1, len(grid) // (4 * (workers or os.cpu_count() or 1)))))
+    return rank(rows, min_signals)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Sweep strategy thresholds over stored candles in parallel.")
+    ap.add_argument("paths", nargs="+", help="CSV or Parquet OHLCV files")
+    ap.add_argument("--grid", action="append", default=[], help="name=v1,v2,... (repeatable); see StrategyParams")
+    ap.add_argument("--expiries", help="comma-separated seconds (default: all EXPIRIES_SECONDS)")
+    ap.add_argument("--workers", type=int, help="process count (default: CPU count)")
+    ap.add_argument("--ai", choices=("none", "local"), default="none")
+    ap.add_argument("--model", help="local validator JSON weights (with --ai local)")
+    ap.add_argument("--min-signals", type=int, default=30, help="rank only combinations with at least this many signals")
+    ap.add_argument("--out", default="sweep_results.csv", help="ranked results table (CSV)")
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args(argv)
+
+    grid = build_grid(args.grid) or [DEFAULT_PARAMS]
+    table = sweep(args.paths, grid, _parse_expiries(args.expiries), args.workers, args.ai == "local", args.model, args.min_signals)
+    table.to_csv(args.out, index=False)
+    with pd.option_context("display.width", 200, "display.max_columns", 30):
+        print(table.head(args.top).to_string())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""Seeded random-walk market data shared by the benchmarks, the simulator and the tests."""
+import time
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from bot.ohlcv_buffer import FIELDS
+
+
+class SyntheticCandle(NamedTuple):
+    """Duck-types pocketoptionapi_async.models.Candle for CandleBuilder and CandleStore."""
+
+    timestamp: float
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    asset: str
+    timeframe: int
+
+
+def synthetic_ohlcv(
+    n: int,
+    timeframe: int = 60,
+    seed: int = 0,
+    start: float = 1.1,
+    vol: float = 0.0008,
+    end_ts: Optional[int] = None,
+) -> pd.DataFrame:
+    """Random-walk OHLCV bars ending at `end_ts` (default: now, bucket-aligned)."""
+    rng = np.random.default_rng(seed)
+    end_ts = int(time.time()) // timeframe * timeframe if end_ts is None else end_ts
+    ts = end_ts - timeframe * np.arange(n - 1, -1, -1, dtype=np.int64)
+    close = start * np.exp(np.cumsum(rng.normal(0.0, vol, n)))
+    open_ = np.concatenate([[start], close[:-1]])
+    wick = np.abs(rng.normal(0.0, vol / 2, (2, n))) * close
+    high = np.maximum(open_, close) + wick[0]
+    low = np.minimum(open_, close) - wick[1]
+    volume = rng.integers(1, 100, n).astype(np.float64)
+    return pd.DataFrame({"timestamp": ts, "open": open_, "high": high, "low": low, "close": close, "volume": volume})
+
+
+def synthetic_candles(n: int, asset: str = "EURUSD_otc", timeframe: int = 60, seed: int = 0, **kw) -> List[SyntheticCandle]:
+    df = synthetic_ohlcv(n, timeframe, seed, **kw)
+    return [
+        SyntheticCandle(float(t), o, h, l, c, v, asset, timeframe)
+        for t, o, h, l, c, v in df[list(FIELDS)].itertuples(index=False, name=None)
+    ]
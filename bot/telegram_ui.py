@@ -1,9 +1,9 @@
 import asyncio
 import logging
 from dataclasses import dataclass
-from typing import Optional, Dict, List
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Union
 
-import pandas as pd
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application,
@@ -14,56 +14,27 @@ from telegram.ext import (
     CallbackQueryHandler,
 )
 
+from bot.broadcaster import Broadcaster
 from bot.config import load_settings
-from bot.market_stream import MarketStream
-from bot.candle_builder import CandleBuilder
-from bot.signal_engine import SignalEngine
+from bot.market_hub import MarketHub
+from bot.market_scanner import SCAN_UNIVERSES, MarketScanner, ScanKey, ScannerRegistry
+from bot.markets import (
+    CRYPTO_ASSETS,
+    EXPIRIES_SECONDS,
+    OTC_ASSETS_FOREX,
+    REAL_ASSETS_FOREX,
+)
+from bot.metrics import get_metrics
+from bot.session_store import KIND_SCAN, KIND_SESSION, SessionStore, StoredSession, get_session_store
+from bot.sharding import RemoteScanner, ShardedScannerRegistry, WorkerPool
 
 logger = logging.getLogger(__name__)
 
 # Conversation states
 MARKET_TYPE, ASSET_CLASS, ASSET_SELECTION, EXPIRY_SELECTION = range(4)
 
-REAL_ASSETS_FOREX = [
-    "EURUSD","GBPUSD","USDJPY","AUDUSD","USDCAD","USDCHF","EURGBP","EURJPY","GBPJPY","NZDUSD"
-]
-OTC_ASSETS_FOREX = [
-    "EURUSD OTC","GBPUSD OTC","USDJPY OTC","AUDUSD OTC","USDCAD OTC","USDCHF OTC","EURGBP OTC","EURJPY OTC","GBPJPY OTC","NZDUSD OTC"
-]
-CRYPTO_ASSETS = [
-    "BTCUSD","ETHUSD","BNBUSD","SOLUSD","XRPUSD","ADAUSD","DOGEUSD","LTCUSD","DOTUSD","AVAXUSD"
-]
-
-EXPIRIES_SECONDS = {
-    "5 seconds": 5,
-    "15 seconds": 15,
-    "30 seconds": 30,
-    "1 minute": 60,
-    "2 minutes": 120,
-    "3 minutes": 180,
-    "5 minutes": 300,
-}
-
-
-def higher_timeframe_seconds(s: int) -> int:
-    if s <= 5:
-        return 15
-    if s <= 15:
-        return 30
-    if s <= 30:
-        return 60
-    if s <= 60:
-        return 300
-    if s <= 120:
-        return 300
-    if s <= 180:
-        return 300
-    return 900
-
-
-def symbol_to_pocket_option(symbol: str) -> str:
-    # Simple mapping; adjust if API expects specific codes for OTC
-    return symbol
+# How long a resume waits for resumed feeds to be backfilled before reporting
+RESUME_WARM_TIMEOUT_SECONDS = 60.0
 
 
 @dataclass
@@ -72,10 +43,10 @@ class RuntimeSession:
     asset_class: str
     asset: str
     expiry_seconds: int
-    stream: Optional[MarketStream] = None
-    engine: Optional[SignalEngine] = None
     task: Optional[asyncio.Task] = None
-    df_trade: pd.DataFrame = pd.DataFrame()
+    # Shared per (asset, expiry): every chat on the same pair reads one evaluation
+    channel: Optional[ScanKey] = None
+    scanner: Optional[Union[MarketScanner, RemoteScanner]] = None
 
 
 def format_signal_telegram(sig) -> str:
@@ -92,17 +63,34 @@ def format_signal_telegram(sig) -> str:
         "\u2714 RSI Momentum",
         "\u2714 ATR Volatility",
         "\u2714 Price Action Breakout",
-        "\u2714 AI Confirmation",
+        "\u2714 Local Model Confirmation" if sig.meta.get("confirmed_by") == "local" else "\u2714 AI Confirmation",
         "",
-        f"\u23f0 Signal Time: {pd.Timestamp.utcnow().strftime('%H:%M:%S')} UTC",
+        f"\u23f0 Signal Time: {datetime.now(timezone.utc).strftime('%H:%M:%S')} UTC",
     ]
     return "\n".join(lines)
 
 
 class TelegramUI:
-    def __init__(self, application: Application):
+    def __init__(
+        self,
+        application: Application,
+        hub: Optional[MarketHub] = None,
+        workers: Optional[WorkerPool] = None,
+    ):
         self.app = application
         self.settings = load_settings()
+        self.broadcaster = Broadcaster(
+            self._send_text,
+            global_rate=self.settings.telegram_global_rate,
+            chat_rate=self.settings.telegram_chat_rate,
+        )
+        # In sharded mode channels run in the worker processes and only their signals come back
+        if workers is not None:
+            self.scanners = ShardedScannerRegistry(self._publish_signal, workers)
+        else:
+            self.scanners = ScannerRegistry(self._publish_signal, hub=hub)
+        # Session definitions survive restarts (SESSION_DB; None when disabled)
+        self.sessions: Optional[SessionStore] = get_session_store()
 
     def setup(self):
         conv = ConversationHandler(
@@ -118,6 +106,7 @@ class TelegramUI:
         self.app.add_handler(conv)
         self.app.add_handler(CommandHandler("stop", self.cmd_stop))
         self.app.add_handler(CommandHandler("status", self.cmd_status))
+        self.app.add_handler(CommandHandler("scan", self.cmd_scan))
 
     async def cmd_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         kb = InlineKeyboardMarkup([
@@ -172,75 +161,190 @@ class TelegramUI:
         market_type = context.user_data.get("market_type", "REAL")
         asset = context.user_data.get("asset")
 
-        # Start session
+        # Start session (replacing any running one)
+        previous: RuntimeSession = context.chat_data.get("session")
+        if previous and previous.task:
+            previous.task.cancel()
         session = RuntimeSession(
             market_type=market_type,
             asset_class=context.user_data.get("asset_class","Forex"),
             asset=asset,
             expiry_seconds=expiry_seconds,
-            stream=MarketStream(asset=symbol_to_pocket_option(asset), timeframe_seconds=expiry_seconds),
-            engine=SignalEngine(),
         )
-        context.user_data["session"] = session
+        context.chat_data["session"] = session
+        if self.sessions:
+            self.sessions.save(StoredSession(
+                update.effective_chat.id, KIND_SESSION, update.effective_user.id,
+                market_type, session.asset_class, asset, expiry_seconds,
+            ))
         await q.edit_message_text(f"Streaming {asset} ({market_type}) @ {expiry_seconds}s. Generating signals only when all strategies agree.")
         session.task = asyncio.create_task(self._run_stream_loop(update.effective_chat.id, context))
         return ConversationHandler.END
 
     async def _run_stream_loop(self, chat_id: int, context: ContextTypes.DEFAULT_TYPE):
-        session: RuntimeSession = context.user_data.get("session")
+        """Attach the chat to the shared channel for its (asset, expiry) until /stop."""
+        session: RuntimeSession = context.chat_data.get("session")
         if not session:
             return
-        assert session.stream and session.engine
-        # Candle callback to keep DF updated and evaluate
-        def candle_cb(candles):
-            df = CandleBuilder.to_dataframe(candles)
-            session.df_trade = CandleBuilder.last_n(df, 300)
-        session.stream.add_candle_callback(candle_cb)
-
-        async def stream_cb(data: Dict):
-            # Evaluate on stream updates if we have enough candles
-            if session.df_trade is None or session.df_trade.empty:
-                return
-            confirm_sec = higher_timeframe_seconds(session.expiry_seconds)
-            df_trend = CandleBuilder.aggregate_timeframe(session.df_trade, confirm_sec)
-            sig = await session.engine.evaluate(
-                asset=session.asset,
-                expiry_seconds=session.expiry_seconds,
-                df_trade=session.df_trade,
-                df_trend=df_trend,
-                market_type=session.market_type,
-            )
-            if sig:
-                text = format_signal_telegram(sig)
-                try:
-                    await context.bot.send_message(chat_id=chat_id, text=text)
-                except Exception:
-                    logger.exception("Failed to send signal message")
-        session.stream.add_stream_callback(stream_cb)
+        await self._run_session(chat_id, session)
 
+    async def _run_session(self, chat_id: int, session: RuntimeSession):
+        key = (f"{session.market_type}:{session.asset}", session.expiry_seconds)
+        session.channel = key
+        session.scanner = self.scanners.join(chat_id, key, session.market_type, [session.asset])
         try:
-            await session.stream.run()
+            # Shielded: other chats may still be on this channel when we leave
+            await asyncio.shield(session.scanner.task)
+        except asyncio.CancelledError:
+            raise
         except Exception:
             logger.exception("Stream loop crashed")
+        finally:
+            await self.scanners.leave(chat_id, key)
+
+    async def resume_sessions(self) -> int:
+        """Restart every stored session and scan after a restart; returns how many.
+
+        Rows come back grouped by channel, so each (asset, expiry) group opens its feeds
+        once and every chat in it joins the same scanner. Feeds warm-start from the candle
+        archive and backfill through the hub's bounded get_candles concurrency, and
+        scanners only evaluate assets whose history has no gap left, so resumed chats
+        never get signals from stale bars.
+        """
+        if not self.sessions:
+            return 0
+        resumed = 0
+        channels = set()
+        for s in self.sessions.load_all():
+            # Runtime state is per chat, like the stored rows, so any member's /stop finds it
+            chat_data = self.app.chat_data[s.chat_id]
+            if s.kind == KIND_SCAN:
+                if s.asset not in SCAN_UNIVERSES:
+                    self.sessions.delete(s.chat_id, KIND_SCAN)
+                    continue
+                market_type, assets = SCAN_UNIVERSES[s.asset]
+                key = (s.asset, s.expiry_seconds)
+                self.scanners.join(s.chat_id, key, market_type, assets)
+                chat_data["scan"] = key
+            else:
+                session = RuntimeSession(s.market_type, s.asset_class, s.asset, s.expiry_seconds)
+                key = (f"{s.market_type}:{s.asset}", s.expiry_seconds)
+                chat_data["session"] = session
+                session.task = asyncio.create_task(self._run_session(s.chat_id, session))
+            channels.add(key)
+            resumed += 1
+        if resumed:
+            logger.info(f"Resumed {resumed} sessions on {len(channels)} channels")
+            asyncio.create_task(self._report_warm(channels))
+        return resumed
+
+    async def _report_warm(self, channels) -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        while loop.time() - start < RESUME_WARM_TIMEOUT_SECONDS:
+            await asyncio.sleep(0.5)
+            scanners = [self.scanners.get(k) for k in channels]
+            stats = [sc.stats() for sc in scanners if sc is not None]
+            warm = sum(st.get("warm", 0) for st in stats)
+            feeds = sum(st.get("feeds", 0) for st in stats)
+            # Scanners report no feeds until they have opened them
+            if feeds > 0 and warm >= feeds:
+                logger.info(f"Resumed channels warm after {loop.time() - start:.1f}s ({feeds} feeds)")
+                return
+        logger.warning(f"Resumed channels not fully warm after {RESUME_WARM_TIMEOUT_SECONDS:.0f}s: {warm}/{feeds} feeds")
+
+    def _publish_signal(self, chat_ids: List[int], sig) -> None:
+        # Formatted once, queued for every chat; delivery is rate-limited off the evaluation path
+        self.broadcaster.publish(chat_ids, format_signal_telegram(sig))
+
+    async def _send_text(self, chat_id: int, text: str) -> None:
+        await self.app.bot.send_message(chat_id=chat_id, text=text)
+
+    async def cmd_scan(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """/scan [otc|real|crypto] [expiry_seconds]: signals for every asset in the list."""
+        args = [a.lower() for a in (context.args or [])]
+        universe = next((a for a in args if a in SCAN_UNIVERSES), "otc")
+        expiries = [int(a) for a in args if a.isdigit()]
+        expiry_seconds = expiries[0] if expiries else 60
+        if expiry_seconds not in EXPIRIES_SECONDS.values():
+            allowed = ", ".join(str(v) for v in EXPIRIES_SECONDS.values())
+            await update.message.reply_text(f"Expiry must be one of: {allowed} seconds.")
+            return
+        chat_id = update.effective_chat.id
+        previous = context.chat_data.get("scan")
+        if previous and previous != (universe, expiry_seconds):
+            await self.scanners.leave(chat_id, previous)
+        market_type, assets = SCAN_UNIVERSES[universe]
+        scanner = self.scanners.join(chat_id, (universe, expiry_seconds), market_type, assets)
+        context.chat_data["scan"] = (universe, expiry_seconds)
+        if self.sessions:
+            self.sessions.save(StoredSession(
+                chat_id, KIND_SCAN, update.effective_user.id, market_type, "", universe, expiry_seconds,
+            ))
+        await update.message.reply_text(
+            f"Scanning {len(scanner.assets)} {universe.upper()} assets @ {expiry_seconds}s. "
+            "Only signals where all strategies agree are sent. /stop to end."
+        )
 
     async def cmd_stop(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        session: RuntimeSession = context.user_data.get("session")
-        if session and session.task:
+        session: RuntimeSession = context.chat_data.get("session")
+        scan = context.chat_data.pop("scan", None)
+        if self.sessions:
+            self.sessions.delete(update.effective_chat.id)
+        if scan:
+            await self.scanners.leave(update.effective_chat.id, scan)
+        if session and session.task and not session.task.done():
             session.task.cancel()
-            try:
-                await session.stream.disconnect()  # type: ignore
-            except Exception:
-                pass
             await update.message.reply_text("Stopped streaming.")
+        elif scan:
+            await update.message.reply_text("Stopped scanning.")
         else:
             await update.message.reply_text("No active session.")
 
+    def _delivery_status(self) -> str:
+        b = self.broadcaster
+        line = f"Delivery: sent={b.sent} queued={b.pending()} failed={b.failed} retry_after={b.retries}"
+        lat = b.latency_percentiles()
+        if lat:
+            line += f" p50/p95/p99={1000 * lat['p50']:.0f}/{1000 * lat['p95']:.0f}/{1000 * lat['p99']:.0f}ms"
+        timings = get_metrics().summary((
+            "telegram_update_seconds",
+            "tick_to_signal_seconds",
+            "get_candles_seconds",
+            "signal_scan_seconds",
+            "ai_queue_wait_seconds",
+            "ai_call_seconds",
+            "telegram_send_seconds",
+        ))
+        return line + (f"\nTimings: {timings}" if timings else "")
+
     async def cmd_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        session: RuntimeSession = context.user_data.get("session")
-        if not session:
-            await update.message.reply_text("Idle. Use /start to begin.")
+        session: RuntimeSession = context.chat_data.get("session")
+        scan = context.chat_data.get("scan")
+        scanner = self.scanners.get(scan) if scan else None
+        lines = []
+        if scanner:
+            st = scanner.stats()
+            lines.append(
+                f"Scan: {scan[0].upper()} @ {scan[1]}s | feeds ready={st.get('ready', 0)}/{st['feeds']}"
+                f" | scans={st.get('scans', 0)} candidates={st.get('candidates', 0)} signals={st.get('signals', 0)}"
+                f" | chats={len(scanner.chats)}"
+            )
+        channel = session.scanner if session and session.task and not session.task.done() else None
+        if channel:
+            st = channel.stats()
+            line = (
+                f"Session: {session.asset} {session.market_type} @ {session.expiry_seconds}s | candles={st.get('candles', 0)}"
+                f" | evals={st.get('evals', 0)} coalesced={st.get('coalesced', 0)} ({st.get('mode', '-')}) | chats={len(channel.chats)}"
+            )
+            if "ai_calls" in st:
+                line += (
+                    f" | ai calls={st['ai_calls']} items={st['ai_items']} shared={st['ai_shared']} cache_hit={st['ai_cache_hit']:.0%}"
+                    f" queued={st['ai_queued']} dropped={st['ai_dropped']} wait_avg={st['ai_wait_avg']:.1f}s"
+                )
+            lines.append(line)
+        if not lines:
+            await update.message.reply_text("Idle. Use /start or /scan to begin.")
             return
-        count = 0 if session.df_trade is None else len(session.df_trade)
-        await update.message.reply_text(
-            f"Session: {session.asset} {session.market_type} @ {session.expiry_seconds}s | candles={count}"
-        )
\ No newline at end of file
+        lines.append(self._delivery_status())
+        await update.message.reply_text("\n".join(lines))
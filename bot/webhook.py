@@ -0,0 +1,336 @@
+"""Webhook intake with concurrent, per-user ordered update handling.
+
+Run the bot with TELEGRAM_MODE=webhook. Updates are POSTed to WEBHOOK_LISTEN:WEBHOOK_PORT
+at WEBHOOK_PATH, acknowledged at once and handled concurrently. Updates from the same user
+stay in arrival order, so a /start conversation still steps through its states in turn.
+If WEBHOOK_URL is set, it is registered with Telegram at startup.
+
+Local testing without Telegram: start the bot with TELEGRAM_OFFLINE=true (Bot API calls
+are answered locally, see OfflineRequest), then POST synthetic updates:
+
+    TELEGRAM_MODE=webhook TELEGRAM_OFFLINE=true python -m bot.main
+    python -m bot.webhook --url http://127.0.0.1:8443/telegram --count 2000 --users 200
+
+Receipt-to-reply time is the telegram_update_seconds histogram (/metrics and /status).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import sys
+import time
+from typing import Any, Awaitable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from telegram import Update
+from telegram.ext import Application, BaseUpdateProcessor
+from telegram.request import BaseRequest, RequestData
+
+from bot import metrics
+from bot.config import Settings
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+
+_UPDATE_SECONDS = metrics.histogram("telegram_update_seconds", "Update receipt to its handlers finishing (replies sent)")
+_UPDATE_WAIT_SECONDS = metrics.histogram("telegram_update_wait_seconds", "Update receipt to its handlers starting")
+_UPDATES = metrics.counter("telegram_updates_total", "Updates received")
+_REJECTED = metrics.counter("telegram_updates_rejected_total", "Webhook requests rejected (bad secret, path or body)")
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Up to `max_concurrent_updates` updates at once, serialized per user.
+
+    - Updates from one user (or chat, when there is no user) run in arrival order, which
+      keeps ConversationHandler state consistent; different users never wait on each other,
+      since queued updates wait for their user's turn before taking a concurrency slot
+    - Times every update from receipt (stamped by the webhook server, else when processing
+      begins) to its handlers finishing
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # key -> (lock, updates holding or waiting for it)
+        self._locks: Dict[Hashable, Tuple[asyncio.Lock, int]] = {}
+        self._received: Dict[int, float] = {}
+
+    def received(self, update_id: int, at: float) -> None:
+        self._received[update_id] = at
+
+    @staticmethod
+    def _key(update: object) -> Optional[Hashable]:
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user is not None:
+            return ("user", update.effective_user.id)
+        if update.effective_chat is not None:
+            return ("chat", update.effective_chat.id)
+        return None
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:  # type: ignore[misc]
+        """Take the user's lock first and a concurrency slot second.
+
+        The base class takes the slot first, so updates queued behind one user's lock
+        would hold slots and a single flooding user could stall everyone else.
+        """
+        now = time.monotonic()
+        received = self._received.pop(update.update_id, now) if isinstance(update, Update) else now
+        key = self._key(update)
+        if key is None:
+            async with self._semaphore:
+                _UPDATE_WAIT_SECONDS.observe(time.monotonic() - received)
+                await self.do_process_update(update, coroutine)
+            _UPDATE_SECONDS.observe(time.monotonic() - received)
+            return
+        lock, users = self._locks.get(key) or (asyncio.Lock(), 0)
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock, self._semaphore:
+                _UPDATE_WAIT_SECONDS.observe(time.monotonic() - received)
+                await self.do_process_update(update, coroutine)
+        finally:
+            lock, users = self._locks[key]
+            if users <= 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+            _UPDATE_SECONDS.observe(time.monotonic() - received)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        self._locks.clear()
+        self._received.clear()
+
+
+class WebhookServer:
+    """Minimal HTTP/1.1 endpoint for Telegram's webhook POSTs (keep-alive aware).
+
+    Each update is stamped on receipt, put on the application's update queue and
+    acknowledged with 200 straight away; handling happens in the update processor.
+    """
+
+    def __init__(self, application: Application, host: str, port: int, path: str, secret_token: str = ""):
+        self.app = application
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"Webhook listening on http://{self.host}:{self.port}{self.path}")
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                headers: Dict[str, str] = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY_BYTES:
+                    self._respond(writer, "413 Payload Too Large")
+                    break
+                body = await reader.readexactly(length) if length else b""
+                self._respond(writer, await self._accept(request, headers, body))
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _accept(self, request: bytes, headers: Dict[str, str], body: bytes) -> str:
+        received = time.monotonic()
+        parts = request.decode("latin-1").split()
+        if len(parts) < 2 or parts[0] != "POST" or parts[1].split("?", 1)[0] != self.path:
+            _REJECTED.inc()
+            return "404 Not Found"
+        if self.secret_token and headers.get("x-telegram-bot-api-secret-token") != self.secret_token:
+            _REJECTED.inc()
+            return "403 Forbidden"
+        try:
+            update = Update.de_json(json.loads(body), self.app.bot)
+        except Exception:
+            _REJECTED.inc()
+            logger.warning("Webhook: discarded a malformed update")
+            return "400 Bad Request"
+        _UPDATES.inc()
+        processor = self.app.update_processor
+        if isinstance(processor, PerUserUpdateProcessor):
+            processor.received(update.update_id, received)
+        await self.app.update_queue.put(update)
+        return "200 OK"
+
+    @staticmethod
+    def _respond(writer: asyncio.StreamWriter, status: str) -> None:
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Length: 0\r\n\r\n".encode())
+
+
+async def run_webhook(application: Application, settings: Settings) -> None:
+    """Serve the webhook until cancelled (Ctrl+C); the post_init hook runs once it is up."""
+    server = WebhookServer(
+        application,
+        settings.webhook_listen,
+        settings.webhook_port,
+        settings.webhook_path,
+        settings.webhook_secret,
+    )
+    async with application:
+        await application.start()
+        await server.start()
+        if settings.webhook_url:
+            await application.bot.set_webhook(
+                url=settings.webhook_url,
+                secret_token=settings.webhook_secret or None,
+                allowed_updates=Update.ALL_TYPES,
+                max_connections=100,
+            )
+            logger.info(f"Registered webhook {settings.webhook_url}")
+        if application.post_init:
+            await application.post_init(application)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+            await application.stop()
+
+
+class OfflineRequest(BaseRequest):
+    """Answers Bot API calls locally (TELEGRAM_OFFLINE=true), for load tests without Telegram.
+
+    Send and edit methods return a plausible Message after `latency` seconds; getUpdates
+    long-polls to an empty list, so polling mode runs too; every other method returns
+    True, except getMe.
+    """
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self._message_ids = itertools.count(1)
+        self.calls = 0
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None, **kwargs) -> Tuple[int, bytes]:
+        self.calls += 1
+        endpoint = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data is not None else {}
+        if endpoint == "getMe":
+            result: Any = {"id": 1, "is_bot": True, "first_name": "Offline", "username": "offline_bot"}
+        elif endpoint == "getUpdates":
+            await asyncio.sleep(min(float(params.get("timeout") or 0), 1.0) or self.latency)
+            result = []
+        elif endpoint.startswith(("send", "edit")):
+            await asyncio.sleep(self.latency)
+            result = {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": params.get("chat_id", 0), "type": "private"},
+                "text": params.get("text", ""),
+            }
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+_update_ids = itertools.count(1)
+
+
+def synthetic_update(user_id: int, text: str) -> Dict[str, Any]:
+    """A private-chat text message update as Telegram would POST it."""
+    user = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+    return {
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": next(_update_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": user,
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}] if text.startswith("/") else [],
+        },
+    }
+
+
+async def post_updates(url: str, count: int, users: int, concurrency: int, texts: Sequence[str], secret: str = "") -> Dict:
+    """POST `count` synthetic updates from `users` users, `concurrency` requests at a time."""
+    import httpx
+
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    acks: List[float] = []
+    failures = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(count):
+        queue.put_nowait(synthetic_update(100_000 + i % users, texts[i % len(texts)]))
+
+    async def sender(client) -> None:
+        nonlocal failures
+        while not queue.empty():
+            body = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                resp = await client.post(url, json=body, headers=headers)
+                resp.raise_for_status()
+                acks.append(time.perf_counter() - start)
+            except httpx.HTTPError:
+                failures += 1
+
+    start = time.perf_counter()
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        await asyncio.gather(*(sender(client) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    acks.sort()
+    pick = lambda q: 1000 * acks[min(len(acks) - 1, int(q * len(acks)))] if acks else 0.0
+    return {
+        "updates": count,
+        "failures": failures,
+        "seconds": round(elapsed, 3),
+        "updates_per_s": round(len(acks) / elapsed, 1) if elapsed else 0.0,
+        "ack_p50_ms": round(pick(0.5), 2),
+        "ack_p99_ms": round(pick(0.99), 2),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="POST synthetic Telegram updates to a running webhook.")
+    ap.add_argument("--url", default="http://127.0.0.1:8443/telegram")
+    ap.add_argument("--count", type=int, default=1000)
+    ap.add_argument("--users", type=int, default=100)
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--text", action="append", help="message text to send (repeatable; default /status)")
+    ap.add_argument("--secret", default="", help="WEBHOOK_SECRET of the server, if set")
+    args = ap.parse_args(argv)
+
+    report = asyncio.run(post_updates(args.url, args.count, args.users, args.concurrency, args.text or ["/status"], args.secret))
+    print(json.dumps(report, indent=2))
+    print("Receipt-to-reply times: telegram_update_seconds on the bot's /metrics endpoint")
+    return 0 if not report["failures"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Market worker process for sharded mode (WORKER_PROCESSES > 0).
+
+    python -m bot.worker --index 0 --socket /tmp/ftb-x1y2/worker-0.sock
+
+Started and restarted by bot.sharding.WorkerPool rather than by hand. A worker owns
+the PocketOption connection, feeds, indicator evaluation and AI confirmation for
+the assets that hash to it (see bot.ipc.shard_for), and serves the Telegram process
+over a Unix socket: join/leave in, signals and per-channel stats out. It exits when
+the Telegram process disconnects.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from typing import Optional, Sequence
+
+from bot import ipc
+from bot.config import load_settings
+from bot.market_scanner import ScanKey, ScannerRegistry
+from bot.metrics import serve_metrics
+
+logger = logging.getLogger(__name__)
+
+# How often channel counters are pushed to the Telegram process for /status
+STATS_INTERVAL_SECONDS = 1.0
+
+
+class Worker:
+    def __init__(self, index: int):
+        self.index = index
+        self.done = asyncio.Event()
+        self._connected = False
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if self._connected:
+            # One Telegram process per worker; a second connection is a misconfiguration
+            writer.close()
+            return
+        self._connected = True
+
+        def publish(chat_ids, sig) -> None:
+            ipc.write_frame(writer, {"op": "signal", "chat_ids": chat_ids, "signal": ipc.signal_to_dict(sig)})
+
+        registry = ScannerRegistry(publish)
+        stats = asyncio.create_task(self._push_stats(registry, writer))
+        try:
+            while (msg := await ipc.read_frame(reader)) is not None:
+                key: ScanKey = (msg["key"][0], int(msg["key"][1]))
+                if msg["op"] == "join":
+                    new = registry.get(key) is None
+                    scanner = registry.join(int(msg["chat_id"]), key, msg["market_type"], msg["assets"])
+                    if new:
+                        scanner.task.add_done_callback(lambda t, k=key: self._report_end(writer, k, t))
+                elif msg["op"] == "leave":
+                    await registry.leave(int(msg["chat_id"]), key)
+                else:
+                    logger.warning(f"Worker {self.index}: unknown op {msg['op']!r}")
+        except Exception:
+            logger.exception(f"Worker {self.index}: IPC loop failed")
+        finally:
+            stats.cancel()
+            for _, scanner in registry.items():
+                await scanner.stop()
+            writer.close()
+            self.done.set()
+
+    @staticmethod
+    def _report_end(writer: asyncio.StreamWriter, key: ScanKey, task: asyncio.Task) -> None:
+        # Channels only end on their own when a feed crashes; leave-driven stops are cancellations
+        if task.cancelled():
+            return
+        error = task.exception()
+        ipc.write_frame(writer, {"op": "ended", "key": list(key), "error": repr(error) if error else None})
+
+    async def _push_stats(self, registry: ScannerRegistry, writer: asyncio.StreamWriter) -> None:
+        while True:
+            await asyncio.sleep(STATS_INTERVAL_SECONDS)
+            for key, scanner in registry.items():
+                try:
+                    ipc.write_frame(writer, {"op": "stats", "key": list(key), "stats": scanner.stats()})
+                except Exception:
+                    logger.exception(f"Worker {self.index}: stats for {key} failed")
+
+
+async def serve(index: int, socket_path: str) -> None:
+    settings = load_settings()
+    # The pool hands each worker its own METRICS_PORT
+    await serve_metrics(settings.metrics_host, settings.metrics_port)
+    worker = Worker(index)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = await asyncio.start_unix_server(worker.handle, path=socket_path)
+    logger.info(f"Worker {index} (pid {os.getpid()}) listening on {socket_path}")
+    async with server:
+        await worker.done.wait()
+    logger.info(f"Worker {index}: Telegram process disconnected, exiting")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Market data and evaluation worker for sharded mode.")
+    ap.add_argument("--index", type=int, required=True)
+    ap.add_argument("--socket", required=True, help="Unix socket path to listen on")
+    args = ap.parse_args(argv)
+
+    settings = load_settings()
+    logging.basicConfig(
+        level=getattr(logging, settings.log_level.upper(), logging.INFO),
+        format=f"%(asctime)s | %(levelname)s | worker{args.index} | %(name)s:%(lineno)d - %(message)s",
+    )
+    try:
+        asyncio.run(serve(args.index, args.socket))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
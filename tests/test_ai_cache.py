@@ -0,0 +1,67 @@
+from bot.ai_cache import ConfirmationCache, next_bar_close, verdict_deadline
+
+TF = 60
+
+
+def _snapshot(bar_ts: int) -> dict:
+    return {
+        "market_type": "OTC",
+        "asset": "EURUSD_otc",
+        "expiry_seconds": TF,
+        "bar_ts": bar_ts,
+        "current_price": 1.0852,
+        "atr_rel": 0.0004,
+        "ema_trend": "up",
+        "ema_strength": 0.012,
+        "rsi": 63.0,
+        "breakout": True,
+        "reject": False,
+    }
+
+
+def test_round_trip_for_just_closed_bar():
+    # EVAL_MODE=bar_close evaluates the bar that closed at `now`: bar_ts + TF <= now
+    now = 1_700_000_000.0 // TF * TF + 1
+    snap = _snapshot(int(now) // TF * TF - TF)
+    cache = ConfirmationCache(ttl_seconds=300)
+    cache.put(snap, ("CALL", 82.0), now=now)
+    assert len(cache) == 1
+    assert cache.get(dict(snap), now=now + 10) == ("CALL", 82.0)
+
+
+def test_closed_bar_expires_with_the_queue_deadline():
+    now = 1_700_000_000.0 // TF * TF + 1
+    snap = _snapshot(int(now) // TF * TF - TF)
+    cache = ConfirmationCache(ttl_seconds=300)
+    cache.put(snap, ("PUT", 75.0), now=now)
+    deadline = next_bar_close(snap, now)
+    assert deadline == snap["bar_ts"] + 2 * TF == verdict_deadline(snap)
+    assert cache.get(snap, now=deadline - 1) == ("PUT", 75.0)
+    assert cache.get(snap, now=deadline) is None
+
+
+def test_forming_bar_expires_at_its_close():
+    # EVAL_MODE=interval/tick evaluates the forming bar: bar_ts <= now < bar_ts + TF
+    now = 1_700_000_000.0 // TF * TF + 1
+    snap = _snapshot(int(now) // TF * TF)
+    cache = ConfirmationCache(ttl_seconds=300)
+    cache.put(snap, ("CALL", 80.0), now=now)
+    assert next_bar_close(snap, now) == snap["bar_ts"] + TF
+    assert cache.get(snap, now=snap["bar_ts"] + TF - 1) == ("CALL", 80.0)
+    assert cache.get(snap, now=snap["bar_ts"] + TF) is None
+
+
+def test_ttl_still_caps_entries():
+    now = 1_700_000_000.0 // TF * TF + 1
+    snap = _snapshot(int(now) // TF * TF - TF)
+    cache = ConfirmationCache(ttl_seconds=5)
+    cache.put(snap, ("CALL", 90.0), now=now)
+    assert cache.get(snap, now=now + 6) is None
+
+
+def test_stale_verdicts_are_not_stored():
+    now = 1_700_000_000.0
+    snap = _snapshot(int(now) - 10 * TF)
+    cache = ConfirmationCache()
+    cache.put(snap, ("CALL", 90.0), now=now)
+    assert len(cache) == 0
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from bot.ai_confirmation import AI_UNAVAILABLE, AIConfirmation
+from bot.config import reload_settings
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible /chat/completions that records each call and replies per server settings."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        server = self.server
+        with server.lock:
+            server.calls.append((time.monotonic(), body))
+        time.sleep(server.delay)
+        if server.status != 200:
+            payload = json.dumps({"error": {"message": "rate limited", "type": "rate_limit"}}).encode()
+        else:
+            payload = json.dumps({
+                "id": "stub",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": server.reply}, "finish_reason": "stop"}],
+            }).encode()
+        try:
+            self.send_response(server.status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client timed out first
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    server.calls, server.lock = [], threading.Lock()
+    server.status, server.delay, server.reply = 200, 0.05, "CALL|82"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def ai_env(stub, monkeypatch):
+    """Point the settings at the stub; one candidate per request so calls map to confirms."""
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    monkeypatch.setenv("OPENROUTER_BASE_URL", f"http://127.0.0.1:{stub.server_address[1]}/v1")
+    monkeypatch.setenv("AI_QPS", "5")
+    monkeypatch.setenv("AI_BURST", "1")
+    monkeypatch.setenv("AI_TIMEOUT", "2")
+    monkeypatch.setenv("AI_BATCH_SIZE", "1")
+    reload_settings()
+    yield monkeypatch
+    monkeypatch.undo()
+    reload_settings()
+
+
+def _snapshot(asset: str = "EURUSD_otc") -> dict:
+    return {
+        "market_type": "OTC",
+        "asset": asset,
+        "expiry_seconds": 60,
+        "bar_ts": int(time.time()) // 60 * 60,
+        "current_price": 1.0852,
+        "atr_rel": 0.0004,
+        "ema_trend": "up",
+        "ema_strength": 0.012,
+        "rsi": 63.0,
+        "breakout": True,
+        "reject": False,
+    }
+
+
+def test_identical_concurrent_confirms_share_one_call(stub, ai_env):
+    async def run():
+        ai = AIConfirmation()
+        return ai, await asyncio.gather(*(ai.confirm(_snapshot(), direction="CALL") for _ in range(10)))
+
+    ai, results = asyncio.run(run())
+    assert results == [("CALL", 82.0)] * 10
+    assert len(stub.calls) == 1
+    assert ai.coalesced == 9
+
+
+def test_token_bucket_spaces_upstream_calls(stub, ai_env):
+    async def run():
+        ai = AIConfirmation()
+        return await asyncio.gather(*(ai.confirm(_snapshot(f"A{i}"), direction="CALL") for i in range(4)))
+
+    results = asyncio.run(run())
+    assert results == [("CALL", 82.0)] * 4
+    starts = sorted(t for t, _ in stub.calls)
+    assert len(starts) == 4
+    # AI_QPS=5 with a burst of 1: at least 0.2s between calls (small allowance for timer jitter)
+    assert min(b - a for a, b in zip(starts, starts[1:])) >= 0.18
+
+
+def test_rate_limited_upstream_is_unavailable(stub, ai_env):
+    stub.status = 429
+
+    async def run():
+        return await AIConfirmation().confirm(_snapshot(), direction="CALL")
+
+    assert asyncio.run(run()) == AI_UNAVAILABLE
+    # No client-side retries behind the rate limiter's back
+    assert len(stub.calls) == 1
+
+
+def test_timed_out_upstream_is_unavailable(stub, ai_env):
+    ai_env.setenv("AI_TIMEOUT", "0.2")
+    reload_settings()
+    stub.delay = 1.0
+
+    async def run():
+        ai = AIConfirmation()
+        start = time.monotonic()
+        result = await ai.confirm(_snapshot(), direction="CALL")
+        return result, time.monotonic() - start, len(ai.cache)
+
+    result, elapsed, cached = asyncio.run(run())
+    assert result == AI_UNAVAILABLE
+    assert elapsed < 1.0
+    # Failures are not cached, so the next evaluation may ask again
+    assert cached == 0
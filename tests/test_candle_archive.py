@@ -0,0 +1,73 @@
+import numpy as np
+
+from bot.candle_archive import CandleArchive
+from bot.candle_store import CandleStore
+from bot.ohlcv_buffer import CLOSE, FIELDS, TS
+
+
+def _bars(start: int, n: int, close: float = 1.0) -> np.ndarray:
+    ts = 60.0 * np.arange(start, start + n)
+    price = np.full(n, close)
+    return np.vstack([ts, price, price + 0.1, price - 0.1, price, np.ones(n)])
+
+
+def test_append_skips_known_bars_and_appends_new_ones(tmp_path):
+    archive = CandleArchive(str(tmp_path), "EURUSD_otc", 60)
+    assert archive.append(_bars(0, 5)) == 5
+    # Same window again plus two new bars: only the new ones are written
+    assert archive.append(_bars(0, 7)) == 2
+    assert len(archive) == 7
+    assert archive.last_timestamp == 6 * 60.0
+
+
+def test_append_overwrites_corrected_bars(tmp_path):
+    archive = CandleArchive(str(tmp_path), "EURUSD_otc", 60)
+    archive.append(_bars(0, 10))
+    fix = _bars(3, 2, close=2.0)
+    assert archive.append(np.hstack([fix, _bars(10, 1)])) == 3
+    w = archive.window()
+    assert len(archive) == 11
+    np.testing.assert_array_equal(w[TS], 60.0 * np.arange(11))
+    np.testing.assert_array_equal(w[CLOSE], [1, 1, 1, 2, 2, 1, 1, 1, 1, 1, 1])
+    # A bar older than anything archived has no row to overwrite
+    assert archive.append(_bars(-3, 1, close=5.0)) == 0
+    assert len(CandleArchive(str(tmp_path), "EURUSD_otc", 60)) == 11
+
+
+def test_window_returns_column_views(tmp_path):
+    archive = CandleArchive(str(tmp_path), "EURUSD_otc", 60)
+    archive.append(_bars(0, 50))
+    w = archive.window(20)
+    assert len(w) == len(FIELDS)
+    for col in w:
+        assert isinstance(col, np.memmap) and not col.flags.writeable and len(col) == 20
+    np.testing.assert_array_equal(w[TS], 60.0 * np.arange(30, 50))
+
+    store = CandleStore("EURUSD_otc", 60, capacity=10)
+    store.seed(w)
+    np.testing.assert_array_equal(store.bars.timestamps, 60.0 * np.arange(40, 50))
+
+
+def test_hub_archives_only_new_bars_on_close(tmp_path, monkeypatch):
+    from bot.candle_archive import ArchiveRegistry
+    from bot.market_hub import MarketHub, _Feed
+
+    hub = MarketHub(lambda: None)
+    hub.archives = ArchiveRegistry(str(tmp_path))
+    store = CandleStore("EURUSD_otc", 60, capacity=50)
+    for row in _bars(0, 40).T:
+        store.bars.append(*row)
+    feed = _Feed(store)
+    hub._archive(feed, full=True)
+    archive = hub._archive_for(feed)
+    assert len(archive) == 39  # the forming bar stays out
+
+    overwrites = []
+    monkeypatch.setattr(CandleArchive, "_overwrite", lambda self, bars: overwrites.append(bars.shape[1]) or 0)
+    store.bars.append(*_bars(40, 1)[:, 0])
+    hub._archive(feed)
+    assert len(archive) == 40
+    assert overwrites == []
+    # A backfill rewrites the whole closed window
+    hub._archive(feed, full=True)
+    assert overwrites == [40]
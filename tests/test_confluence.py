@@ -0,0 +1,85 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from bot.backtest import vote_frame
+from bot.compute import COMPUTE_INLINE, ComputeExecutor
+from bot.indicators.confluence import DEFAULT_PARAMS, MIN_TRADE_BARS, StrategyParams
+from bot.indicators.ema import ema_trend
+from bot.indicators.vectorized import batch_votes, stack_frames
+from bot.ohlcv_buffer import CLOSE
+from bot.signal_engine import SignalEngine, confirm_all
+from bot.synthetic import synthetic_ohlcv
+
+BARS = 300
+TIMEFRAME = 60
+TUNED = StrategyParams(rsi_period=10, ema_fast=20, ema_slow=80, atr_period=7, lookback=10, min_ratio=1.0, min_votes=2)
+
+
+@pytest.fixture(scope="module", params=[(3, DEFAULT_PARAMS), (11, DEFAULT_PARAMS), (29, DEFAULT_PARAMS), (3, TUNED)])
+def case(request):
+    """Synthetic bars, the params, and confirm_all's direction at every bar ("" for no signal)."""
+    seed, params = request.param
+    df = synthetic_ohlcv(BARS, TIMEFRAME, seed=seed)
+    expected = []
+    for i in range(len(df)):
+        # Trend timeframe == trade timeframe: the trend view of bar i is the EMA over bars [0, i]
+        prefix = df.iloc[: i + 1]
+        res = confirm_all(prefix, prefix, params=params)
+        expected.append(res["direction"] if res else "")
+    expected = np.array(expected)
+    assert np.count_nonzero(expected != "") > 0
+    return df, params, expected
+
+
+def test_default_params_are_the_live_constants():
+    assert (DEFAULT_PARAMS.rsi_period, DEFAULT_PARAMS.ema_fast, DEFAULT_PARAMS.ema_slow, DEFAULT_PARAMS.atr_period) == (14, 50, 200, 14)
+    assert (DEFAULT_PARAMS.atr_min, DEFAULT_PARAMS.atr_max, DEFAULT_PARAMS.lookback, DEFAULT_PARAMS.min_ratio) == (0.0005, 0.02, 20, 1.5)
+    assert (DEFAULT_PARAMS.min_votes, DEFAULT_PARAMS.min_confidence) == (3, 70.0)
+
+
+def test_vote_frame_matches_confirm_all(case):
+    df, params, expected = case
+    votes = vote_frame(df, TIMEFRAME, params)
+    assert (votes["direction"].to_numpy() == expected).all()
+
+
+def test_batch_votes_matches_confirm_all(case):
+    df, params, expected = case
+    ends = list(range(MIN_TRADE_BARS - 5, len(df)))
+    ohlcv, lengths = stack_frames([df.iloc[: i + 1] for i in ends], n=len(df))
+    # Left padding repeats the first bar, which leaves the trend EMA unchanged
+    votes = batch_votes([str(i) for i in ends], ohlcv, ohlcv[:, CLOSE], lengths=lengths, params=params)
+    assert (votes.direction == expected[ends]).all()
+
+
+def test_tuned_params_change_the_outcome():
+    # Guards the TUNED equivalence cases against params that never reach the rules
+    df = synthetic_ohlcv(BARS, TIMEFRAME, seed=3)
+    default = vote_frame(df, TIMEFRAME)["direction"].to_numpy()
+    tuned = vote_frame(df, TIMEFRAME, TUNED)["direction"].to_numpy()
+    assert (default != tuned).any()
+
+
+def test_evaluate_matches_confirm_all(case):
+    df, params, expected = case
+    engine = SignalEngine(mode="local", compute=ComputeExecutor(COMPUTE_INLINE), params=params)
+
+    async def passthrough(asset, expiry_seconds, base, market_type):
+        return base["direction"]
+
+    engine.confirm_candidate = passthrough
+
+    async def run():
+        out = []
+        for i in range(MIN_TRADE_BARS - 5, len(df), 7):
+            prefix = df.iloc[: i + 1]
+            by_frame = await engine.evaluate("EURUSD_otc", TIMEFRAME, prefix, prefix, "OTC")
+            info = ema_trend(prefix["close"], params.ema_fast, params.ema_slow)
+            by_info = await engine.evaluate("EURUSD_otc", TIMEFRAME, prefix, None, "OTC", ema_info=info)
+            out.append((i, by_frame or "", by_info or ""))
+        return out
+
+    for i, by_frame, by_info in asyncio.run(run()):
+        assert by_frame == by_info == expected[i]
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from bot.indicators.atr import IncrementalATR, atr
+from bot.indicators.ema import IncrementalEMA, IncrementalEMATrend, ema, ema_trend
+from bot.indicators.rsi import IncrementalRSI, rsi
+from bot.synthetic import synthetic_ohlcv
+
+BARS = 600
+
+
+@pytest.fixture(scope="module")
+def df():
+    return synthetic_ohlcv(BARS, seed=7)
+
+
+def _state(obj):
+    """Comparable dump of an indicator's attributes, nested state included (NaN as a string)."""
+    if hasattr(obj, "__dict__"):
+        return {k: _state(v) for k, v in vars(obj).items()}
+    if isinstance(obj, (list, tuple)) or type(obj).__name__ == "deque":
+        return [_state(v) for v in obj]
+    if isinstance(obj, float) and obj != obj:
+        return "nan"
+    return obj
+
+
+@pytest.mark.parametrize("period", [14, 50, 200])
+def test_ema_matches_pandas(df, period):
+    state = IncrementalEMA(period)
+    streamed = np.array([state.update(c) for c in df["close"]])
+    assert np.allclose(streamed, ema(df["close"], period).to_numpy(), equal_nan=True)
+
+
+def test_ema_trend_matches_pandas(df):
+    state = IncrementalEMATrend()
+    for c in df["close"]:
+        info = state.update(c)
+    ref = ema_trend(df["close"])
+    assert np.isclose(info["ema50"], ref["ema50"].iloc[-1])
+    assert np.isclose(info["ema200"], ref["ema200"].iloc[-1])
+    assert np.isclose(info["strength"], ref["strength"])
+    assert info["trend"] == ref["trend"]
+
+
+@pytest.mark.parametrize("period", [5, 14])
+def test_rsi_matches_pandas(df, period):
+    state = IncrementalRSI(period)
+    streamed = np.array([state.update(c) for c in df["close"]])
+    expected = rsi(df["close"], period).to_numpy()
+    # Same warm-up: NaN until `period` deltas exist
+    assert np.array_equal(np.isnan(streamed), np.isnan(expected))
+    assert np.allclose(streamed, expected, equal_nan=True)
+    assert np.isclose(state.previous, expected[-2])
+
+
+@pytest.mark.parametrize("period", [5, 14])
+def test_atr_matches_pandas(df, period):
+    state = IncrementalATR(period)
+    streamed = np.array([state.update(h, l, c) for h, l, c in zip(df["high"], df["low"], df["close"])])
+    expected = atr(df, period).to_numpy()
+    assert np.array_equal(np.isnan(streamed), np.isnan(expected))
+    assert np.allclose(streamed, expected, equal_nan=True)
+
+
+def test_peek_does_not_change_state(df):
+    closes, highs, lows = df["close"].to_numpy(), df["high"].to_numpy(), df["low"].to_numpy()
+    cases = [
+        (IncrementalEMA(50), lambda s, i: s.update(closes[i]), lambda s, i: s.peek(closes[i])),
+        (IncrementalRSI(14), lambda s, i: s.update(closes[i]), lambda s, i: s.peek(closes[i])),
+        (IncrementalATR(14), lambda s, i: s.update(highs[i], lows[i], closes[i]), lambda s, i: s.peek(highs[i], lows[i])),
+    ]
+    for state, update, peek in cases:
+        for i in range(BARS - 1):
+            before = _state(state)
+            peeked = peek(state, i)
+            assert before == _state(state), type(state).__name__
+            # Committing the same bar yields what peek() predicted
+            committed = update(state, i)
+            assert np.isclose(peeked, committed, equal_nan=True), (type(state).__name__, i)
+
+
+def test_ema_trend_peek_does_not_change_state(df):
+    state = IncrementalEMATrend()
+    for c in df["close"][:300]:
+        state.update(c)
+    before = (_state(state.fast), _state(state.slow))
+    peeked = state.peek(1.2345)
+    assert before == (_state(state.fast), _state(state.slow))
+    assert peeked == state.update(1.2345)
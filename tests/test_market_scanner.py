@@ -0,0 +1,63 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+from bot import ai_confirmation
+from bot.market_hub import MarketHub
+from bot.market_scanner import MarketScanner
+from bot.ohlcv_buffer import FIELDS
+from bot.signal_engine import AI_MODE_LLM, SignalEngine
+from bot.snapshot import Snapshot
+from bot.synthetic import synthetic_ohlcv
+
+
+class _Engine:
+    """Scan always yields one CALL candidate for the same bar; verdicts come from `verdicts`."""
+
+    mode = "local"
+
+    def __init__(self, verdicts):
+        self.verdicts = list(verdicts)
+        self.judged = 0
+
+    async def scan_async(self, key, assets, ohlcv, lengths=None, trend_ema=None):
+        snap = Snapshot(1.1, "up", 0.01, 60.0, 0.001, True, False, bar_ts=1_000_020)
+        return SimpleNamespace(candidates=lambda: iter([(assets[0], {"direction": "CALL", "snapshot": snap})]))
+
+    async def judge_candidate(self, asset, expiry_seconds, base, market_type):
+        self.judged += 1
+        judged = self.verdicts.pop(0)
+        return (object() if judged else None), judged
+
+
+def _feed():
+    bars = synthetic_ohlcv(100, seed=1)[list(FIELDS)].to_numpy().T
+    store = SimpleNamespace(needs_backfill=False, last_tick_at=None, bars=SimpleNamespace(window=lambda skip=0: bars))
+    return SimpleNamespace(ready=True, trade_store=store, trend_info=lambda close: None)
+
+
+def test_candidate_without_verdict_is_asked_again_within_the_bar():
+    published = []
+
+    async def run():
+        engine = _Engine([False, True, True])
+        publish = lambda chats, sig: published.append(sig)
+        scanner = MarketScanner("OTC", ["EURUSD_otc"], 60, publish, engine=engine, hub=MarketHub(lambda: None))
+        scanner.feeds = {"EURUSD_otc": _feed()}
+        for _ in range(3):
+            await scanner._evaluate()
+        return engine
+
+    engine = asyncio.run(run())
+    # First ask got AI_UNAVAILABLE, second got a verdict, third is the same (bar, direction) again
+    assert engine.judged == 2
+    assert len(published) == 1
+
+
+def test_stats_do_not_create_the_ai_client(monkeypatch):
+    monkeypatch.setattr(ai_confirmation, "_ai", None)
+    engine = SignalEngine(mode=AI_MODE_LLM)
+    scanner = MarketScanner("OTC", ["EURUSD_otc"], 60, lambda chats, sig: None, engine=engine, hub=MarketHub(lambda: None))
+    assert "ai_calls" not in scanner.stats()
+    assert ai_confirmation._ai is None
@@ -0,0 +1,69 @@
+import asyncio
+import struct
+
+import pytest
+
+from bot import ipc, sharding
+from bot.sharding import WorkerPool
+
+
+class _FlakyPool(WorkerPool):
+    """WorkerPool whose 'workers' are in-memory streams: the first sends `first`, later ones stay quiet."""
+
+    def __init__(self, first: bytes):
+        super().__init__(1)
+        self.first = first
+        self.spawns = 0
+        self.restarted = asyncio.Event()
+        self.on_restart = lambda shard: self.restarted.set()
+
+    async def _spawn(self, shard: int) -> asyncio.StreamReader:
+        self.spawns += 1
+        reader = asyncio.StreamReader()
+        if self.spawns == 1:
+            reader.feed_data(self.first)
+        return reader
+
+
+@pytest.mark.parametrize(
+    "frame",
+    [
+        struct.pack("!I", ipc.MAX_FRAME_BYTES + 1),
+        struct.pack("!I", 9) + b"not json!",
+        struct.pack("!I", 4) + b"\xff\xfe\xfd\xfc",
+        struct.pack("!I", 6) + b"[1, 2]",
+    ],
+    ids=["oversized", "garbage", "not-utf8", "not-an-object"],
+)
+def test_bad_frame_restarts_the_worker(frame, monkeypatch):
+    monkeypatch.setattr(sharding, "RESTART_BACKOFF_SECONDS", (0.01, 0.01))
+
+    async def run():
+        pool = _FlakyPool(frame)
+        await pool.start()
+        try:
+            await asyncio.wait_for(pool.restarted.wait(), timeout=5)
+            # The supervisor survived the bad frame and is still running
+            assert not pool._supervisors[0].done()
+        finally:
+            await pool.close()
+        return pool
+
+    pool = asyncio.run(run())
+    assert pool.spawns == 2
+    assert pool.restarts == 1
+
+
+def test_valid_frames_reach_on_message():
+    received = []
+
+    async def run():
+        frames = b"".join(ipc.encode({"op": "stats", "key": ["OTC:otc", 60], "stats": {"scans": i}}) for i in range(3))
+        pool = _FlakyPool(frames)
+        pool.on_message = lambda shard, msg: received.append(msg["stats"]["scans"])
+        await pool.start()
+        await asyncio.sleep(0.05)
+        await pool.close()
+
+    asyncio.run(run())
+    assert received == [0, 1, 2]
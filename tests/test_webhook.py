@@ -0,0 +1,52 @@
+import asyncio
+
+from telegram import Update
+
+from bot.webhook import PerUserUpdateProcessor, synthetic_update
+
+
+def _update(user_id: int) -> Update:
+    return Update.de_json(synthetic_update(user_id, "/status"), None)
+
+
+def test_flooding_user_does_not_block_others():
+    async def run():
+        processor = PerUserUpdateProcessor(2)
+        release = asyncio.Event()
+        order = []
+
+        async def slow(i):
+            await release.wait()
+            order.append(("slow", i))
+
+        async def fast():
+            order.append(("fast", 0))
+
+        # One user floods more updates than there are slots; they stay in order behind one lock
+        flood = [asyncio.create_task(processor.process_update(_update(1), slow(i))) for i in range(5)]
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(processor.process_update(_update(2), fast()), timeout=1)
+        release.set()
+        await asyncio.gather(*flood)
+        return order
+
+    order = asyncio.run(run())
+    assert order == [("fast", 0)] + [("slow", i) for i in range(5)]
+
+
+def test_slots_still_bound_concurrency():
+    async def run():
+        processor = PerUserUpdateProcessor(2)
+        running = peak = 0
+
+        async def job():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await asyncio.gather(*(processor.process_update(_update(uid), job()) for uid in range(10)))
+        return peak
+
+    assert asyncio.run(run()) == 2